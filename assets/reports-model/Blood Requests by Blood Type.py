@@ -5,13 +5,17 @@ Creates an interactive bar chart showing blood requests grouped by blood type.
 Uses real data from the blood_requests table in Supabase.
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List
 
-import plotly.graph_objects as go
-
 from database import DatabaseConnection
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Color mapping per blood type (matching R version)
@@ -125,24 +129,26 @@ def get_requests_by_blood_type_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    blood_requests = fetch_blood_requests()
-    
-    if not blood_requests:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_requests_by_blood_type_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No blood requests found in database", file=sys.stderr)
         return ""
     
-    requests_by_blood = aggregate_requests_by_blood_type(blood_requests)
-    fig = create_bar_chart(requests_by_blood)
+    fig = create_bar_chart(result["data"])
     
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
     
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_requests_by_blood_type_data(), output_path)
+
+
 if __name__ == "__main__":
     # When run directly, output JSON data
     result = get_requests_by_blood_type_data()
@@ -7,10 +7,13 @@ Uses real data from the blood_bank_units table in Supabase.
 
 import json
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List
 
+import numpy as np
+
 from database import DatabaseConnection
+from unit_table import ONE_DAY, SHELF_LIFE, get_unit_table, today_datetime64
 
 
 def fetch_blood_units() -> List[Dict]:
@@ -53,47 +56,43 @@ def calculate_units_nearing_expiry(blood_units: List[Dict], days_threshold: int
         - units_by_blood_type: Breakdown by blood type
         - units_detail: Detailed list of expiring units
     """
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    threshold_date = today + timedelta(days=days_threshold)
-    
+    table = get_unit_table(blood_units)
+    today = today_datetime64()
+    threshold_date = today + np.timedelta64(days_threshold, "D")
+
+    # Status must be "Valid" or similar active status, and the unit must not
+    # be handed over or disposed already
+    active = (
+        ~table.status_in("expired", "handed_over", "discarded", "disposed")
+        & ~table.has_handed_over_at
+        & ~table.has_disposed_at
+    )
+
+    # If no (parseable) expiry date, use collected_at + 45 days shelf life
+    expires = np.where(
+        np.isnat(table.expires_at), table.collected_or_created + SHELF_LIFE, table.expires_at
+    )
+    # Within threshold: not already expired, and expiring within X days
+    nearing = active & ~np.isnat(expires) & (expires >= today) & (expires <= threshold_date)
+
+    indices = np.flatnonzero(nearing)
+    expires = expires[indices]
+    days_until = ((expires - today) // ONE_DAY).tolist()
+    expires_text = expires.astype("datetime64[D]").astype(str).tolist()
+
     units_nearing_expiry = []
     units_by_blood_type: Dict[str, int] = {}
-    
-    for unit in blood_units:
-        # Check status - must be "Valid" or similar active status
-        status = (unit.get("status") or "").lower()
-        if status in ["expired", "handed_over", "discarded", "disposed"]:
-            continue
-        
-        # Check if already handed over or disposed
-        if unit.get("handed_over_at") or unit.get("disposed_at"):
-            continue
-        
-        # Parse expiry date
-        expires_at = parse_date(unit.get("expires_at"))
-        
-        # If no expiry date, calculate from collected_at (assuming 45 days shelf life)
-        if not expires_at:
-            collected_at = parse_date(unit.get("collected_at") or unit.get("created_at"))
-            if collected_at:
-                expires_at = collected_at + timedelta(days=45)
-            else:
-                continue
-        
-        # Check if within threshold (not already expired, and expiring within X days)
-        if expires_at >= today and expires_at <= threshold_date:
-            blood_type = unit.get("blood_type", "Unknown")
-            days_until_expiry = (expires_at - today).days
-            
-            units_nearing_expiry.append({
-                "unit_id": unit.get("unit_id"),
-                "unit_serial_number": unit.get("unit_serial_number"),
-                "blood_type": blood_type,
-                "expires_at": expires_at.strftime("%Y-%m-%d"),
-                "days_until_expiry": days_until_expiry
-            })
-            
-            units_by_blood_type[blood_type] = units_by_blood_type.get(blood_type, 0) + 1
+    for i, days_until_expiry, expires_at in zip(indices.tolist(), days_until, expires_text):
+        unit = blood_units[i]
+        blood_type = unit.get("blood_type", "Unknown")
+        units_nearing_expiry.append({
+            "unit_id": unit.get("unit_id"),
+            "unit_serial_number": unit.get("unit_serial_number"),
+            "blood_type": blood_type,
+            "expires_at": expires_at,
+            "days_until_expiry": int(days_until_expiry)
+        })
+        units_by_blood_type[blood_type] = units_by_blood_type.get(blood_type, 0) + 1
     
     # Sort by expiry date (soonest first)
     units_nearing_expiry.sort(key=lambda x: x["days_until_expiry"])
@@ -12,13 +12,18 @@ Definition for Reports dashboard:
     - "Repeat"    -> two or more APPROVED records in history
 """
 
+from __future__ import annotations
+
 import json
+import sys
 from collections import defaultdict
 from typing import Dict, List
 
-import plotly.graph_objects as go
+from donor_datasets import get_eligibility_dataset
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
 
-from database import DatabaseConnection
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 def _parse_dt(value):
@@ -39,21 +44,7 @@ def fetch_eligibility_history() -> List[Dict]:
     """
     Fetch full eligibility history ordered by donor_id and created_at.
     """
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,created_at"
-                "&order=donor_id.asc,created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    return records
+    return get_eligibility_dataset().records
 
 
 def aggregate_donation_frequency(records: List[Dict]) -> Dict:
@@ -212,27 +203,26 @@ def get_donation_frequency_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    records = fetch_eligibility_history()
-
-    if not records:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donation_frequency_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No eligibility records found in database", file=sys.stderr)
         return ""
 
-    result = aggregate_donation_frequency(records)
-    donor_data = result["data"]
-    total_donors = result["total_donors"]
-
-    fig = create_pie_chart(donor_data, total_donors)
+    fig = create_pie_chart(result["data"], result["total_donors"])
 
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
 
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_donation_frequency_data(), output_path)
+
+
 def print_summary():
     """Print a formatted summary to console (matching R output style)."""
     result = get_donation_frequency_data()
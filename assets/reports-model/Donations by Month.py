@@ -6,16 +6,22 @@ Includes a dropdown filter for blood type selection.
 Uses real data from the blood_bank_units table in Supabase.
 """
 
+from __future__ import annotations
+
 import json
 import sys
-from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-import plotly.graph_objects as go
+import numpy as np
 
 from database import DatabaseConnection
 from config import BLOOD_TYPES
+from unit_table import get_unit_table, month_keys
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Color mapping for blood types (matching R version)
@@ -65,44 +71,41 @@ def process_donation_data(blood_units: List[Dict], selected_blood_type: str = "A
     Returns:
         List of dicts with year_month and donations count
     """
-    monthly_counts: Dict[str, int] = defaultdict(int)
-    
-    for unit in blood_units:
-        blood_type = unit.get("blood_type")
-        
-        # Apply blood type filter
-        if selected_blood_type != "All" and blood_type != selected_blood_type:
-            continue
-        
-        # Get collection date
-        date_field = unit.get("collected_at") or unit.get("created_at")
-        collected_date = parse_date(date_field)
-        
-        if not collected_date:
-            continue
-        
-        # Floor to first day of month
-        month_key = collected_date.replace(day=1).strftime("%Y-%m-%d")
-        monthly_counts[month_key] += 1
-    
+    table = get_unit_table(blood_units)
+
+    # Collection date (collected_at, falling back to created_at)
+    dates = table.collected_or_created
+    mask = ~np.isnat(dates)
+    # Apply blood type filter
+    if selected_blood_type != "All":
+        mask &= table.blood_type == selected_blood_type
+
+    # Floor to first day of month
+    months, counts = np.unique(dates[mask].astype("datetime64[M]"), return_counts=True)
+
     # Convert to sorted list
     result = [
-        {"year_month": month, "donations": count}
-        for month, count in sorted(monthly_counts.items())
+        {"year_month": month, "donations": int(count)}
+        for month, count in zip(month_keys(months), counts)
     ]
     
     return result
 
 
-def create_line_chart(blood_units: List[Dict]) -> go.Figure:
-    """Create an interactive line chart with dropdown for blood type selection."""
+def create_line_chart(blood_units: List[Dict], series: Optional[Dict[str, List[Dict]]] = None) -> go.Figure:
+    """
+    Create an interactive line chart with dropdown for blood type selection.
+    `series` holds already processed monthly data by blood type (e.g. the
+    "All" series of a get_donations_by_month_data() result), reused as is.
+    """
     blood_types = ["All"] + BLOOD_TYPES
+    series = series or {}
     
     fig = go.Figure()
     
     # Add a trace for each blood type
     for i, bt in enumerate(blood_types):
-        data = process_donation_data(blood_units, bt)
+        data = series[bt] if bt in series else process_donation_data(blood_units, bt)
         
         if not data:
             continue
@@ -184,23 +187,28 @@ def get_donations_by_month_data(selected_blood_type: str = "All") -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    blood_units = fetch_blood_units()
-    
-    if not blood_units:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donations_by_month_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No blood units found in database", file=sys.stderr)
         return ""
     
-    fig = create_line_chart(blood_units)
+    # The other blood types' traces come from the same (process-cached) units
+    blood_units = fetch_blood_units()
+    fig = create_line_chart(blood_units, {result["selected_blood_type"]: result["data"]})
     
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
     
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_donations_by_month_data(), output_path)
+
+
 def print_summary(selected_blood_type: str = "All"):
     """Print a formatted summary to console."""
     result = get_donations_by_month_data(selected_blood_type)
@@ -6,13 +6,17 @@ Uses ONLY donors whose latest eligibility status is approved/eligible, so the
 total donors match the Total Active Donors definition.
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List, Set
 
-import plotly.graph_objects as go
+from donor_datasets import fetch_donor_forms_for, get_eligibility_dataset
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
 
-from database import DatabaseConnection
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Age group definitions
@@ -22,87 +26,19 @@ AGE_GROUPS = ["18-25", "26-35", "36-45", "46-55", "56-65", "66+"]
 COLORS = ["#3b82f6", "#8b5cf6", "#ec4899", "#f59e0b", "#10b981", "#6366f1"]
 
 
-def _parse_dt(value):
-    from datetime import datetime
-
-    if not value:
-        return None
-    try:
-        text = str(value)
-        if "Z" in text:
-            return datetime.fromisoformat(text.replace("Z", "+00:00"))
-        return datetime.fromisoformat(text)
-    except Exception:
-        return None
-
-
 def fetch_active_donor_ids() -> Set[int]:
     """
-    Fetch unique donor_ids whose LATEST eligibility status is APPROVED/eligible.
-    Shared definition with Total Active Donors and other demographic charts.
+    Donor_ids whose LATEST eligibility status is APPROVED/eligible.
+    Shared definition with Total Active Donors (see donor_datasets).
     """
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,created_at"
-                "&order=donor_id.asc,created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    latest_by_donor: Dict[int, Dict] = {}
-    for rec in records:
-        donor_id = rec.get("donor_id")
-        if donor_id is None:
-            continue
-        created = _parse_dt(rec.get("created_at"))
-        existing = latest_by_donor.get(donor_id)
-        if existing is None:
-            latest_by_donor[donor_id] = {"status": rec.get("status"), "_created": created}
-        else:
-            prev_created = existing.get("_created")
-            if created and (prev_created is None or created > prev_created):
-                latest_by_donor[donor_id] = {"status": rec.get("status"), "_created": created}
-
-    active_ids: Set[int] = set()
-    for donor_id, info in latest_by_donor.items():
-        status_text = (info.get("status") or "").lower()
-        if "approved" in status_text or status_text == "eligible":
-            active_ids.add(donor_id)
-
-    return active_ids
+    return set(get_eligibility_dataset().active_donor_ids)
 
 
 def fetch_donor_forms(filtered_ids: Set[int]) -> List[Dict]:
     """Fetch donor forms (age data) limited to donor_ids in filtered_ids."""
     if not filtered_ids:
         return []
-
-    db = DatabaseConnection()
-    donor_forms: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "donor_form?"
-                "select=donor_id,age,birthdate"
-            )
-            rows = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    allowed = set(filtered_ids)
-    for row in rows:
-        donor_id = row.get("donor_id")
-        if donor_id in allowed:
-            donor_forms.append(row)
-
-    return donor_forms
+    return fetch_donor_forms_for(filtered_ids)
 
 
 def get_age_group(age: int) -> str:
@@ -246,19 +182,19 @@ def get_donor_age_distribution_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML.
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donor_age_distribution_data() result as HTML and optionally save it.
 
     IMPORTANT: Always create an HTML asset file, even when there is no data,
     so that forecast-asset.php never returns a 404. In the no-data case,
     we write a simple placeholder HTML with a friendly message.
     """
     try:
-        donor_ids = fetch_active_donor_ids()
-        donor_forms = fetch_donor_forms(donor_ids)
+        if result.get("error"):
+            raise RuntimeError(result["error"])
 
         # No data – write a minimal placeholder HTML so the iframe still loads
-        if not donor_forms:
+        if not result.get("success"):
             placeholder_html = """<!DOCTYPE html>
 <html><head><meta charset="utf-8"><title>Donor Age Distribution</title></head>
 <body style="font-family: Arial, sans-serif; padding: 16px;">
@@ -271,13 +207,10 @@ def generate_chart_html(output_path: str = None) -> str:
                 print(f"Placeholder age chart saved to: {output_path}", file=sys.stderr)
             return placeholder_html
 
-        donor_data = aggregate_by_age_group(donor_forms)
-        total_donors = sum(d["count"] for d in donor_data)
-
-        fig = create_bar_chart(donor_data, total_donors)
+        fig = create_bar_chart(result["data"], result["total_donors"])
 
         if output_path:
-            fig.write_html(output_path)
+            write_figure_html(fig, output_path)
             print(f"Chart saved to: {output_path}", file=sys.stderr)
 
         return fig.to_html(include_plotlyjs="cdn")
@@ -300,6 +233,15 @@ def generate_chart_html(output_path: str = None) -> str:
         return placeholder_html
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    try:
+        result = get_donor_age_distribution_data()
+    except Exception as exc:
+        result = {"success": False, "error": str(exc)}
+    return write_chart_html(result, output_path)
+
+
 def print_summary():
     """Print a formatted summary to console (matching R output style)."""
     result = get_donor_age_distribution_data()
@@ -10,14 +10,18 @@ Definition (to align with active donor universe):
 - Count each donor_id ONCE (no duplicates)
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List
 
-import plotly.graph_objects as go
-
-from database import DatabaseConnection
+from donor_datasets import get_eligibility_dataset
 from config import BLOOD_TYPES
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Color palette - red shades for blood types (matching R version)
@@ -25,20 +29,6 @@ COLORS = ["#dc2626", "#ef4444", "#f87171", "#fca5a5",
           "#991b1b", "#b91c1c", "#dc2626", "#ef4444"]
 
 
-def _parse_dt(value):
-    from datetime import datetime
-
-    if not value:
-        return None
-    try:
-        text = str(value)
-        if "Z" in text:
-            return datetime.fromisoformat(text.replace("Z", "+00:00"))
-        return datetime.fromisoformat(text)
-    except Exception:
-        return None
-
-
 def fetch_approved_latest_blood_types() -> List[Dict]:
     """
     Fetch one blood_type per donor based on the LATEST eligibility row
@@ -47,43 +37,7 @@ def fetch_approved_latest_blood_types() -> List[Dict]:
     Returns a list of records like: { donor_id, blood_type } with
     each donor_id appearing at most once.
     """
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,blood_type,created_at"
-                "&blood_type=not.is.null"
-                "&order=donor_id.asc,created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    latest_by_donor: Dict[int, Dict] = {}
-
-    for rec in records:
-        donor_id = rec.get("donor_id")
-        if donor_id is None:
-            continue
-        created = _parse_dt(rec.get("created_at"))
-        existing = latest_by_donor.get(donor_id)
-        if existing is None:
-            latest_by_donor[donor_id] = {
-                "status": rec.get("status"),
-                "blood_type": rec.get("blood_type"),
-                "_created": created,
-            }
-        else:
-            prev_created = existing.get("_created")
-            if created and (prev_created is None or created > prev_created):
-                latest_by_donor[donor_id] = {
-                    "status": rec.get("status"),
-                    "blood_type": rec.get("blood_type"),
-                    "_created": created,
-                }
+    latest_by_donor = get_eligibility_dataset().latest_with_blood_type
 
     result: List[Dict] = []
     for donor_id, info in latest_by_donor.items():
@@ -228,17 +182,18 @@ def get_donor_blood_type_distribution_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML.
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donor_blood_type_distribution_data() result as HTML and optionally save it.
 
     IMPORTANT: Always create an HTML asset file, even when there is no data,
     so that forecast-asset.php never returns a 404. In the no-data case,
     we write a simple placeholder HTML with a friendly message.
     """
     try:
-        donor_records = fetch_approved_latest_blood_types()
+        if result.get("error"):
+            raise RuntimeError(result["error"])
 
-        if not donor_records:
+        if not result.get("success"):
             placeholder_html = """<!DOCTYPE html>
 <html><head><meta charset="utf-8"><title>Donor Blood Type Distribution</title></head>
 <body style="font-family: Arial, sans-serif; padding: 16px;">
@@ -251,13 +206,10 @@ def generate_chart_html(output_path: str = None) -> str:
                 print(f"Placeholder blood type chart saved to: {output_path}", file=sys.stderr)
             return placeholder_html
 
-        donor_data = aggregate_by_blood_type(donor_records)
-        total_donors = sum(d["count"] for d in donor_data)
-
-        fig = create_bar_chart(donor_data, total_donors)
+        fig = create_bar_chart(result["data"], result["total_donors"])
 
         if output_path:
-            fig.write_html(output_path)
+            write_figure_html(fig, output_path)
             print(f"Chart saved to: {output_path}", file=sys.stderr)
 
         return fig.to_html(include_plotlyjs="cdn")
@@ -279,6 +231,15 @@ def generate_chart_html(output_path: str = None) -> str:
         return placeholder_html
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    try:
+        result = get_donor_blood_type_distribution_data()
+    except Exception as exc:
+        result = {"success": False, "error": str(exc)}
+    return write_chart_html(result, output_path)
+
+
 def print_summary():
     """Print a formatted summary to console (matching R output style)."""
     result = get_donor_blood_type_distribution_data()
@@ -5,13 +5,17 @@ Creates an interactive pie/donut chart showing donor eligibility status distribu
 Uses real data from the eligibility table in Supabase.
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List
 
-import plotly.graph_objects as go
+from donor_datasets import get_eligibility_dataset
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
 
-from database import DatabaseConnection
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Eligibility status categories (high-level buckets for the chart)
@@ -23,62 +27,12 @@ COLORS = ["#10b981", "#f59e0b", "#ef4444"]
 
 def fetch_eligibility_records() -> List[Dict]:
     """
-    Fetch eligibility records from the database and return the latest
-    record per donor_id.
+    Return the latest eligibility record per donor_id.
 
     The eligibility table is a history table, so we only want the most
     recent record for each donor when computing current status.
     """
-    from datetime import datetime
-
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            # Order by donor_id then created_at so we can easily keep the last per donor
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,created_at,end_date"
-                "&order=donor_id.asc,created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    latest_by_donor: Dict[int, Dict] = {}
-
-    def _parse_dt(value):
-        if not value:
-            return None
-        try:
-            # Handle both naive and UTC ISO strings
-            text = str(value)
-            if "Z" in text:
-                return datetime.fromisoformat(text.replace("Z", "+00:00"))
-            return datetime.fromisoformat(text)
-        except Exception:
-            return None
-
-    for rec in records:
-        donor_id = rec.get("donor_id")
-        if donor_id is None:
-            continue
-        created = _parse_dt(rec.get("created_at"))
-        existing = latest_by_donor.get(donor_id)
-        if existing is None:
-            latest_by_donor[donor_id] = {**rec, "_created": created}
-        else:
-            prev_created = existing.get("_created")
-            if created and (prev_created is None or created > prev_created):
-                latest_by_donor[donor_id] = {**rec, "_created": created}
-
-    # Strip helper field before returning
-    result: List[Dict] = []
-    for rec in latest_by_donor.values():
-        rec.pop("_created", None)
-        result.append(rec)
-    return result
+    return get_eligibility_dataset().latest_records()
 
 
 def determine_eligibility_status(record: Dict) -> str:
@@ -241,26 +195,26 @@ def get_donor_eligibility_status_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    eligibility_records = fetch_eligibility_records()
-
-    if not eligibility_records:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donor_eligibility_status_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No eligibility records found in database", file=sys.stderr)
         return ""
 
-    eligibility_data = aggregate_by_eligibility_status(eligibility_records)
-    total_donors = sum(d["count"] for d in eligibility_data)
-    
-    fig = create_pie_chart(eligibility_data, total_donors)
+    fig = create_pie_chart(result["data"], result["total_donors"])
     
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
     
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_donor_eligibility_status_data(), output_path)
+
+
 def print_summary():
     """Print a formatted summary to console (matching R output style)."""
     result = get_donor_eligibility_status_data()
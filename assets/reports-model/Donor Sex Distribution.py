@@ -10,102 +10,36 @@ Definition for Reports dashboard:
 - One record per donor_id
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List, Set
 
-import plotly.graph_objects as go
+from donor_datasets import fetch_donor_forms_for, get_eligibility_dataset
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
 
-from database import DatabaseConnection
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Color palette - blue for male, pink for female, green for other
 COLORS = ["#3b82f6", "#ec4899", "#10b981"]
 
 
-def _parse_dt(value):
-    from datetime import datetime
-
-    if not value:
-        return None
-    try:
-        text = str(value)
-        if "Z" in text:
-            return datetime.fromisoformat(text.replace("Z", "+00:00"))
-        return datetime.fromisoformat(text)
-    except Exception:
-        return None
-
-
 def fetch_active_donor_ids() -> Set[int]:
     """
-    Fetch unique donor_ids whose LATEST eligibility status is APPROVED/eligible.
-    This must match the definition used by Total Active Donors so that
-    demographic charts (sex, etc.) have the same total.
+    Donor_ids whose LATEST eligibility status is APPROVED/eligible.
+    Shared definition with Total Active Donors (see donor_datasets).
     """
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,created_at"
-                "&order=donor_id.asc,created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    latest_by_donor: Dict[int, Dict] = {}
-    for rec in records:
-        donor_id = rec.get("donor_id")
-        if donor_id is None:
-            continue
-        created = _parse_dt(rec.get("created_at"))
-        existing = latest_by_donor.get(donor_id)
-        if existing is None:
-            latest_by_donor[donor_id] = {"status": rec.get("status"), "_created": created}
-        else:
-            prev_created = existing.get("_created")
-            if created and (prev_created is None or created > prev_created):
-                latest_by_donor[donor_id] = {"status": rec.get("status"), "_created": created}
-
-    active_ids: Set[int] = set()
-    for donor_id, info in latest_by_donor.items():
-        status_text = (info.get("status") or "").lower()
-        if "approved" in status_text or status_text == "eligible":
-            active_ids.add(donor_id)
-
-    return active_ids
+    return set(get_eligibility_dataset().active_donor_ids)
 
 
 def fetch_donor_forms(filtered_ids: Set[int]) -> List[Dict]:
-    """Fetch donor forms with sex field, limited to donor_ids in filtered_ids."""
+    """Fetch donor forms (sex field) limited to donor_ids in filtered_ids."""
     if not filtered_ids:
         return []
-
-    db = DatabaseConnection()
-    donor_forms: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "donor_form?"
-                "select=donor_id,sex"
-            )
-            rows = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    # Filter in Python to avoid extremely long IN() URL
-    allowed = set(filtered_ids)
-    for row in rows:
-        donor_id = row.get("donor_id")
-        if donor_id in allowed:
-            donor_forms.append(row)
-
-    return donor_forms
+    return fetch_donor_forms_for(filtered_ids)
 
 
 def normalize_sex(sex_value: str) -> str:
@@ -238,27 +172,26 @@ def get_donor_sex_distribution_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    donor_ids = fetch_active_donor_ids()
-    donor_forms = fetch_donor_forms(donor_ids)
-
-    if not donor_forms:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donor_sex_distribution_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No donor forms found for donors with eligibility history", file=sys.stderr)
         return ""
 
-    sex_data = aggregate_by_sex(donor_forms)
-    total_donors = sum(d["count"] for d in sex_data)
-    
-    fig = create_pie_chart(sex_data, total_donors)
+    fig = create_pie_chart(result["data"], result["total_donors"])
     
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
     
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_donor_sex_distribution_data(), output_path)
+
+
 def print_summary():
     """Print a formatted summary to console (matching R output style)."""
     result = get_donor_sex_distribution_data()
@@ -6,13 +6,17 @@ Categorizes donations as "Mobile Drive" or "In-House" based on registration chan
 Uses real data from the donor_form table in Supabase.
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List
 
-import plotly.graph_objects as go
-
 from database import DatabaseConnection
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Color mapping for donation types
@@ -161,26 +165,26 @@ def get_mobile_vs_inhouse_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    donor_forms = fetch_donor_forms()
-    
-    if not donor_forms:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_mobile_vs_inhouse_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No donor forms found in database", file=sys.stderr)
         return ""
-    
-    donation_data = aggregate_by_donation_type(donor_forms)
-    total_donations = sum(d["count"] for d in donation_data)
-    
-    fig = create_pie_chart(donation_data, total_donations)
+
+    fig = create_pie_chart(result["data"], result["total_donations"])
     
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
     
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_mobile_vs_inhouse_data(), output_path)
+
+
 def print_summary():
     """Print a formatted summary to console."""
     result = get_mobile_vs_inhouse_data()
@@ -5,15 +5,19 @@ Creates an interactive line chart showing monthly blood requests trend.
 Uses real data from the blood_requests table in Supabase.
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from collections import defaultdict
 from datetime import datetime
 from typing import Dict, List
 
-import plotly.graph_objects as go
-
 from database import DatabaseConnection
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 def fetch_blood_requests() -> List[Dict]:
@@ -166,29 +170,30 @@ def get_monthly_requests_trend_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML."""
-    blood_requests = fetch_blood_requests()
-    
-    if not blood_requests:
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_monthly_requests_trend_data() result as HTML and optionally save it."""
+    if not result.get("success"):
         print("WARNING: No blood requests found in database", file=sys.stderr)
         return ""
     
-    monthly_data = process_monthly_requests(blood_requests)
-    
-    if not monthly_data:
+    if not result["data"]:
         print("WARNING: No monthly data to display", file=sys.stderr)
         return ""
     
-    fig = create_line_chart(monthly_data)
+    fig = create_line_chart(result["data"])
     
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
     
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_monthly_requests_trend_data(), output_path)
+
+
 def print_summary():
     """Print a formatted summary to console."""
     result = get_monthly_requests_trend_data()
@@ -5,13 +5,18 @@ Creates an interactive pie/donut chart showing successful vs unsuccessful donati
 Uses real data from the eligibility or blood_collection tables in Supabase.
 """
 
+from __future__ import annotations
+
 import json
 import sys
 from typing import Dict, List
 
-import plotly.graph_objects as go
-
 from database import DatabaseConnection
+from donor_datasets import get_eligibility_dataset
+from chart_output import write_figure_html
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # imported on first use (see lazy_imports)
 
 
 # Color mapping for donation status
@@ -28,24 +33,10 @@ def fetch_eligibility_records() -> List[Dict]:
     IMPORTANT:
     - We intentionally do NOT group by donor_id here; each row in the
       eligibility table is treated as a separate donation attempt.
-    - We only select columns that we know exist and are already used
-      successfully by other reports (status + created_at).
+    - The rows come from the shared eligibility dataset, so this does not
+      trigger another download of the table.
     """
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,created_at"
-                "&order=created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    return records
+    return get_eligibility_dataset().records
 
 
 def fetch_blood_collections() -> List[Dict]:
@@ -227,17 +218,14 @@ def get_donation_success_data() -> Dict:
     }
 
 
-def generate_chart_html(output_path: str = None) -> str:
-    """Generate and optionally save the chart as HTML.
+def write_chart_html(result: Dict, output_path: str = None) -> str:
+    """Render a get_donation_success_data() result as HTML and optionally save it.
 
     IMPORTANT: Always create an HTML asset file, even when there is no data,
     so that forecast-asset.php never returns a 404. In the no-data case,
     we write a simple placeholder HTML with a friendly message.
     """
-    eligibility_records = fetch_eligibility_records()
-    blood_collections = fetch_blood_collections()
-
-    if not eligibility_records and not blood_collections:
+    if not result.get("success"):
         placeholder_html = """<!DOCTYPE html>
 <html><head><meta charset="utf-8"><title>Successful vs Unsuccessful Donations</title></head>
 <body style="font-family: Arial, sans-serif; padding: 16px;">
@@ -250,18 +238,20 @@ def generate_chart_html(output_path: str = None) -> str:
             print(f"Placeholder success chart saved to: {output_path}", file=sys.stderr)
         return placeholder_html
 
-    donation_data = aggregate_by_donation_status(eligibility_records, blood_collections)
-    total_donations = sum(d["count"] for d in donation_data)
-
-    fig = create_pie_chart(donation_data, total_donations)
+    fig = create_pie_chart(result["data"], result["total_donations"])
 
     if output_path:
-        fig.write_html(output_path)
+        write_figure_html(fig, output_path)
         print(f"Chart saved to: {output_path}")
 
     return fig.to_html(include_plotlyjs="cdn")
 
 
+def generate_chart_html(output_path: str = None) -> str:
+    """Generate and optionally save the chart as HTML."""
+    return write_chart_html(get_donation_success_data(), output_path)
+
+
 def print_summary():
     """Print a formatted summary to console."""
     result = get_donation_success_data()
@@ -13,61 +13,14 @@ Definition for Reports dashboard:
 import json
 from typing import Dict, List
 
-from database import DatabaseConnection
-
-
-def _parse_dt(value):
-    from datetime import datetime
-
-    if not value:
-        return None
-    try:
-        text = str(value)
-        if "Z" in text:
-            return datetime.fromisoformat(text.replace("Z", "+00:00"))
-        return datetime.fromisoformat(text)
-    except Exception:
-        return None
+from donor_datasets import get_eligibility_dataset
 
 
 def fetch_latest_eligibility() -> List[Dict]:
     """
     Fetch the latest eligibility record per donor_id.
     """
-    db = DatabaseConnection()
-    records: List[Dict] = []
-
-    if db.connect():
-        try:
-            endpoint = (
-                "eligibility?"
-                "select=eligibility_id,donor_id,status,created_at"
-                "&order=donor_id.asc,created_at.asc"
-            )
-            records = db.supabase_request(endpoint)
-        finally:
-            db.disconnect()
-
-    latest_by_donor: Dict[int, Dict] = {}
-
-    for rec in records:
-        donor_id = rec.get("donor_id")
-        if donor_id is None:
-            continue
-        created = _parse_dt(rec.get("created_at"))
-        existing = latest_by_donor.get(donor_id)
-        if existing is None:
-            latest_by_donor[donor_id] = {**rec, "_created": created}
-        else:
-            prev_created = existing.get("_created")
-            if created and (prev_created is None or created > prev_created):
-                latest_by_donor[donor_id] = {**rec, "_created": created}
-
-    result: List[Dict] = []
-    for rec in latest_by_donor.values():
-        rec.pop("_created", None)
-        result.append(rec)
-    return result
+    return get_eligibility_dataset().latest_records()
 
 
 def get_active_donors_data() -> Dict:
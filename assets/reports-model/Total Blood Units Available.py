@@ -10,8 +10,11 @@ import json
 import sys
 from typing import Dict, List
 
+import numpy as np
+
 from database import DatabaseConnection
 from config import BLOOD_TYPES
+from unit_table import get_unit_table
 
 
 def fetch_blood_units() -> List[Dict]:
@@ -40,35 +43,29 @@ def calculate_available_units(blood_units: List[Dict]) -> Dict:
     Returns:
         Dictionary with available units count and breakdown by blood type
     """
+    table = get_unit_table(blood_units)
+    # Empty status treated as valid
+    is_valid = table.status_in("valid", "available", "")
+    is_available = is_valid & ~table.has_handed_over_at & ~table.has_disposed_at
+
+    available_codes = table.blood_type_code[is_available]
+    type_counts = np.bincount(available_codes[available_codes >= 0], minlength=len(BLOOD_TYPES))
+    by_blood_type: Dict[str, int] = {
+        bt: int(count) for bt, count in zip(BLOOD_TYPES, type_counts)
+    }
+
     available_units = []
     unavailable_units = []
-    by_blood_type: Dict[str, int] = {bt: 0 for bt in BLOOD_TYPES}
-    
-    for unit in blood_units:
-        status = (unit.get("status") or "").lower()
-        handed_over_at = unit.get("handed_over_at")
-        disposed_at = unit.get("disposed_at")
-        blood_type = unit.get("blood_type", "Unknown")
-        
-        # Check if unit is available
-        is_valid = status in ["valid", "available", ""]  # Empty status treated as valid
-        is_not_handed_over = handed_over_at is None or handed_over_at == ""
-        is_not_disposed = disposed_at is None or disposed_at == ""
-        
-        is_available = is_valid and is_not_handed_over and is_not_disposed
-        
+    for unit, status, available in zip(blood_units, table.status_lower, is_available.tolist()):
         unit_info = {
             "unit_id": unit.get("unit_id"),
             "unit_serial_number": unit.get("unit_serial_number"),
-            "blood_type": blood_type,
+            "blood_type": unit.get("blood_type", "Unknown"),
             "status": status,
-            "is_available": is_available
+            "is_available": available
         }
-        
-        if is_available:
+        if available:
             available_units.append(unit_info)
-            if blood_type in by_blood_type:
-                by_blood_type[blood_type] += 1
         else:
             unavailable_units.append(unit_info)
     
@@ -0,0 +1,313 @@
+"""
+Batched SARIMA estimation for order screening.
+
+Every candidate in an order search normally builds its own SARIMAX model
+and runs its own L-BFGS optimisation. For the short monthly series used
+here most of that time is Python overhead, not arithmetic. This module
+estimates many (series, order) candidates at once with NumPy recursions
+that run over a batch axis:
+
+1. ARMA parameters are estimated by conditional sum of squares (CSS) on
+   the series differenced by the candidate's d and D (all candidates in a
+   stepwise round share them), with a few Levenberg-Marquardt steps; the
+   Jacobians for every candidate come from one forward-difference pass
+   over the whole batch.
+2. The Gaussian log-likelihood at those parameters comes from a batched
+   Kalman filter over the undifferenced series, set up like SARIMAX
+   without enforce_stationarity: differencing states in the state vector,
+   approximate diffuse start, burn-in of the state dimension, innovation
+   variance concentrated out. At equal parameters it matches SARIMAX's
+   loglike with concentrate_scale=True (test_batched_likelihood.py).
+
+The resulting AICc (calculate_aicc / count_sarima_params, as for a full
+fit) approximates the maximum-likelihood AICc, like auto.arima's
+`approximation = TRUE`: it is good for ranking candidates, and the chosen
+order is then refitted exactly with SARIMAX.
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from parallel_fitting import FitOutcome, Order
+
+# Levenberg-Marquardt settings for the CSS estimates
+CSS_ITERATIONS = 25
+CSS_STEP = 1e-6
+# Variance of the approximate diffuse prior (statsmodels' default)
+DIFFUSE_VARIANCE = 1e6
+
+
+# ------------------------------------------------------------------ #
+# Batched polynomial expansion
+# ------------------------------------------------------------------ #
+def _expand(nonseasonal: np.ndarray, seasonal: np.ndarray, s: int, sign: float) -> np.ndarray:
+    """
+    Lag coefficients of a multiplicative polynomial for a batch, with
+    nonseasonal (M, p) and seasonal (M, P) parameters. With sign=-1 this
+    gives the AR side, (1 - a(B))(1 - A(B^s)) = 1 - sum(c_i B^i); with
+    sign=+1 the MA side, (1 + a(B))(1 + A(B^s)) = 1 + sum(c_i B^i).
+    Returns c (M, p + s*P).
+    """
+    M, p = nonseasonal.shape
+    P = seasonal.shape[1]
+    full = np.zeros((M, p + s * P + 1))
+    full[:, 0] = 1.0
+    full[:, 1:p + 1] = sign * nonseasonal
+    for j in range(1, P + 1):
+        full[:, s * j] += sign * seasonal[:, j - 1]
+        full[:, s * j + 1:s * j + p + 1] += seasonal[:, j - 1:j] * nonseasonal
+    return sign * full[:, 1:]
+
+
+class _Batch:
+    """(series, order) candidates with padded parameter layout."""
+
+    def __init__(self, y: np.ndarray, y_lengths: np.ndarray, orders: Sequence[Order]):
+        self.y = y  # (B, N) series, zero padded
+        self.y_lengths = y_lengths  # (B,) observations per row
+        self.orders = list(orders)
+        # All rows share the differencing orders and season length
+        _, self.d, _, _, self.D, _, self.s = orders[0]
+        self.x = np.zeros((len(orders), max(y.shape[1] - self.d - self.D * self.s, 0)))
+        for row, length in enumerate(y_lengths):
+            x = _difference(y[row, :length], self.d, self.D, self.s)
+            self.x[row, :len(x)] = x  # differenced series, zero padded
+        self.lengths = np.maximum(y_lengths - self.d - self.D * self.s, 0)
+        self.p, self.q, self.P, self.Q = (max(o[i] for o in orders) for i in (0, 2, 3, 5))
+        self.k = self.p + self.q + self.P + self.Q
+        # Which padded parameter slots each row actually uses
+        active = np.zeros((len(orders), self.k), dtype=bool)
+        for row, (p, _, q, P, _, Q, _) in enumerate(orders):
+            active[row, :p] = True
+            active[row, self.p:self.p + q] = True
+            active[row, self.p + self.q:self.p + self.q + P] = True
+            active[row, self.p + self.q + self.P:self.p + self.q + self.P + Q] = True
+        self.active = active
+
+    def polynomials(self, params: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Full AR and MA lag coefficients (y_t = ar.y_lags + e_t + ma.e_lags)."""
+        p, q, P = self.p, self.q, self.P
+        ar = _expand(params[:, :p], params[:, p + q:p + q + P], self.s, -1.0)
+        ma = _expand(params[:, p:p + q], params[:, p + q + P:], self.s, 1.0)
+        return ar, ma
+
+
+def _css_residuals(x: np.ndarray, mask: np.ndarray, ar: np.ndarray, ma: np.ndarray) -> np.ndarray:
+    """
+    CSS residuals for a batch. Pre-sample values and the errors of the
+    conditioning observations (mask 0) are taken as zero.
+    """
+    M, N = x.shape
+    n_ar, n_ma = ar.shape[1], ma.shape[1]
+    resid = np.zeros((M, N))
+    for t in range(N):
+        value = x[:, t].copy()
+        if n_ar:
+            lags = min(n_ar, t)
+            if lags:
+                value -= np.einsum("ml,ml->m", ar[:, :lags], x[:, t - 1::-1][:, :lags])
+        if n_ma:
+            lags = min(n_ma, t)
+            if lags:
+                value -= np.einsum("ml,ml->m", ma[:, :lags], resid[:, t - 1::-1][:, :lags])
+        resid[:, t] = value * mask[:, t]
+    return resid
+
+
+def _css_estimate(batch: _Batch) -> np.ndarray:
+    """CSS parameter estimates for every row, by Levenberg-Marquardt."""
+    B, k = len(batch.orders), batch.k
+    params = np.zeros((B, k))
+    if k == 0:
+        return params
+    N = batch.x.shape[1]
+    # Condition on the first max-AR-lag observations of each row
+    ar_lags = np.array([o[0] + o[3] * o[6] for o in batch.orders])
+    t = np.arange(N)
+    mask = ((t[None, :] >= ar_lags[:, None]) & (t[None, :] < batch.lengths[:, None])).astype(float)
+    x = np.repeat(batch.x, k + 1, axis=0)
+    mask_all = np.repeat(mask, k + 1, axis=0)
+    steps = np.zeros((k + 1, k))
+    steps[1:] = np.eye(k) * CSS_STEP
+    damping = np.full(B, 1e-3)
+
+    def residuals_and_jacobian(current: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        trial = (current[:, None, :] + steps[None, :, :]).reshape(B * (k + 1), k)
+        ar, ma = batch.polynomials(trial)
+        resid = _css_residuals(x, mask_all, ar, ma).reshape(B, k + 1, N)
+        jac = (resid[:, 1:, :] - resid[:, :1, :]) / CSS_STEP  # (B, k, N)
+        jac *= batch.active[:, :, None]
+        return resid[:, 0, :], jac
+
+    resid, jac = residuals_and_jacobian(params)
+    sse = np.einsum("bn,bn->b", resid, resid)
+    identity = np.eye(k)[None, :, :]
+    inactive = (~batch.active)[:, :, None] * identity
+    for _ in range(CSS_ITERATIONS):
+        jtj = np.einsum("bkn,bln->bkl", jac, jac)
+        diag = np.einsum("bkk->bk", jtj)[:, :, None] * identity
+        lhs = jtj + damping[:, None, None] * (diag + identity) + inactive
+        rhs = -np.einsum("bkn,bn->bk", jac, resid)
+        try:
+            delta = np.linalg.solve(lhs, rhs[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            break
+        candidate = np.clip(params + delta * batch.active, -5.0, 5.0)
+        new_resid, new_jac = residuals_and_jacobian(candidate)
+        new_sse = np.einsum("bn,bn->b", new_resid, new_resid)
+        better = np.isfinite(new_sse) & (new_sse < sse)
+        params[better] = candidate[better]
+        resid[better], jac[better], sse[better] = new_resid[better], new_jac[better], new_sse[better]
+        damping = np.where(better, damping / 10.0, damping * 10.0)
+        if np.all(damping > 1e8):
+            break
+    return params
+
+
+# ------------------------------------------------------------------ #
+# Batched Kalman filter
+# ------------------------------------------------------------------ #
+def _differencing_states(d: int, D: int, s: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    SARIMAX's differencing block (simple_differencing=False): the design
+    row (k,), the transition block (k, k) and the column (k,) through which
+    the differencing states accumulate the first ARMA state, for the
+    k = d + s*D states kept ahead of the ARMA states.
+    """
+    k = d + s * D
+    design = np.array([1.0] * d + ([0.0] * (s - 1) + [1.0]) * D)
+    transition = np.zeros((k, k))
+    arma_column = np.zeros(k)
+    if D:
+        seasonal = np.zeros((s, s))
+        seasonal[np.arange(1, s), np.arange(s - 1)] = 1.0
+        seasonal[0, -1] = 1.0
+        for j in range(D):
+            start, end = d + j * s, d + (j + 1) * s
+            transition[start:end, start:end] = seasonal
+            if j < D - 1:
+                transition[start, end + s - 1] = 1.0
+            arma_column[start] = 1.0
+    if d:
+        transition[np.triu_indices(d)] = 1.0
+        transition[:d, d:k] = ([0.0] * (s - 1) + [1.0]) * D
+        arma_column[:d] = 1.0
+    return design, transition, arma_column
+
+
+def _log_likelihood(batch: _Batch, params: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gaussian log-likelihood per row of the undifferenced series, set up as
+    SARIMAX does without enforce_stationarity: the differencing states sit
+    in the state vector ahead of the ARMA states, every state starts
+    approximately diffuse and the first state-dimension observations are
+    burned. The innovation variance is concentrated out (as with
+    concentrate_scale=True); returns (log-likelihood, variance).
+    """
+    B, N = batch.y.shape
+    ar, ma = batch.polynomials(params)
+    r = max(ar.shape[1], ma.shape[1] + 1)
+    design, diff_transition, arma_column = _differencing_states(batch.d, batch.D, batch.s)
+    k = len(design)
+    m = k + r
+
+    Z = np.zeros(m)
+    Z[:k] = design
+    Z[k] = 1.0
+    T = np.zeros((B, m, m))
+    T[:, :k, :k] = diff_transition
+    T[:, :k, k] = arma_column
+    T[:, k:k + ar.shape[1], k] = ar
+    T[:, k + np.arange(r - 1), k + np.arange(1, r)] = 1.0
+    R = np.zeros((B, m))
+    R[:, k] = 1.0
+    R[:, k + 1:k + ma.shape[1] + 1] = ma
+    RR = R[:, :, None] * R[:, None, :]
+
+    # State dimension of each row's own model; padded ARMA states stay at zero
+    states = k + np.array([max(p + P * s, q + Q * s + 1) for p, _, q, P, _, Q, s in batch.orders])
+    P = DIFFUSE_VARIANCE * (np.eye(m)[None, :, :] * (np.arange(m)[None, :] < states[:, None])[:, :, None])
+    a = np.zeros((B, m))
+    sum_log_f = np.zeros(B)
+    sum_v2_f = np.zeros(B)
+    Tt = np.swapaxes(T, 1, 2)
+    for t in range(N):
+        observed = t < batch.y_lengths
+        counted = observed & (t >= states)
+        v = batch.y[:, t] - a @ Z
+        PZ = P @ Z
+        F = np.maximum(PZ @ Z, 1e-12)
+        gain = PZ / F[:, None]
+        a = np.where(observed[:, None], a + gain * v[:, None], a)
+        P = np.where(observed[:, None, None], P - gain[:, :, None] * PZ[:, None, :], P)
+        sum_log_f += np.where(counted, np.log(F), 0.0)
+        sum_v2_f += np.where(counted, v * v / F, 0.0)
+        a = np.einsum("bij,bj->bi", T, a)
+        P = T @ P @ Tt + RR
+
+    n = np.maximum(batch.y_lengths - states, 1).astype(float)
+    sigma2 = np.maximum(sum_v2_f / n, 1e-300)
+    llf = -0.5 * n * (np.log(2 * np.pi) + 1.0 + np.log(sigma2)) - 0.5 * sum_log_f
+    return llf, sigma2
+
+
+# ------------------------------------------------------------------ #
+# Public entry point
+# ------------------------------------------------------------------ #
+def _difference(values: np.ndarray, d: int, D: int, s: int) -> np.ndarray:
+    x = np.asarray(values, dtype=np.float64)
+    for _ in range(D):
+        x = x[s:] - x[:-s]
+    for _ in range(d):
+        x = np.diff(x)
+    return x
+
+
+def screen_orders(
+    tasks: Dict[Hashable, Tuple[np.ndarray, Order]],
+) -> Dict[Hashable, Optional[FitOutcome]]:
+    """
+    Approximate fits for {key: (values, order)} - all candidates sharing
+    differencing orders and season length are estimated in one batch.
+    Returns {key: FitOutcome with the approximate AICc and parameters in
+    SARIMAX order (ar, ma, seasonal ar, seasonal ma, sigma2) but no
+    forecast, or None when the candidate cannot be estimated}.
+    """
+    # Imported here: forecasting imports this module indirectly
+    from forecasting import calculate_aicc, count_sarima_params
+
+    outcomes: Dict[Hashable, Optional[FitOutcome]] = {key: None for key in tasks}
+    groups: Dict[Tuple[int, int, int], List[Hashable]] = {}
+    for key, (_, order) in tasks.items():
+        groups.setdefault((order[1], order[4], order[6]), []).append(key)
+
+    for (d, D, s), keys in groups.items():
+        rows = []
+        for key in keys:
+            values, order = tasks[key]
+            values = np.asarray(values, dtype=np.float64)
+            if len(values) - d - D * s > order[0] + order[2] + order[3] + order[5] + 2:
+                rows.append((key, values, tuple(order)))
+        if not rows:
+            continue
+        width = max(len(y) for _, y, _ in rows)
+        padded = np.zeros((len(rows), width))
+        for index, (_, y, _) in enumerate(rows):
+            padded[index, :len(y)] = y  # no constant, as the SARIMAX fits
+        lengths = np.array([len(y) for _, y, _ in rows])
+        batch = _Batch(padded, lengths, [order for _, _, order in rows])
+        with np.errstate(all="ignore"):
+            params = _css_estimate(batch)
+            llf, sigma2 = _log_likelihood(batch, params)
+
+        for index, (key, _, order) in enumerate(rows):
+            if not np.isfinite(llf[index]):
+                continue
+            p, d_, q, P, D_, Q, _ = order
+            n_params = p + q + P + Q
+            aic = -2.0 * llf[index] + 2.0 * (n_params + 1)  # + innovation variance
+            aicc = calculate_aicc(aic, count_sarima_params(p, d_, q, P, D_, Q), len(tasks[key][0]))
+            estimates = [float(v) for v in params[index][batch.active[index]]]
+            outcomes[key] = FitOutcome(order, float(aicc), estimates + [float(sigma2[index])], [], None)
+    return outcomes
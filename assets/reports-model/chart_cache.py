@@ -0,0 +1,179 @@
+"""
+Render cache for chart files.
+
+Most overview charts (donor sex, mobile vs in-house, requests by blood type,
+...) are drawn from a handful of aggregated rows that stay the same for
+days, yet every refresh built their plotly figures again just to find the
+file unchanged (chart_output only skips the write). render_chart() checks
+first:
+
+- A chart's fingerprint hashes the data it is drawn from, the source of the
+  module that draws it and chart_output.page_signature() (template version,
+  plotly.js mode, plotly version).
+- When the stored fingerprint matches and the file is still the one written
+  for it (same size and mtime), neither the figure nor the file is touched.
+- Entries live in a SnapshotStore under the cache dir, one per chart file,
+  so concurrent render workers never overwrite each other's entries.
+
+`python chart_cache.py prune` removes chart HTML files no report writes any
+more (renamed or dropped charts) and temp files left by interrupted writes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from chart_output import SHARED_PLOTLYJS_PATH, page_signature
+from config import CHART_CACHE_DIR, CHART_CACHE_ENABLED, CHART_PLOTLYJS
+from snapshot_store import SnapshotStore
+
+BASE_DIR = Path(__file__).parent
+CHARTS_DIR = BASE_DIR / "charts"
+
+# Temp files younger than this may still belong to a running write
+_TEMP_FILE_MAX_AGE_SECONDS = 3600
+
+_STORE: Optional[SnapshotStore] = None
+
+
+def get_chart_store() -> SnapshotStore:
+    """Chart fingerprints; entries never expire by age (fingerprints decide)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = SnapshotStore(CHART_CACHE_DIR, ttl_seconds=float("inf"), max_bytes=0)
+    return _STORE
+
+
+def chart_fingerprint(data: Any, source: Optional[Path] = None) -> str:
+    """Hash of a chart's input data, its drawing module and the page options."""
+    digest = hashlib.sha1()
+    digest.update(page_signature().encode("utf-8"))
+    digest.update(b"\n")
+    if source is not None:
+        try:
+            digest.update(Path(source).read_bytes())
+        except OSError:
+            digest.update(str(source).encode("utf-8"))
+    digest.update(b"\n")
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _file_state(path: Path) -> Optional[List[int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _store_key(path: Path) -> str:
+    return str(path.resolve())
+
+
+def render_chart(
+    path: Path,
+    data: Any,
+    render: Callable[[], Any],
+    source: Optional[Path] = None,
+    enabled: bool = CHART_CACHE_ENABLED,
+) -> bool:
+    """
+    Call `render()` (which writes `path` from `data`) unless `path` already
+    holds the chart for this fingerprint. Returns False on a cache hit.
+    """
+    path = Path(path)
+    if not enabled:
+        render()
+        return True
+
+    fingerprint = chart_fingerprint(data, source)
+    key = _store_key(path)
+    entry = get_chart_store().get(key)
+    if (
+        isinstance(entry, dict)
+        and entry.get("fingerprint") == fingerprint
+        and entry.get("file") == _file_state(path)
+        and (CHART_PLOTLYJS != "shared" or SHARED_PLOTLYJS_PATH.exists())
+    ):
+        return False
+
+    render()
+    state = _file_state(path)
+    if state is None:
+        # Nothing was written (e.g. the module had no data to draw)
+        get_chart_store().delete(key)
+    else:
+        get_chart_store().put(key, {"fingerprint": fingerprint, "file": state})
+    return True
+
+
+def prune(keep: Iterable[str], charts_dir: Path = CHARTS_DIR, dry_run: bool = False) -> List[Path]:
+    """
+    Remove chart HTML files in `charts_dir` whose names are not in `keep`,
+    their cache entries, and stale temp files. Returns the removed paths.
+    """
+    keep = set(keep)
+    now = time.time()
+    orphans: List[Path] = []
+    for path in sorted(charts_dir.glob("*.html")):
+        if path.name not in keep and not path.name.startswith(".tmp-"):
+            orphans.append(path)
+    for path in sorted(charts_dir.glob(".tmp-*")):
+        try:
+            if now - path.stat().st_mtime > _TEMP_FILE_MAX_AGE_SECONDS:
+                orphans.append(path)
+        except OSError:
+            continue
+
+    removed: List[Path] = []
+    for path in orphans:
+        if not dry_run:
+            try:
+                path.unlink()
+            except OSError as exc:
+                print(f"WARNING: could not remove {path.name}: {exc}", file=sys.stderr)
+                continue
+            get_chart_store().delete(_store_key(path))
+        removed.append(path)
+    return removed
+
+
+def _report_chart_files() -> Dict[str, str]:
+    """{HTML filename: report name} for every chart a report module writes."""
+    from report_modules import REPORT_MODULES
+
+    return {
+        report.chart[1]: name
+        for name, report in REPORT_MODULES.items()
+        if report.chart is not None
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chart render cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prune_parser = subparsers.add_parser(
+        "prune", help="Remove chart files no report writes any more, and stale temp files"
+    )
+    prune_parser.add_argument("--dry-run", action="store_true", help="List the files without removing them")
+    subparsers.add_parser("clear", help="Forget every stored fingerprint (charts render again next run)")
+    args = parser.parse_args()
+
+    if args.command == "clear":
+        get_chart_store().clear()
+        print(f"Cleared {CHART_CACHE_DIR}")
+    else:
+        removed = prune(_report_chart_files(), dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        for path in removed:
+            print(f"{verb} {os.path.relpath(path, BASE_DIR)}")
+        print(f"{verb} {len(removed)} file(s)")
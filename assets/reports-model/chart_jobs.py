@@ -0,0 +1,178 @@
+"""
+Background chart refresh jobs.
+
+The forecast dashboard payload only refers to its charts by URL, yet the
+admin UI used to wait for every chart to be rendered before it got any
+numbers. With REPORTS_DEFER_CHARTS=1 the payload is returned right away and
+the charts are regenerated by a ChartJob:
+
+- queue(inputs) stores the inputs as the job's latest request and starts a
+  runner unless one is active. A request queued while a render is running
+  is picked up by that runner when it finishes, so renders never overlap
+  and the newest request always wins.
+- The runner holds an exclusive lock file (as payload_cache does), so at
+  most one render runs per job across processes.
+- Progress goes to charts/<job>.status.json, which forecast-asset.php
+  serves as the `chart_status` asset: {"state": "queued" | "running" |
+  "done" | "failed", "errors": [...], timestamps}.
+
+Short-lived CLI runs start the runner as a detached process (`command`);
+without a command it runs on a thread of the current process.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from chart_output import atomic_write
+from config import CHART_JOB_DIR
+from payload_cache import detached_kwargs, try_lock, unlock
+from snapshot_store import SnapshotStore
+
+BASE_DIR = Path(__file__).parent
+CHARTS_DIR = BASE_DIR / "charts"
+
+_STORE: Optional[SnapshotStore] = None
+
+
+def get_job_store() -> SnapshotStore:
+    """Queued job inputs; entries never expire by age."""
+    global _STORE
+    if _STORE is None:
+        _STORE = SnapshotStore(CHART_JOB_DIR, ttl_seconds=float("inf"), max_bytes=0)
+    return _STORE
+
+
+class ChartJob:
+    """
+    Chart refresh `name`: `render(inputs)` regenerates the charts and
+    returns error strings. `command` starts a detached runner process (the
+    entry point with its run flag).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        render: Callable[[Dict[str, Any]], List[str]],
+        command: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.render = render
+        self.command = command
+        self.status_path = CHARTS_DIR / f"{name}.status.json"
+        self.lock_path = CHART_JOB_DIR / f"{name}.lock"
+
+    def queue(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Request a render of `inputs` and return the job status."""
+        seq = time.time_ns()
+        if not get_job_store().put(self.name, {"seq": seq, "inputs": inputs}):
+            return self._write_status(state="failed", errors=[f"{self.name}: could not queue the chart refresh"])
+        status = self._write_status(state="queued", seq=seq, queued_at=_now())
+        self._start_runner()
+        return status
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        """
+        Render queued requests until none is pending; the final status, or
+        None when another runner holds the lock (it will pick them up).
+        """
+        while True:
+            handle = try_lock(self.lock_path)
+            if handle is None:
+                return None
+            try:
+                status = self._drain()
+            finally:
+                unlock(handle)
+            # A request queued while the lock was being released found it
+            # held and did not start a runner, so check once more
+            if not self._pending(status):
+                return status
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            with open(self.status_path, "r", encoding="utf-8") as handle:
+                status = json.load(handle)
+        except (OSError, ValueError):
+            return {"job": self.name, "state": "idle"}
+        return status if isinstance(status, dict) else {"job": self.name, "state": "idle"}
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+    def _load_request(self) -> Optional[Dict[str, Any]]:
+        entry = get_job_store().get(self.name)
+        if not isinstance(entry, dict) or not isinstance(entry.get("inputs"), dict):
+            return None
+        return entry
+
+    def _pending(self, status: Dict[str, Any]) -> bool:
+        entry = self._load_request()
+        return entry is not None and entry["seq"] > status.get("rendered_seq", 0)
+
+    def _drain(self) -> Dict[str, Any]:
+        status = self.status()
+        while True:
+            entry = self._load_request()
+            if entry is None or entry["seq"] <= status.get("rendered_seq", 0):
+                return status
+            self._write_status(state="running", started_at=_now(), errors=[])
+            try:
+                errors = list(self.render(entry["inputs"]))
+                state = "done"
+            except Exception as exc:  # pragma: no cover - diagnostics
+                errors = [f"{self.name}: {exc}"]
+                state = "failed"
+            status = self._write_status(
+                state=state, rendered_seq=entry["seq"], finished_at=_now(), errors=errors
+            )
+            if self._pending(status):
+                status = self._write_status(state="queued")
+
+    def _write_status(self, **fields) -> Dict[str, Any]:
+        status = self.status()
+        status.update(fields, job=self.name, updated_at=_now())
+        try:
+            atomic_write(self.status_path, json.dumps(status, indent=2).encode("utf-8"))
+        except OSError as exc:
+            print(f"WARNING: could not write {self.status_path.name}: {exc}", file=sys.stderr)
+        return status
+
+    def _start_runner(self) -> None:
+        handle = try_lock(self.lock_path)
+        if handle is None:
+            return  # a runner is active and will pick the request up
+        unlock(handle)
+
+        if self.command is None:
+            threading.Thread(target=self._run_quietly).start()
+            return
+        try:
+            subprocess.Popen(
+                self.command,
+                cwd=str(BASE_DIR),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                **detached_kwargs(),
+            )
+        except OSError as exc:
+            print(f"WARNING: could not start chart refresh {self.name}: {exc}", file=sys.stderr)
+            self._write_status(state="failed", errors=[f"{self.name}: {exc}"])
+
+    def _run_quietly(self) -> None:
+        try:
+            self.run()
+        except Exception as exc:  # pragma: no cover - diagnostics
+            print(f"WARNING: chart refresh {self.name} failed: {exc}", file=sys.stderr)
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
@@ -0,0 +1,147 @@
+"""
+Chart HTML output for plotly figures.
+
+fig.write_html() embeds the full plotly.js bundle (~3.5 MB) in every file,
+so with the overview, projected stock and interactive forecast charts most
+of each refresh's disk writes and of the browser's downloads are the same
+JavaScript over and over. write_figure_html() replaces it:
+
+- With REPORTS_CHART_PLOTLYJS=shared (the default) the bundle is written
+  once to charts/plotly.min.js and each chart references it through
+  forecast-asset.php, which lets browsers cache it. 'inline' and 'cdn' keep
+  plotly's own options.
+- Every file starts with a comment holding a hash of the figure spec and
+  the page options. A file whose hash already matches is not rewritten.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.metadata
+import os
+import sys
+import tempfile
+import threading
+from html import escape
+from pathlib import Path
+from typing import Optional, Union
+
+from config import CHART_PLOTLYJS, CHART_PLOTLYJS_URL
+from lazy_imports import lazy_module
+
+plotly = lazy_module("plotly")
+plotly_offline = lazy_module("plotly.offline")
+
+BASE_DIR = Path(__file__).parent
+SHARED_PLOTLYJS_PATH = BASE_DIR / "charts" / "plotly.min.js"
+
+# Bump when the generated page around the figure changes, so files written
+# by an older version are replaced even if their figure is unchanged.
+TEMPLATE_VERSION = 1
+
+_SPEC_MARKER = "<!-- figure-spec sha1:{} -->\n"
+
+_SHARED_READY = False
+_SHARED_LOCK = threading.Lock()
+
+# mkstemp creates 0600 files, but chart files are read by the web server.
+# os.umask can only be read by setting it, so do that once, at import.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Replace `path` with `data` in one step, readable by the web server."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(tmp_path, _FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def ensure_shared_plotlyjs() -> Path:
+    """Write charts/plotly.min.js unless it already holds this plotly's bundle."""
+    global _SHARED_READY
+    with _SHARED_LOCK:
+        if not _SHARED_READY:
+            bundle = plotly_offline.get_plotlyjs().encode("utf-8")
+            try:
+                current = SHARED_PLOTLYJS_PATH.read_bytes()
+            except OSError:
+                current = None
+            if current != bundle:
+                atomic_write(SHARED_PLOTLYJS_PATH, bundle)
+            _SHARED_READY = True
+    return SHARED_PLOTLYJS_PATH
+
+
+def _include_plotlyjs() -> Union[bool, str]:
+    """
+    plotly's include_plotlyjs value for the configured mode; for 'shared',
+    the bundle URL (plotly only links URLs ending in .js itself, so
+    write_figure_html adds that script tag).
+    """
+    if CHART_PLOTLYJS == "inline":
+        return True
+    if CHART_PLOTLYJS == "cdn":
+        return "cdn"
+    if CHART_PLOTLYJS != "shared":
+        print(f"WARNING: unknown REPORTS_CHART_PLOTLYJS={CHART_PLOTLYJS!r}, using 'shared'", file=sys.stderr)
+    ensure_shared_plotlyjs()
+    # The version makes browsers fetch a new bundle after a plotly upgrade
+    separator = "&" if "?" in CHART_PLOTLYJS_URL else "?"
+    return f"{CHART_PLOTLYJS_URL}{separator}v={plotly.__version__}"
+
+
+def page_signature() -> str:
+    """
+    The page options write_figure_html applies around a figure, read
+    without importing plotly (for cache keys such as chart_cache's).
+    """
+    try:
+        plotly_version = importlib.metadata.version("plotly")
+    except importlib.metadata.PackageNotFoundError:
+        plotly_version = ""
+    return f"{TEMPLATE_VERSION}\n{CHART_PLOTLYJS}\n{CHART_PLOTLYJS_URL}\n{plotly_version}"
+
+
+def _stored_marker(path: Path) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def write_figure_html(fig, output_path: Union[str, Path]) -> bool:
+    """
+    Write `fig` as a standalone HTML page at `output_path`. Returns False
+    when the file already holds the same figure and was left untouched.
+    """
+    include_plotlyjs = _include_plotlyjs()
+    digest = hashlib.sha1()
+    digest.update(f"{TEMPLATE_VERSION}\n{include_plotlyjs}\n".encode("utf-8"))
+    digest.update(fig.to_json().encode("utf-8"))
+    marker = _SPEC_MARKER.format(digest.hexdigest())
+
+    path = Path(output_path)
+    if _stored_marker(path) == marker:
+        return False
+
+    if isinstance(include_plotlyjs, str) and include_plotlyjs != "cdn":
+        html = fig.to_html(include_plotlyjs=False, full_html=True)
+        script = f'<script charset="utf-8" src="{escape(include_plotlyjs)}"></script>\n'
+        html = html.replace("</head>", script + "</head>", 1)
+    else:
+        html = fig.to_html(include_plotlyjs=include_plotlyjs, full_html=True)
+    atomic_write(path, (marker + html).encode("utf-8"))
+    return True
@@ -2,9 +2,12 @@
 Configuration and constants for forecast reports
 """
 
+import os
 import sys
 from pathlib import Path
 
+from lazy_imports import module_available
+
 # Add conn directory to path to import config
 conn_path = Path(__file__).parent.parent / 'conn'
 if str(conn_path) not in sys.path:
@@ -33,16 +36,123 @@ PAGE_SIZE = 8
 RANDOM_SEED = 42  # For reproducible results (from PHP: mt_srand(42))
 TARGET_BUFFER_UNITS = 10  # Minimum stock per blood type
 
-# SARIMA imports - matching R Studio auto.arima
-try:
-    from statsmodels.tsa.statespace.sarimax import SARIMAX
-    from statsmodels.tsa.seasonal import seasonal_decompose
-    from statsmodels.tools.sm_exceptions import ConvergenceWarning
-    import warnings
-    warnings.filterwarnings('ignore', category=ConvergenceWarning)
-    SARIMA_AVAILABLE = True
-except ImportError:
-    SARIMA_AVAILABLE = False
-    import sys
+# HTTP connection pool shared by every DatabaseConnection in a process.
+# POOL_CONNECTIONS is the number of per-host pools kept alive and
+# POOL_MAXSIZE caps concurrent keep-alive connections to a single host.
+HTTP_POOL_CONNECTIONS = int(os.getenv('SUPABASE_POOL_CONNECTIONS', '4'))
+HTTP_POOL_MAXSIZE = int(os.getenv('SUPABASE_POOL_MAXSIZE', '8'))
+
+# Paginated reads: fetch offset windows concurrently after a count probe.
+# Keep PAGE_FETCH_WORKERS <= HTTP_POOL_MAXSIZE so workers never wait on the pool.
+PARALLEL_PAGE_FETCH = os.getenv('SUPABASE_PARALLEL_PAGES', '1') != '0'
+PAGE_FETCH_WORKERS = int(os.getenv('SUPABASE_PAGE_WORKERS', '4'))
+
+# Keyset (cursor) pagination: page on a monotonic key with `gt.` filters
+# instead of OFFSET. Enable per table with a comma-separated list, e.g.
+# SUPABASE_KEYSET_TABLES=blood_bank_units,eligibility
+KEYSET_COLUMNS = {
+    'blood_bank_units': 'unit_id',
+    'blood_requests': 'request_id',
+    'eligibility': 'eligibility_id',
+}
+KEYSET_TABLES = {
+    table.strip()
+    for table in os.getenv('SUPABASE_KEYSET_TABLES', '').split(',')
+    if table.strip()
+}
+
+# On-disk snapshots of fetched tables, shared between the short-lived Python
+# processes PHP spawns. TTL of 0 disables the store; SUPABASE_SNAPSHOT_REFRESH=1
+# skips reads (fresh fetch) but still rewrites the snapshot.
+CACHE_DIR = Path(os.getenv('REPORTS_CACHE_DIR', str(Path(__file__).parent.parent / 'cache')))
+SNAPSHOT_DIR = CACHE_DIR / 'supabase'
+SNAPSHOT_TTL_SECONDS = int(os.getenv('SUPABASE_SNAPSHOT_TTL', '300'))
+SNAPSHOT_MAX_BYTES = int(os.getenv('SUPABASE_SNAPSHOT_MAX_MB', '128')) * 1024 * 1024
+SNAPSHOT_REFRESH = os.getenv('SUPABASE_SNAPSHOT_REFRESH', '0') == '1'
+
+# Incremental delta sync for blood_bank_units / blood_requests: keep a local
+# copy and only pull rows created or updated since the last watermark.
+# DELTA_OVERLAP_SECONDS re-reads a small window to catch late commits, and a
+# full resync every DELTA_FULL_RESYNC_SECONDS picks up deleted rows.
+DELTA_SYNC = os.getenv('SUPABASE_DELTA_SYNC', '1') != '0'
+DELTA_OVERLAP_SECONDS = int(os.getenv('SUPABASE_DELTA_OVERLAP', '300'))
+DELTA_FULL_RESYNC_SECONDS = int(os.getenv('SUPABASE_DELTA_FULL_RESYNC', str(24 * 3600)))
+
+# `col=in.(...)` filters are split so the id list stays under this many URL
+# characters (proxies commonly reject URLs past ~8 KB).
+IN_FILTER_MAX_CHARS = int(os.getenv('SUPABASE_IN_FILTER_MAX_CHARS', '4000'))
+
+# SARIMA order searches fit (blood_type, order) candidates on a process pool.
+# FORECAST_WORKERS=1 (or 0) fits serially in-process.
+FORECAST_WORKERS = int(os.getenv('FORECAST_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Fitted SARIMA models (chosen order + parameters) persisted per series
+# fingerprint, so unchanged monthly histories skip model selection.
+# FORECAST_MODEL_STORE=0 disables the store.
+MODEL_STORE_ENABLED = os.getenv('FORECAST_MODEL_STORE', '1') != '0'
+MODEL_STORE_DIR = CACHE_DIR / 'models'
+MODEL_STORE_MAX_BYTES = int(os.getenv('FORECAST_MODEL_STORE_MAX_MB', '16')) * 1024 * 1024
+
+# Warm-start refits (opt-in; needs the model store): when a series changes,
+# refit last run's winning order from its previous parameters and only try
+# neighbouring orders if the AICc worsens by more than WARM_START_TOLERANCE
+# beyond the growth expected from the added observations.
+WARM_START = os.getenv('FORECAST_WARM_START', '0') == '1'
+WARM_START_TOLERANCE = float(os.getenv('FORECAST_WARM_START_TOLERANCE', '2.0'))
+
+# Batched screening (opt-in): the stepwise search ranks candidate orders with
+# approximate AICc values estimated for all candidates and blood types at once
+# (batched_likelihood), and only the chosen order is fitted with SARIMAX.
+BATCHED_SCREENING = os.getenv('FORECAST_BATCHED_SCREENING', '0') == '1'
+
+# Stale-while-revalidate payload cache (opt-in): once a stored dashboard /
+# overview payload is older than REPORTS_PAYLOAD_TTL it is still served right
+# away, while a single background rebuild (guarded by a lock file) replaces it.
+PAYLOAD_SWR = os.getenv('REPORTS_PAYLOAD_SWR', '0') == '1'
+PAYLOAD_CACHE_DIR = CACHE_DIR / 'payloads'
+PAYLOAD_TTL_SECONDS = int(os.getenv('REPORTS_PAYLOAD_TTL', '300'))
+
+# Section-level overview cache: each overview section is rebuilt only when
+# the tables it reads changed since its stored fragment was computed.
+# REPORTS_SECTION_CACHE=0 rebuilds every section on every run.
+SECTION_CACHE_ENABLED = os.getenv('REPORTS_SECTION_CACHE', '1') != '0'
+SECTION_CACHE_DIR = CACHE_DIR / 'sections'
+
+# How chart HTML files load plotly.js (chart_output). 'shared' writes the
+# bundle once (charts/plotly.min.js, served by forecast-asset.php at
+# REPORTS_CHART_PLOTLYJS_URL) and every chart references it; 'inline' embeds
+# the ~3.5 MB bundle in each file and 'cdn' loads it from the plotly CDN.
+CHART_PLOTLYJS = os.getenv('REPORTS_CHART_PLOTLYJS', 'shared')
+CHART_PLOTLYJS_URL = os.getenv('REPORTS_CHART_PLOTLYJS_URL', 'forecast-asset.php?asset=plotly_js')
+
+# Independent charts render concurrently on a bounded process pool
+# (render_pool); REPORTS_RENDER_WORKERS=1 (or 0) renders serially in-process.
+# A chart still running after REPORTS_RENDER_TIMEOUT seconds is abandoned and
+# reported in the payload's errors.
+RENDER_WORKERS = int(os.getenv('REPORTS_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+RENDER_TIMEOUT_SECONDS = float(os.getenv('REPORTS_RENDER_TIMEOUT', '120'))
+
+# Render cache for the overview charts (chart_cache): a chart is rebuilt only
+# when the data it is drawn from, its module or the page template changed.
+# REPORTS_CHART_CACHE=0 renders every chart on every run.
+CHART_CACHE_ENABLED = os.getenv('REPORTS_CHART_CACHE', '1') != '0'
+CHART_CACHE_DIR = CACHE_DIR / 'charts'
+
+# Deferred chart refresh (opt-in): the forecast dashboard payload is returned
+# as soon as its numbers are computed, and its charts are regenerated by a
+# background job (chart_jobs). The job's progress is written to a status file
+# in charts/, served by forecast-asset.php?asset=chart_status.
+DEFER_CHARTS = os.getenv('REPORTS_DEFER_CHARTS', '0') == '1'
+CHART_JOB_DIR = CACHE_DIR / 'chart_jobs'
+
+# Long-lived reports server (reports_daemon.py) the PHP APIs try before
+# spawning a Python process per request. Bound to localhost only.
+REPORTS_DAEMON_HOST = os.getenv('REPORTS_DAEMON_HOST', '127.0.0.1')
+REPORTS_DAEMON_PORT = int(os.getenv('REPORTS_DAEMON_PORT', '8765'))
+
+# SARIMA support - matching R Studio auto.arima. Only checked here: statsmodels
+# itself is imported lazily by the code that fits models (lazy_imports).
+SARIMA_AVAILABLE = module_available('statsmodels') and module_available('scipy')
+if not SARIMA_AVAILABLE:
     print("Warning: statsmodels not available. Install with: pip install statsmodels scipy", file=sys.stderr)
 
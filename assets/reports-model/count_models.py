@@ -1,34 +1,38 @@
-# Calculate total number of SARIMA models tested
+# Calculate the number of SARIMA models the stepwise search can fit
+import numpy as np
 
-# Phase 1: Priority models
-priority_models = 7
+from stepwise_search import StepwiseSearch, _Walk
 
-# Phase 2: Extended models (auto-generated)
-# p(0-2), d(0-1), q(0-2), P(0-1), D(0-1), Q(0-1), s=12
-extended_models = 0
-for p in range(0, 3):  # 0, 1, 2
-    for d in range(0, 2):  # 0, 1
-        for q in range(0, 3):  # 0, 1, 2
-            for P in range(0, 2):  # 0, 1
-                for D in range(0, 2):  # 0, 1
-                    for Q in range(0, 2):  # 0, 1
-                        extended_models += 1
+search = StepwiseSearch()
 
-# Phase 3: Stable models
-stable_models = 7
 
-total_models = priority_models + extended_models + stable_models
+def _walk(months: int) -> _Walk:
+    # A constant series skips the differencing tests (d = D = 0); the order
+    # limits only depend on the series length
+    return _Walk(np.zeros(months), search)
+
+
+def _label(order) -> str:
+    p, _, q, P, _, Q, _ = order
+    return f"({p},{q},{P},{Q})"
+
+
+# Each step tries up to this many neighbours of the current best:
+# P/Q +-1 alone and in pairs, then p/q +-1 alone and in pairs
+neighbours_per_step = len(_walk(6 * search.m).neighbour_orders((1, 0, 1, 1, 0, 1, search.m)))
 
 print("=" * 50)
-print("SARIMA MODEL COUNT")
+print("SARIMA MODEL COUNT (stepwise search)")
 print("=" * 50)
-print(f"Priority models (tested first):     {priority_models}")
-print(f"Extended models (auto-generated):   {extended_models}")
-print(f"Stable models (for flat data):     {stable_models}")
+print("Starting models (p,q,P,Q) by series length:")
+for months in (12, 24, 36, 48):
+    orders = _walk(months).initial_orders()
+    print(f"  {months:3d} months: {len(orders)}  " + " ".join(_label(order) for order in orders))
+print(f"Neighbours per step (at most):      {neighbours_per_step}")
+print(f"Model budget per blood type:        {search.max_models}")
 print("-" * 50)
-print(f"TOTAL SARIMA MODELS TESTED:        {total_models}")
+print("d and D are fixed by KPSS / OCSB tests before any fit,")
+print("and every order is fitted at most once per series.")
 print("=" * 50)
-print(f"\nThis matches R's auto.arima which tests 50-200 models")
-print(f"Our implementation tests {total_models} models per blood type")
-
-
+print("\nThis matches R's auto.arima (stepwise = TRUE), which")
+print("typically fits 10-30 models per series")
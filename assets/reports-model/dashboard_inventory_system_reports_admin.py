@@ -7,9 +7,11 @@ from __future__ import annotations
 
 import json
 import os
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 BASE_DIR = Path(__file__).parent
 
 # Get forecast year from environment variable (defaults to current year)
@@ -58,19 +60,24 @@ def _ensure_placeholder_assets(reason: str):
         _write_placeholder_html(filename, title, reason)
 
 
+import numpy as np
+
+from chart_jobs import ChartJob
+from config import DEFER_CHARTS, PAYLOAD_SWR, SNAPSHOT_REFRESH
 from database import DatabaseConnection
 from forecast_workflow import run_forecast_workflow
+from lazy_imports import module_available
+from payload_cache import PayloadCache
 from projected_stock_analysis import build_projected_stock_table, run_projected_stock_analysis
+from render_pool import render_errors, render_many
+from unit_table import SHELF_LIFE, get_unit_table, today_datetime64
 
-try:  # Optional dependency (plotnine) for static charts
-    from forecast_visualizations import generate_charts
-except ModuleNotFoundError:
-    generate_charts = None  # type: ignore[assignment]
-
-try:  # Optional dependency (plotly) for interactive dashboards
-    from forecast_interactive import generate_interactive_plots
-except ModuleNotFoundError:
-    generate_interactive_plots = None  # type: ignore[assignment]
+# Optional chart stacks: plotnine for static charts, plotly for interactive
+# dashboards. The chart modules are only imported when assets are refreshed.
+STATIC_CHARTS_AVAILABLE = module_available("plotnine") and module_available("pandas")
+INTERACTIVE_CHARTS_AVAILABLE = module_available("plotly") and module_available("pandas")
+# Imported before the render workers start, so they share one import
+_RENDER_PRELOAD = ("pandas", "plotnine", "plotly.graph_objects")
 
 
 def _next_month_details(latest_months: List[Dict]) -> Tuple[str, str]:
@@ -156,39 +163,23 @@ def _chart_paths() -> Dict[str, str]:
 
 
 def _calculate_shelf_life(blood_units: List[Dict]) -> Dict:
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    next_week = today + timedelta(days=7)
-    next_month = today + timedelta(days=30)
-
-    expiring_weekly = 0
-    expiring_monthly = 0
-    total_valid_units = 0
-
-    for unit in blood_units:
-        collected_at = unit.get("collected_at")
-        status = (unit.get("status") or "").lower()
-        handed_over = unit.get("handed_over_at")
-
-        if not collected_at or status == "handed_over" or handed_over:
-            continue
-
-        try:
-            date = datetime.fromisoformat(str(collected_at).replace("Z", "+00:00"))
-        except ValueError:
-            continue
-
-        if date.tzinfo:
-            date = date.replace(tzinfo=None)
-
-        expiration = date + timedelta(days=45)
-        if expiration <= today:
-            continue
-
-        total_valid_units += 1
-        if expiration <= next_week:
-            expiring_weekly += 1
-        if expiration <= next_month:
-            expiring_monthly += 1
+    table = get_unit_table(blood_units)
+    today = today_datetime64()
+    next_week = today + np.timedelta64(7, "D")
+    next_month = today + np.timedelta64(30, "D")
+
+    in_stock = (
+        table.has_collected_at
+        & ~table.status_in("handed_over")
+        & ~table.has_handed_over_at
+        & ~np.isnat(table.collected_at)
+    )
+    expiration = table.collected_at[in_stock] + SHELF_LIFE
+    expiration = expiration[expiration > today]
+
+    total_valid_units = int(len(expiration))
+    expiring_weekly = int((expiration <= next_week).sum())
+    expiring_monthly = int((expiration <= next_month).sum())
 
     total_valid = total_valid_units or 1
     return {
@@ -217,40 +208,73 @@ def _fetch_shelf_data() -> Dict:
     }
 
 
-def _refresh_assets(workflow: Dict) -> List[str]:
+def _render_static_charts(workflow: Dict) -> None:
+    from forecast_visualizations import generate_charts
+
+    generate_charts(workflow_results=workflow)
+
+
+def _render_interactive_plots(workflow: Dict, filter_year: int) -> None:
+    from forecast_interactive import generate_interactive_plots
+
+    generate_interactive_plots(workflow_results=workflow, filter_year=filter_year)
+
+
+def _refresh_assets(workflow: Dict, year: int | None = None) -> List[str]:
+    """
+    Regenerate the chart assets. The independent steps render concurrently
+    (render_pool); failures and timeouts come back as error strings.
+    """
     errors: List[str] = []
-    if generate_charts:
-        try:
-            generate_charts(workflow_results=workflow)
-        except Exception as exc:  # pragma: no cover - diagnostics
-            errors.append(f"static_charts: {exc}")
+    tasks: Dict[str, Callable[[], None]] = {}
+    if STATIC_CHARTS_AVAILABLE:
+        tasks["static_charts"] = partial(_render_static_charts, workflow)
     else:
         errors.append("static_charts: plotnine not installed")
 
     # Generate projected stock chart
-    try:
-        run_projected_stock_analysis(workflow_results=workflow)
-    except Exception as exc:  # pragma: no cover - diagnostics
-        errors.append(f"projected_stock_chart: {exc}")
-
-    if generate_interactive_plots:
-        try:
-            # Pass FORECAST_YEAR to interactive plots to filter display by year
-            # Forecast still uses ALL historical data for accuracy, but display is filtered
-            # If FORECAST_YEAR is not set, default to current year for better readability
-            filter_year = FORECAST_YEAR if FORECAST_YEAR else datetime.now().year
-            generate_interactive_plots(workflow_results=workflow, filter_year=filter_year)
-        except Exception as exc:  # pragma: no cover - diagnostics
-            errors.append(f"interactive_charts: {exc}")
-            _ensure_placeholder_assets(str(exc))
+    tasks["projected_stock_chart"] = partial(run_projected_stock_analysis, workflow_results=workflow)
+
+    if INTERACTIVE_CHARTS_AVAILABLE:
+        # Pass the requested year (FORECAST_YEAR by default) to interactive plots
+        # to filter display by year
+        # Forecast still uses ALL historical data for accuracy, but display is filtered
+        # If FORECAST_YEAR is not set, default to current year for better readability
+        filter_year = year or FORECAST_YEAR or datetime.now().year
+        tasks["interactive_charts"] = partial(_render_interactive_plots, workflow, filter_year)
     else:
         errors.append("interactive_charts: plotly not installed")
         _ensure_placeholder_assets("Plotly is not installed on this server.")
 
+    failed = render_errors(render_many(tasks, preload=_RENDER_PRELOAD))
+    errors.extend(f"{name}: {error}" for name, error in failed.items())
+    if "interactive_charts" in failed:
+        _ensure_placeholder_assets(failed["interactive_charts"])
+
     return errors
 
 
-def generate_dashboard_payload() -> Dict:
+def _render_queued_assets(inputs: Dict) -> List[str]:
+    return _refresh_assets(inputs["workflow"], inputs.get("year"))
+
+
+def forecast_chart_job() -> ChartJob:
+    """Background refresh of the forecast charts (chart_jobs)."""
+    return ChartJob(
+        "forecast_charts",
+        _render_queued_assets,
+        command=[sys.executable, str(Path(__file__).resolve()), "--render-charts"],
+    )
+
+
+def generate_dashboard_payload(year: int | None = None) -> Dict:
+    """
+    Build the forecast dashboard payload. `year` filters the interactive
+    charts (defaults to FORECAST_YEAR); the forecasts always use all history.
+    With DEFER_CHARTS the charts are queued for a background refresh instead
+    of being rendered before returning; `chart_refresh` tells where to
+    follow it.
+    """
     workflow = run_forecast_workflow()
     supply_vs_demand = workflow["supply_vs_demand_df"]
     month_label, month_key = _next_month_details(workflow["df_monthly_donations"])
@@ -264,9 +288,19 @@ def generate_dashboard_payload() -> Dict:
     summary = _build_summary(supply_vs_demand, projected_stock, shelf_life_metrics, expiring_forecast)
     forecast_rows = _format_forecast_rows(supply_vs_demand, month_label, month_key)
 
-    asset_errors = _refresh_assets(workflow)
+    chart_refresh = None
+    if DEFER_CHARTS:
+        asset_errors: List[str] = []
+        status = forecast_chart_job().queue({"workflow": workflow, "year": year})
+        chart_refresh = {
+            "state": status.get("state"),
+            "queued_at": status.get("queued_at"),
+            "status_url": "../api/forecast-asset.php?asset=chart_status",
+        }
+    else:
+        asset_errors = _refresh_assets(workflow, year)
 
-    return {
+    payload = {
         "success": True,
         "generated_at": datetime.now().isoformat(),
         "summary": summary,
@@ -279,11 +313,42 @@ def generate_dashboard_payload() -> Dict:
         "charts": _chart_paths(),
         "asset_errors": asset_errors,
     }
-
-
-def main():
+    if chart_refresh is not None:
+        payload["chart_refresh"] = chart_refresh
+    return payload
+
+
+def dashboard_payload_cache(
+    year: int | None = None,
+    builder: Optional[Callable[[], Dict]] = None,
+    rebuild_command: Optional[List[str]] = None,
+) -> PayloadCache:
+    """Stale-while-revalidate cache of the payload for `year` (payload_cache)."""
+    year = year or FORECAST_YEAR
+    return PayloadCache(
+        f"forecast_dashboard_{year}",
+        builder or (lambda: generate_dashboard_payload(year)),
+        rebuild_command,
+    )
+
+
+def main(rebuild_cache: bool = False, render_charts: bool = False):
     try:
-        payload = generate_dashboard_payload()
+        if render_charts:
+            # Detached chart refresh started by chart_jobs
+            forecast_chart_job().run()
+            return
+        if rebuild_cache:
+            # Detached background rebuild started by payload_cache
+            dashboard_payload_cache().rebuild()
+            return
+        if PAYLOAD_SWR:
+            cache = dashboard_payload_cache(
+                rebuild_command=[sys.executable, str(Path(__file__).resolve()), "--rebuild-cache"]
+            )
+            payload = cache.get(refresh=SNAPSHOT_REFRESH)
+        else:
+            payload = generate_dashboard_payload()
         print(json.dumps(payload, indent=2))
     except Exception as exc:  # pragma: no cover
         error_payload = {
@@ -294,5 +359,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
-
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Forecast dashboard payload")
+    parser.add_argument(
+        "--rebuild-cache", action="store_true", help="Rebuild the stored payload (no output)"
+    )
+    parser.add_argument(
+        "--render-charts", action="store_true", help="Render the queued chart refresh (no output)"
+    )
+    args = parser.parse_args()
+
+    main(rebuild_cache=args.rebuild_cache, render_charts=args.render_charts)
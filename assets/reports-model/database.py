@@ -5,13 +5,38 @@ real-time Supabase data.
 """
 
 import sys
-from collections import defaultdict
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
 
+import numpy as np
 import requests
-
-from config import BLOOD_TYPES, SUPABASE_API_KEY, SUPABASE_URL
+from requests.adapters import HTTPAdapter
+
+from config import (
+    BLOOD_TYPES,
+    DELTA_FULL_RESYNC_SECONDS,
+    DELTA_OVERLAP_SECONDS,
+    DELTA_SYNC,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    KEYSET_COLUMNS,
+    KEYSET_TABLES,
+    PAGE_FETCH_WORKERS,
+    PARALLEL_PAGE_FETCH,
+    SNAPSHOT_DIR,
+    SNAPSHOT_MAX_BYTES,
+    SNAPSHOT_REFRESH,
+    SNAPSHOT_TTL_SECONDS,
+    SUPABASE_API_KEY,
+    SUPABASE_URL,
+)
+from monthly_aggregation import aggregate_records
+from snapshot_store import SnapshotStore
 
 
 # Simple in-process cache so multiple report modules that request the same
@@ -21,9 +46,164 @@ from config import BLOOD_TYPES, SUPABASE_API_KEY, SUPABASE_URL
 # - All of these scripts are read-only analytics.
 # - A single CLI / API invocation is short-lived (seconds), so the data
 #   is effectively static during one run.
+# - The long-lived reports daemon calls expire_request_cache() before each
+#   payload, so it never serves tables older than the snapshot TTL.
 #
 # Keyed by the raw endpoint string and limit value used by supabase_request.
 _SUPABASE_CACHE: Dict[str, List[Dict]] = {}
+_SUPABASE_CACHE_STARTED = time.time()
+
+# Skip snapshot reads (SUPABASE_SNAPSHOT_REFRESH=1, or a refresh requested
+# from the reports daemon via snapshot_refresh()).
+_SNAPSHOT_REFRESH = SNAPSHOT_REFRESH
+
+# Process-wide pooled HTTP session. Every report module builds its own
+# DatabaseConnection, so sharing one keep-alive pool avoids paying a new
+# TCP + TLS handshake for every page of every table.
+_HTTP_SESSION: Optional[requests.Session] = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+# Result of the `/rest/v1/` reachability probe. Only a successful probe is
+# memoized, so a transient failure is retried by the next connect().
+_CONNECTION_PROBE_OK = False
+
+# Cross-process snapshot store (None when SUPABASE_SNAPSHOT_TTL is 0).
+_SNAPSHOT_STORE: Optional[SnapshotStore] = None
+
+# Local copies maintained by delta sync. These never expire by age; they are
+# rebuilt by a periodic full resync instead.
+_DELTA_STORE: Optional[SnapshotStore] = None
+
+
+def expire_request_cache(max_age_seconds: float = 0) -> None:
+    """
+    Empty the in-process table cache once it is older than max_age_seconds
+    (always, for 0). Long-lived processes call this between payloads; the
+    snapshot and delta stores still make the next read cheap.
+    """
+    global _SUPABASE_CACHE_STARTED
+    now = time.time()
+    if max_age_seconds <= 0 or now - _SUPABASE_CACHE_STARTED > max_age_seconds:
+        _SUPABASE_CACHE.clear()
+        _SUPABASE_CACHE_STARTED = now
+
+
+@contextmanager
+def snapshot_refresh(enabled: bool = True):
+    """
+    Within the block, bypass snapshot reads like SUPABASE_SNAPSHOT_REFRESH=1
+    (fresh fetches still rewrite the snapshots). Process-wide, so callers
+    must not run other fetches concurrently.
+    """
+    global _SNAPSHOT_REFRESH
+    previous = _SNAPSHOT_REFRESH
+    _SNAPSHOT_REFRESH = previous or enabled
+    try:
+        yield
+    finally:
+        _SNAPSHOT_REFRESH = previous
+
+
+def get_http_session() -> requests.Session:
+    """Return the shared keep-alive session, creating it on first use."""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        with _HTTP_SESSION_LOCK:
+            if _HTTP_SESSION is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=True,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _HTTP_SESSION = session
+    return _HTTP_SESSION
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Return the on-disk snapshot store, or None when it is disabled."""
+    global _SNAPSHOT_STORE
+    if SNAPSHOT_TTL_SECONDS <= 0:
+        return None
+    if _SNAPSHOT_STORE is None:
+        _SNAPSHOT_STORE = SnapshotStore(
+            SNAPSHOT_DIR, SNAPSHOT_TTL_SECONDS, SNAPSHOT_MAX_BYTES
+        )
+    return _SNAPSHOT_STORE
+
+
+def get_delta_store() -> SnapshotStore:
+    """Return the store holding delta-synced table copies."""
+    global _DELTA_STORE
+    if _DELTA_STORE is None:
+        _DELTA_STORE = SnapshotStore(
+            SNAPSHOT_DIR / "delta", float("inf"), SNAPSHOT_MAX_BYTES
+        )
+    return _DELTA_STORE
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """Parse a PostgREST timestamp into a naive UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _split_endpoint(endpoint: str) -> Tuple[str, List[str]]:
+    """Split `table?a=1&b=2` into the table name and its raw query params."""
+    table, _, query = endpoint.partition("?")
+    params = [param for param in query.split("&") if param]
+    return table, params
+
+
+def keyset_column_for(endpoint: str) -> Optional[str]:
+    """Return the keyset column configured for the endpoint's table, if any."""
+    table, _ = _split_endpoint(endpoint)
+    if table in KEYSET_TABLES:
+        return KEYSET_COLUMNS.get(table)
+    return None
+
+
+def _parse_order(order_value: str) -> List[Tuple[str, bool, bool]]:
+    """
+    Parse a PostgREST `order=` value into (column, descending, nulls_first)
+    tuples, applying PostgreSQL's defaults for NULL placement.
+    """
+    spec: List[Tuple[str, bool, bool]] = []
+    for part in order_value.split(","):
+        pieces = part.strip().split(".")
+        if not pieces or not pieces[0]:
+            continue
+        descending = "desc" in pieces[1:]
+        if "nullsfirst" in pieces[1:]:
+            nulls_first = True
+        elif "nullslast" in pieces[1:]:
+            nulls_first = False
+        else:
+            nulls_first = descending
+        spec.append((pieces[0], descending, nulls_first))
+    return spec
+
+
+def _apply_order(rows: List[Dict], order_spec: List[Tuple[str, bool, bool]]) -> List[Dict]:
+    """Sort rows client-side to honour an `order=` clause (stable, multi-key)."""
+    for column, descending, nulls_first in reversed(order_spec):
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        try:
+            present.sort(key=lambda row: row[column], reverse=descending)
+        except TypeError:
+            present.sort(key=lambda row: str(row[column]), reverse=descending)
+        rows = missing + present if nulls_first else present + missing
+    return rows
 
 
 class DatabaseConnection:
@@ -33,12 +213,19 @@ class DatabaseConnection:
         self.supabase_url = SUPABASE_URL
         self.api_key = SUPABASE_API_KEY
         self.connection_active = False
+        # Incremented whenever a page fetch fails, so callers can tell a
+        # complete result from a truncated one before persisting it.
+        self._fetch_errors = 0
 
     # ------------------------------------------------------------------ #
     # Connection utilities
     # ------------------------------------------------------------------ #
     def connect(self) -> bool:
         """Connect to Supabase database."""
+        global _CONNECTION_PROBE_OK
+        if _CONNECTION_PROBE_OK:
+            self.connection_active = True
+            return True
         try:
             headers = {
                 "apikey": self.api_key,
@@ -46,8 +233,9 @@ class DatabaseConnection:
                 "Content-Type": "application/json",
             }
             test_url = f"{self.supabase_url}/rest/v1/"
-            response = requests.get(test_url, headers=headers, timeout=10)
+            response = get_http_session().get(test_url, headers=headers, timeout=10)
             if response.status_code in (200, 400):
+                _CONNECTION_PROBE_OK = True
                 self.connection_active = True
                 return True
             return False
@@ -63,98 +251,387 @@ class DatabaseConnection:
     # ------------------------------------------------------------------ #
     # Raw REST access
     # ------------------------------------------------------------------ #
-    def supabase_request(self, endpoint: str, limit: int = 5000) -> List[Dict]:
+    def _request_headers(self, count_exact: bool = False) -> Dict[str, str]:
+        prefer = "return=representation"
+        if count_exact:
+            prefer += ",count=exact"
+        return {
+            "apikey": self.api_key,
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Cache-Control": "no-cache, no-store, must-revalidate",
+            "Pragma": "no-cache",
+            "Expires": "0",
+            "Prefer": prefer,
+        }
+
+    def _page_url(self, endpoint: str, limit: int, offset: int) -> str:
+        url = f"{self.supabase_url}/rest/v1/{endpoint}"
+        if "?" in endpoint:
+            url += f"&limit={limit}&offset={offset}"
+        else:
+            url += f"?limit={limit}&offset={offset}"
+        return url
+
+    def _get_page(
+        self, endpoint: str, limit: int, offset: int, count_exact: bool = False
+    ) -> Tuple[List[Dict], Optional[int]]:
         """
-        Make Supabase requests with pagination support (real-time).
+        Fetch a single page. Returns the rows and, when `count_exact` is set,
+        the total row count reported by PostgREST's Content-Range header.
+        Raises on HTTP errors so callers decide how to handle partial data.
         """
-        cache_key = f"{endpoint}::limit={limit}"
-        if cache_key in _SUPABASE_CACHE:
-            # Return cached copy for this process – callers treat the data as
-            # read-only, so it's safe to share the same list instance.
-            return _SUPABASE_CACHE[cache_key]
+        url = self._page_url(endpoint, limit, offset)
+        response = get_http_session().get(
+            url, headers=self._request_headers(count_exact), timeout=60
+        )
+        if response.status_code not in (200, 206):
+            error_msg = (
+                response.text[:1000]
+                if hasattr(response, "text")
+                else str(response.content[:1000])
+            )
+            print(f"ERROR: Supabase request failed ({response.status_code})", file=sys.stderr)
+            print(f"  - Endpoint: {endpoint}", file=sys.stderr)
+            print(f"  - URL (truncated): {url[:200]}...", file=sys.stderr)
+            print(f"  - Error response: {error_msg}", file=sys.stderr)
+            raise Exception(error_msg)
+
+        data = response.json()
+        if not isinstance(data, list):
+            print(f"WARNING: Supabase returned non-list data: {type(data)}", file=sys.stderr)
+            data = []
+
+        total = None
+        if count_exact:
+            # Content-Range looks like "0-4999/12345" (or "*/0" when empty)
+            content_range = response.headers.get("Content-Range", "")
+            _, _, total_text = content_range.partition("/")
+            if total_text.isdigit():
+                total = int(total_text)
+        return data, total
+
+    def _fetch_sequential(self, endpoint: str, limit: int, offset: int = 0) -> List[Dict]:
+        all_data: List[Dict] = []
+        while True:
+            try:
+                data, _ = self._get_page(endpoint, limit, offset)
+            except Exception as exc:  # pragma: no cover - network call
+                print(f"Error in supabase_request: {exc}", file=sys.stderr)
+                self._fetch_errors += 1
+                break
 
-        all_data = []
-        offset = 0
+            all_data.extend(data)
+            if len(data) < limit:
+                break
+            offset += limit
+        return all_data
 
-        while True:
-            url = f"{self.supabase_url}/rest/v1/{endpoint}"
-            if "?" in endpoint:
-                url += f"&limit={limit}&offset={offset}"
-            else:
-                url += f"?limit={limit}&offset={offset}"
+    def _fetch_parallel(self, endpoint: str, limit: int) -> List[Dict]:
+        """
+        Fetch the first page together with an exact row count, then pull the
+        remaining offset windows concurrently. Pages are reassembled in offset
+        order, so any `order=` clause in the endpoint is preserved.
+        """
+        try:
+            first_page, total = self._get_page(endpoint, limit, 0, count_exact=True)
+        except Exception as exc:  # pragma: no cover - network call
+            print(f"Error in supabase_request: {exc}", file=sys.stderr)
+            self._fetch_errors += 1
+            return []
+
+        all_data: List[Dict] = list(first_page)
+        if len(first_page) < limit:
+            return all_data
+        if total is None:
+            # No usable count - fall back to walking the remaining pages
+            all_data.extend(self._fetch_sequential(endpoint, limit, offset=limit))
+            return all_data
+
+        offsets = list(range(limit, total, limit))
+        last_page_full = True
+        if offsets:
+            workers = max(1, min(PAGE_FETCH_WORKERS, len(offsets)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._get_page, endpoint, limit, offset)
+                    for offset in offsets
+                ]
+                for future in futures:
+                    try:
+                        data, _ = future.result()
+                    except Exception as exc:  # pragma: no cover - network call
+                        # Keep the ordered prefix, like the sequential path
+                        print(f"Error in supabase_request: {exc}", file=sys.stderr)
+                        self._fetch_errors += 1
+                        for pending in futures:
+                            pending.cancel()
+                        return all_data
+                    all_data.extend(data)
+                    last_page_full = len(data) == limit
+
+        # Rows inserted after the count probe land beyond the last window
+        if last_page_full and len(all_data) >= total:
+            all_data.extend(
+                self._fetch_sequential(endpoint, limit, offset=len(all_data))
+            )
+        return all_data
 
-            headers = {
-                "apikey": self.api_key,
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "Accept-Encoding": "gzip, deflate",
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0",
-                "Prefer": "return=representation",
-            }
+    def _fetch_keyset(self, endpoint: str, key: str, limit: int) -> List[Dict]:
+        """
+        Page through `endpoint` with `key=gt.<last key>` filters ordered by
+        `key`, so PostgREST never scans and discards earlier rows. The
+        endpoint's own `order=` clause is re-applied client-side afterwards.
+        """
+        table, params = _split_endpoint(endpoint)
+        order_spec: List[Tuple[str, bool, bool]] = []
+        base_params: List[str] = []
+        for param in params:
+            name, _, value = param.partition("=")
+            if name == "order":
+                order_spec = _parse_order(value)
+                continue
+            if name == "select" and value != "*" and key not in value.split(","):
+                print(
+                    f"WARNING: keyset column {key} is not selected by {table}; "
+                    "falling back to offset pagination",
+                    file=sys.stderr,
+                )
+                return self._fetch_sequential(endpoint, limit)
+            base_params.append(param)
 
+        all_data: List[Dict] = []
+        last_key = None
+        while True:
+            page_params = list(base_params)
+            if last_key is not None:
+                page_params.append(f"{key}=gt.{quote(str(last_key), safe='')}")
+            page_params.append(f"order={key}.asc")
+            page_endpoint = f"{table}?{'&'.join(page_params)}"
             try:
-                response = requests.get(url, headers=headers, timeout=60)
-                if response.status_code != 200:
-                    error_msg = (
-                        response.text[:1000]
-                        if hasattr(response, "text")
-                        else str(response.content[:1000])
-                    )
-                    print(f"ERROR: Supabase request failed ({response.status_code})", file=sys.stderr)
-                    print(f"  - Endpoint: {endpoint}", file=sys.stderr)
-                    print(f"  - URL (truncated): {url[:200]}...", file=sys.stderr)
-                    print(f"  - Error response: {error_msg}", file=sys.stderr)
-                    raise Exception(error_msg)
-
-                data = response.json()
-                if not isinstance(data, list):
-                    print(f"WARNING: Supabase returned non-list data: {type(data)}", file=sys.stderr)
-                    data = []
-
-                all_data.extend(data)
-
-                if len(data) < limit:
-                    break
-                offset += limit
+                data, _ = self._get_page(page_endpoint, limit, 0)
             except Exception as exc:  # pragma: no cover - network call
                 print(f"Error in supabase_request: {exc}", file=sys.stderr)
+                self._fetch_errors += 1
+                break
+
+            all_data.extend(data)
+            if len(data) < limit:
+                break
+            last_key = data[-1].get(key)
+            if last_key is None:
+                # NULL keys sort last; nothing further can be addressed by key
                 break
 
+        if order_spec:
+            all_data = _apply_order(all_data, order_spec)
+        return all_data
+
+    def supabase_request(
+        self,
+        endpoint: str,
+        limit: int = 5000,
+        parallel: Optional[bool] = None,
+        keyset: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Make Supabase requests with pagination support (real-time).
+
+        When `parallel` is enabled (defaults to SUPABASE_PARALLEL_PAGES), the
+        total is read from a `Prefer: count=exact` probe and the remaining
+        pages are fetched concurrently on a bounded thread pool.
+
+        `keyset` names a monotonic column to page on instead of OFFSET. It
+        defaults to the column configured for the table via
+        SUPABASE_KEYSET_TABLES; pass an empty string to force offset paging.
+
+        Complete results are also persisted to the on-disk snapshot store so
+        the next PHP-spawned process can reuse them within the TTL.
+        """
+        cache_key = f"{endpoint}::limit={limit}"
+        if cache_key in _SUPABASE_CACHE:
+            # Return cached copy for this process – callers treat the data as
+            # read-only, so it's safe to share the same list instance.
+            return _SUPABASE_CACHE[cache_key]
+
+        store = get_snapshot_store()
+        snapshot_key = f"{self.supabase_url}/rest/v1/{endpoint}"
+        if store is not None and not _SNAPSHOT_REFRESH:
+            snapshot = store.get(snapshot_key)
+            if isinstance(snapshot, list):
+                _SUPABASE_CACHE[cache_key] = snapshot
+                return snapshot
+
+        errors_before = self._fetch_errors
+        all_data = self._fetch_all(endpoint, limit, parallel, keyset)
+
+        if store is not None and self._fetch_errors == errors_before:
+            store.put(snapshot_key, all_data)
         _SUPABASE_CACHE[cache_key] = all_data
         return all_data
 
+    def _fetch_all(
+        self,
+        endpoint: str,
+        limit: int,
+        parallel: Optional[bool] = None,
+        keyset: Optional[str] = None,
+    ) -> List[Dict]:
+        """Fetch every row of `endpoint` using the configured paging strategy."""
+        if keyset is None:
+            keyset = keyset_column_for(endpoint)
+        if parallel is None:
+            parallel = PARALLEL_PAGE_FETCH
+
+        if keyset:
+            return self._fetch_keyset(endpoint, keyset, limit)
+        if parallel:
+            return self._fetch_parallel(endpoint, limit)
+        return self._fetch_sequential(endpoint, limit)
+
+    def delta_sync_request(
+        self,
+        endpoint: str,
+        key: str,
+        change_columns: List[str],
+        limit: int = 5000,
+        keyset: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Return all rows of `endpoint`, fetching only rows whose
+        `change_columns` moved past the stored watermark and merging them by
+        `key` into the local copy. The first run (and every
+        SUPABASE_DELTA_FULL_RESYNC seconds) pulls the full table instead, and
+        any failed delta falls back to a full fetch.
+
+        The endpoint must select `key` and every change column.
+        """
+        cache_key = f"{endpoint}::limit={limit}"
+        if cache_key in _SUPABASE_CACHE:
+            return _SUPABASE_CACHE[cache_key]
+
+        store = get_delta_store()
+        snapshot_key = f"{self.supabase_url}/rest/v1/{endpoint}"
+        state = None if _SNAPSHOT_REFRESH else store.get(snapshot_key)
+        now = time.time()
+        if not (
+            isinstance(state, dict)
+            and isinstance(state.get("rows"), list)
+            and now - float(state.get("full_synced_at", 0)) < DELTA_FULL_RESYNC_SECONDS
+        ):
+            state = None
+
+        if (
+            state is not None
+            and SNAPSHOT_TTL_SECONDS > 0
+            and now - float(state.get("synced_at", 0)) <= SNAPSHOT_TTL_SECONDS
+        ):
+            # Synced moments ago by another process - no request needed
+            _SUPABASE_CACHE[cache_key] = state["rows"]
+            return state["rows"]
+
+        rows: Optional[List[Dict]] = None
+        full_synced_at = now
+        errors_before = self._fetch_errors
+        watermark = _parse_timestamp(state.get("watermark")) if state else None
+        if state is not None and watermark is not None:
+            since = (watermark - timedelta(seconds=DELTA_OVERLAP_SECONDS)).isoformat()
+            since = quote(f'"{since}"', safe="")
+            table, params = _split_endpoint(endpoint)
+            order_spec: List[Tuple[str, bool, bool]] = []
+            for param in params:
+                name, _, value = param.partition("=")
+                if name == "order":
+                    order_spec = _parse_order(value)
+            changed_filter = "or=(" + ",".join(
+                f"{column}.gte.{since}" for column in change_columns
+            ) + ")"
+            delta_endpoint = f"{table}?{'&'.join(params + [changed_filter])}"
+            changed = self._fetch_sequential(delta_endpoint, limit)
+            if self._fetch_errors == errors_before:
+                merged = {row.get(key): row for row in state["rows"]}
+                for row in changed:
+                    merged[row.get(key)] = row
+                rows = list(merged.values())
+                if order_spec:
+                    rows = _apply_order(rows, order_spec)
+                full_synced_at = float(state["full_synced_at"])
+                print(
+                    f"Delta sync {table}: {len(changed)} changed rows, {len(rows)} total",
+                    file=sys.stderr,
+                )
+            else:
+                print(f"Delta sync failed for {table}; doing a full fetch", file=sys.stderr)
+                errors_before = self._fetch_errors
+
+        if rows is None:
+            rows = self._fetch_all(endpoint, limit, keyset=keyset)
+
+        if self._fetch_errors == errors_before:
+            stamps = [
+                stamp
+                for row in rows
+                for stamp in (_parse_timestamp(row.get(column)) for column in change_columns)
+                if stamp is not None
+            ]
+            latest = max(stamps) if stamps else None
+            store.put(
+                snapshot_key,
+                {
+                    "rows": rows,
+                    "watermark": latest.isoformat() if latest else None,
+                    "synced_at": now,
+                    "full_synced_at": full_synced_at,
+                },
+            )
+        _SUPABASE_CACHE[cache_key] = rows
+        return rows
+
     # ------------------------------------------------------------------ #
     # Raw tables
     # ------------------------------------------------------------------ #
-    def fetch_blood_units(self) -> List[Dict]:
+    def fetch_blood_units(self, keyset: Optional[str] = None) -> List[Dict]:
         """
         Fetch all blood bank units from Supabase.
+        Pass `keyset="unit_id"` to page on unit_id instead of OFFSET.
+        With SUPABASE_DELTA_SYNC only units created/updated since the last
+        sync are downloaded and merged into the local copy.
         """
-        endpoint = (
-            "blood_bank_units?"
-            "select=unit_id,unit_serial_number,blood_collection_id,donor_id,"
+        columns = (
+            "unit_id,unit_serial_number,blood_collection_id,donor_id,"
             "blood_type,collected_at,created_at,status,handed_over_at,expires_at,"
             "disposed_at,disposition_reason,hospital_from,request_id,is_check"
-            "&order=collected_at.asc"
         )
-        return self.supabase_request(endpoint)
-
-    def fetch_blood_requests(self) -> List[Dict]:
+        if DELTA_SYNC:
+            endpoint = f"blood_bank_units?select={columns},updated_at&order=collected_at.asc"
+            return self.delta_sync_request(
+                endpoint, "unit_id", ["created_at", "updated_at"], keyset=keyset
+            )
+        endpoint = f"blood_bank_units?select={columns}&order=collected_at.asc"
+        return self.supabase_request(endpoint, keyset=keyset)
+
+    def fetch_blood_requests(self, keyset: Optional[str] = None) -> List[Dict]:
         """
         Fetch all hospital requests from Supabase.
+        Pass `keyset="request_id"` to page on request_id instead of OFFSET.
+        With SUPABASE_DELTA_SYNC only requests created/updated since the last
+        sync are downloaded and merged into the local copy.
         """
-        endpoint = (
-            "blood_requests?"
-            "select=request_id,user_id,patient_name,patient_age,patient_gender,"
+        columns = (
+            "request_id,user_id,patient_name,patient_age,patient_gender,"
             "patient_diagnosis,patient_blood_type,rh_factor,units_requested,"
             "is_asap,blood_component,hospital_admitted,physician_name,status,"
             "requested_on,approved_date,handed_over_date,decline_reason,"
             "approved_by,handed_over_by"
-            "&order=requested_on.asc"
         )
-        return self.supabase_request(endpoint)
+        if DELTA_SYNC:
+            endpoint = f"blood_requests?select={columns},last_updated&order=requested_on.asc"
+            return self.delta_sync_request(
+                endpoint, "request_id", ["requested_on", "last_updated"], keyset=keyset
+            )
+        endpoint = f"blood_requests?select={columns}&order=requested_on.asc"
+        return self.supabase_request(endpoint, keyset=keyset)
 
     # ------------------------------------------------------------------ #
     # Helpers mirroring R's aggregation logic
@@ -171,89 +648,71 @@ class DatabaseConnection:
         except ValueError:
             return None
 
+    @staticmethod
+    def _as_float(value) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
     def _aggregate_monthly_counts(
         self, records: List[Dict], date_key: str, blood_key: str, value_key: Optional[str] = None
     ) -> Dict[str, Dict[str, Dict[str, float]]]:
-        monthly = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
-
-        for record in records:
-            month_key = self._normalize_month(record.get(date_key))
-            blood_type = record.get(blood_key)
-            if not month_key or not blood_type:
-                continue
-
-            value = record.get(value_key, 1) if value_key else 1
-            try:
-                value = float(value)
-            except (TypeError, ValueError):
-                value = 0.0
-
-            monthly[month_key][blood_type]["count"] += 1
-            monthly[month_key][blood_type]["value"] += value
-
-        return monthly
+        weights = None
+        if value_key:
+            weights = {
+                "value": np.array(
+                    [self._as_float(record.get(value_key, 1)) for record in records],
+                    dtype=float,
+                )
+            }
+        matrix = aggregate_records(records, date_key, blood_key, weights)
+
+        counts = matrix.to_nested_dict("count")
+        values = matrix.to_nested_dict("value") if value_key else counts
+        return {
+            month: {
+                blood_type: {"count": float(count), "value": float(values[month][blood_type])}
+                for blood_type, count in by_type.items()
+            }
+            for month, by_type in counts.items()
+        }
 
     def get_monthly_donations(self) -> List[Dict]:
         """
         Equivalent of R's `df_monthly_donations` using Supabase data.
         """
         blood_units = self.fetch_blood_units()
-        monthly = self._aggregate_monthly_counts(
-            blood_units, date_key="collected_at", blood_key="blood_type"
-        )
-
-        rows: List[Dict] = []
-        for month in sorted(monthly.keys()):
-            for blood_type in BLOOD_TYPES:
-                count = int(monthly[month].get(blood_type, {}).get("count", 0))
-                if count <= 0:
-                    continue
-                rows.append(
-                    {
-                        "month": month,
-                        "blood_type": blood_type,
-                        "units_collected": count,
-                    }
-                )
-        return rows
+        matrix = aggregate_records(blood_units, "collected_at", "blood_type")
+        return matrix.to_rows({"units_collected": "count"}, category_order=BLOOD_TYPES)
 
     def get_monthly_requests(self) -> List[Dict]:
         """
         Equivalent of R's `df_monthly_requests` using Supabase data.
         """
         blood_requests = self.fetch_blood_requests()
-        monthly = defaultdict(lambda: defaultdict(lambda: {"total_requests": 0, "units_requested": 0.0, "asap_requests": 0}))
-
-        for request in blood_requests:
-            month_key = self._normalize_month(request.get("requested_on"))
-            blood_type = request.get("patient_blood_type")
-            if not month_key or not blood_type:
-                continue
-
-            try:
-                units = float(request.get("units_requested", 0) or 0)
-            except (TypeError, ValueError):
-                units = 0.0
-
-            monthly[month_key][blood_type]["total_requests"] += 1
-            monthly[month_key][blood_type]["units_requested"] += units
-            monthly[month_key][blood_type]["asap_requests"] += 1 if request.get("is_asap") else 0
-
-        rows: List[Dict] = []
-        for month in sorted(monthly.keys()):
-            for blood_type in BLOOD_TYPES:
-                metrics = monthly[month].get(blood_type)
-                if not metrics:
-                    continue
-                rows.append(
-                    {
-                        "month": month,
-                        "blood_type": blood_type,
-                        "total_requests": metrics["total_requests"],
-                        "units_requested": int(round(metrics["units_requested"])),
-                        "asap_requests": metrics["asap_requests"],
-                    }
-                )
+        weights = {
+            "units_requested": np.array(
+                [self._as_float(request.get("units_requested", 0) or 0) for request in blood_requests],
+                dtype=float,
+            ),
+            "asap_requests": np.array(
+                [1 if request.get("is_asap") else 0 for request in blood_requests],
+                dtype=np.int64,
+            ),
+        }
+        matrix = aggregate_records(blood_requests, "requested_on", "patient_blood_type", weights)
+
+        rows = matrix.to_rows(
+            {
+                "total_requests": "count",
+                "units_requested": "units_requested",
+                "asap_requests": "asap_requests",
+            },
+            category_order=BLOOD_TYPES,
+        )
+        for row in rows:
+            row["units_requested"] = int(round(row["units_requested"]))
         return rows
 
     def get_structured_datasets(self) -> Tuple[List[Dict], List[Dict]]:
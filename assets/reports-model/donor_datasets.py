@@ -0,0 +1,182 @@
+"""
+Shared donor datasets for the Reports dashboard modules.
+
+The eligibility table is a history table that every donor report reads. It is
+fetched once with the union of the columns those reports need, and the
+latest-record-per-donor indexes are derived once per fetched table, so
+generate_overview_payload no longer downloads it once per chart.
+
+donor_form rows are fetched only for the requested donor ids, pushed down to
+PostgREST as chunked `donor_id=in.(...)` filters run concurrently.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import quote
+
+from config import IN_FILTER_MAX_CHARS, PAGE_FETCH_WORKERS
+from database import DatabaseConnection
+
+
+# Union of the eligibility columns used by the donor report modules
+ELIGIBILITY_ENDPOINT = (
+    "eligibility?"
+    "select=eligibility_id,donor_id,status,blood_type,created_at,end_date"
+    "&order=donor_id.asc,created_at.asc"
+)
+
+# Union of the donor_form columns used by the age/sex/location charts
+DONOR_FORM_COLUMNS = "donor_id,age,birthdate,sex,permanent_address"
+
+
+def _parse_dt(value):
+    if not value:
+        return None
+    try:
+        text = str(value)
+        if "Z" in text:
+            return datetime.fromisoformat(text.replace("Z", "+00:00"))
+        return datetime.fromisoformat(text)
+    except Exception:
+        return None
+
+
+def is_active_status(status: Optional[str]) -> bool:
+    """Active donor definition shared by every report: latest status approved."""
+    status_text = (status or "").lower()
+    return "approved" in status_text or status_text == "eligible"
+
+
+def _latest_per_donor(records: List[Dict]) -> Dict[int, Dict]:
+    """
+    Keep the latest record per donor_id. Records arrive ordered by
+    donor_id, created_at, and a later row only replaces the kept one when its
+    created_at is strictly newer (same rule the report modules used).
+    """
+    latest_by_donor: Dict[int, Dict] = {}
+    created_by_donor: Dict[int, Optional[datetime]] = {}
+    for rec in records:
+        donor_id = rec.get("donor_id")
+        if donor_id is None:
+            continue
+        created = _parse_dt(rec.get("created_at"))
+        if donor_id not in latest_by_donor:
+            latest_by_donor[donor_id] = rec
+            created_by_donor[donor_id] = created
+        else:
+            prev_created = created_by_donor[donor_id]
+            if created and (prev_created is None or created > prev_created):
+                latest_by_donor[donor_id] = rec
+                created_by_donor[donor_id] = created
+    return latest_by_donor
+
+
+class EligibilityDataset:
+    """Eligibility history plus the per-donor indexes derived from it."""
+
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.latest_by_donor = _latest_per_donor(records)
+        # Same universe as the old `blood_type=not.is.null` query
+        self.latest_with_blood_type = _latest_per_donor(
+            [rec for rec in records if rec.get("blood_type") is not None]
+        )
+        self.active_donor_ids: Set[int] = {
+            donor_id
+            for donor_id, rec in self.latest_by_donor.items()
+            if is_active_status(rec.get("status"))
+        }
+
+    def latest_records(self) -> List[Dict]:
+        """Latest eligibility row per donor, as fresh dicts callers may mutate."""
+        return [dict(rec) for rec in self.latest_by_donor.values()]
+
+
+_DATASET: Optional[EligibilityDataset] = None
+
+
+def fetch_eligibility_history() -> List[Dict]:
+    """Fetch the full eligibility history (ordered by donor_id, created_at)."""
+    db = DatabaseConnection()
+    records: List[Dict] = []
+
+    if db.connect():
+        try:
+            records = db.supabase_request(ELIGIBILITY_ENDPOINT)
+        finally:
+            db.disconnect()
+
+    return records
+
+
+def get_eligibility_dataset() -> EligibilityDataset:
+    """
+    Return the shared eligibility dataset. The indexes are rebuilt only when
+    the underlying table list changes (e.g. after the request cache is
+    cleared), so repeated calls within a run are free.
+    """
+    global _DATASET
+    records = fetch_eligibility_history()
+    if _DATASET is None or _DATASET.records is not records:
+        _DATASET = EligibilityDataset(records)
+    return _DATASET
+
+
+def _chunk_ids(donor_ids: Iterable, max_chars: int = IN_FILTER_MAX_CHARS) -> List[str]:
+    """
+    Split ids into comma-joined, URL-encoded lists no longer than max_chars.
+    Ids are sorted so identical id sets produce identical (cacheable) URLs.
+    """
+    encoded = [quote(str(donor_id), safe="") for donor_id in sorted(donor_ids)]
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    for value in encoded:
+        extra = len(value) + (1 if current else 0)
+        if current and length + extra > max_chars:
+            chunks.append(",".join(current))
+            current, length = [], 0
+            extra = len(value)
+        current.append(value)
+        length += extra
+    if current:
+        chunks.append(",".join(current))
+    return chunks
+
+
+def _fetch_donor_form_chunk(id_list: str, columns: str) -> List[Dict]:
+    db = DatabaseConnection()
+    rows: List[Dict] = []
+    if db.connect():
+        try:
+            endpoint = f"donor_form?select={columns}&donor_id=in.({id_list})"
+            rows = db.supabase_request(endpoint, parallel=False)
+        finally:
+            db.disconnect()
+    return rows
+
+
+def fetch_donor_forms_for(
+    donor_ids: Iterable, columns: str = DONOR_FORM_COLUMNS
+) -> List[Dict]:
+    """
+    Fetch donor_form rows for donor_ids only. The ids are pushed down as
+    chunked `donor_id=in.(...)` filters with bounded URL length and the
+    chunks are requested concurrently, so transfer scales with the number
+    of requested donors rather than with every historical registration.
+    """
+    chunks = _chunk_ids(donor_ids)
+    if not chunks:
+        return []
+    if len(chunks) == 1:
+        return list(_fetch_donor_form_chunk(chunks[0], columns))
+
+    rows: List[Dict] = []
+    workers = max(1, min(PAGE_FETCH_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk_rows in executor.map(
+            lambda id_list: _fetch_donor_form_chunk(id_list, columns), chunks
+        ):
+            rows.extend(chunk_rows)
+    return rows
@@ -11,36 +11,60 @@ This module mirrors the original R implementation:
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import partial
 from typing import Dict, Iterable, List, Tuple
 
 import numpy as np
 
-try:
-    from pmdarima import auto_arima
+from config import BATCHED_SCREENING
+from lazy_imports import lazy_module, module_available
+from model_store import load_results, save_results, search_many_stored, series_key
+from parallel_fitting import Selection, map_series
+from stepwise_search import StepwiseSearch
 
-    PMDARIMA_AVAILABLE = True
-except ImportError:  # pragma: no cover - optional dependency
-    PMDARIMA_AVAILABLE = False
-
-try:
-    from statsmodels.tsa.statespace.sarimax import SARIMAX
-
-    SARIMA_AVAILABLE = True
-except ImportError:  # pragma: no cover - optional dependency
-    SARIMA_AVAILABLE = False
+# Optional dependencies, imported on first use (see lazy_imports)
+PMDARIMA_AVAILABLE = module_available("pmdarima")
+SARIMA_AVAILABLE = module_available("statsmodels")
+pmdarima = lazy_module("pmdarima")
 
 MIN_OBSERVATIONS = 6
 SEASONAL_PERIOD = 12
 
-# Candidate SARIMA orders (p, d, q, P, D, Q, s) inspired by the R workflow.
-CANDIDATE_ORDERS: Tuple[Tuple[int, int, int, int, int, int, int], ...] = (
-    (0, 1, 1, 0, 1, 1, SEASONAL_PERIOD),
-    (1, 0, 1, 1, 0, 1, SEASONAL_PERIOD),
-    (1, 1, 1, 1, 1, 1, SEASONAL_PERIOD),
-    (0, 1, 0, 0, 1, 0, SEASONAL_PERIOD),
-    (2, 0, 0, 1, 0, 0, SEASONAL_PERIOD),
-    (0, 0, 1, 0, 0, 1, SEASONAL_PERIOD),
-    (1, 0, 0, 1, 0, 0, SEASONAL_PERIOD),
+# pmdarima.auto_arima settings (mirrors R's auto.arima defaults)
+AUTO_ARIMA_KWARGS = dict(
+    seasonal=True,
+    m=SEASONAL_PERIOD,
+    start_p=0,
+    start_q=0,
+    max_p=3,
+    max_q=3,
+    start_P=0,
+    start_Q=0,
+    max_P=2,
+    max_Q=2,
+    d=None,
+    D=None,
+    stepwise=True,
+    suppress_warnings=True,
+    error_action="ignore",
+    maxiter=75,
+    information_criterion="aicc",
+)
+
+
+# Search used when pmdarima is unavailable: the same stepwise algorithm
+# with the auto_arima settings above (stepwise_search)
+MANUAL_SEARCH = StepwiseSearch(
+    m=SEASONAL_PERIOD,
+    max_p=AUTO_ARIMA_KWARGS["max_p"],
+    max_q=AUTO_ARIMA_KWARGS["max_q"],
+    max_P=AUTO_ARIMA_KWARGS["max_P"],
+    max_Q=AUTO_ARIMA_KWARGS["max_Q"],
+    start_p=AUTO_ARIMA_KWARGS["start_p"],
+    start_q=AUTO_ARIMA_KWARGS["start_q"],
+    start_P=AUTO_ARIMA_KWARGS["start_P"],
+    start_Q=AUTO_ARIMA_KWARGS["start_Q"],
+    approximation=BATCHED_SCREENING,
 )
 
 
@@ -78,7 +102,7 @@ def forecast_supply(df_monthly: Iterable[Dict]) -> List[Dict]:
     Expects rows with keys: month, blood_type, units_collected.
     """
     series = _group_series(df_monthly, value_key="units_collected")
-    return [result.as_supply_row() for result in _run_forecasts(series)]
+    return [result.as_supply_row() for result in _run_forecasts(series, "supply")]
 
 
 def forecast_demand(df_monthly: Iterable[Dict]) -> List[Dict]:
@@ -87,7 +111,42 @@ def forecast_demand(df_monthly: Iterable[Dict]) -> List[Dict]:
     Expects rows with keys: month, blood_type, units_requested.
     """
     series = _group_series(df_monthly, value_key="units_requested")
-    return [result.as_demand_row() for result in _run_forecasts(series)]
+    return [result.as_demand_row() for result in _run_forecasts(series, "demand")]
+
+
+def forecast_paths(
+    series: Dict[str, List[float]], horizon: int, label: str = "series"
+) -> Dict[str, List[float]]:
+    """
+    Multi-step forecasts per series from one fitted model each, like R's
+    `forecast(model, h = horizon)$mean`, instead of re-fitting on previous
+    predictions step by step. Values are rounded and clipped at zero like the
+    one-step forecasts; series shorter than MIN_OBSERVATIONS repeat their last
+    value. Paths are cached by (values, horizon), so charts drawing the same
+    series share one model search. `label` (e.g. "supply") names the series
+    across runs for warm-start refits.
+    """
+    paths: Dict[str, List[float]] = {}
+    pending: Dict[str, List[float]] = {}
+    for bt, values in series.items():
+        if not values:
+            continue
+        cached = _PATH_CACHE.get((tuple(values), horizon))
+        if cached is not None:
+            paths[bt] = list(cached)
+        elif len(values) < MIN_OBSERVATIONS:
+            paths[bt] = [float(values[-1])] * horizon
+        else:
+            pending[bt] = values
+
+    if pending:
+        if len(_PATH_CACHE) + len(pending) > _PATH_CACHE_SIZE:
+            _PATH_CACHE.clear()
+        for bt, path in _search_paths(pending, horizon, label).items():
+            _PATH_CACHE[(tuple(pending[bt]), horizon)] = path
+            paths[bt] = list(path)
+
+    return {bt: paths[bt] for bt in series if bt in paths}
 
 
 # --------------------------------------------------------------------------- #
@@ -121,112 +180,165 @@ def _group_series(df_monthly: Iterable[Dict], value_key: str) -> Dict[str, List[
     return sorted_series
 
 
-def _run_forecasts(series: Dict[str, List[float]]) -> List[ForecastResult]:
+def _run_forecasts(series: Dict[str, List[float]], label: str = "series") -> List[ForecastResult]:
+    """
+    Forecast every blood type. The per-type model searches are independent,
+    so they run on the parallel_fitting process pool when it is enabled:
+    whole auto_arima searches per series, or (blood_type, order) fits for
+    the in-house stepwise search.
+    """
+    lineage = _lineage(series, label)
+    if PMDARIMA_AVAILABLE:
+        results = map_series(
+            _forecast_next_value, series, {bt: (name,) for bt, name in lineage.items()}
+        )
+    else:
+        selections = {}
+        if SARIMA_AVAILABLE:
+            eligible = {
+                bt: _as_series(values)
+                for bt, values in series.items()
+                if len(values) >= MIN_OBSERVATIONS
+            }
+            selections = search_many_stored(eligible, MANUAL_SEARCH, steps=1, lineage=lineage)
+        # The stepwise search already ran for every eligible series; where it
+        # found no model, repeating it would fail again, so the last value is
+        # carried forward as _run_manual_sarima does.
+        results = {
+            bt: _forecast_from_selection(values, selections.get(bt))
+            for bt, values in series.items()
+        }
+
     rows: List[ForecastResult] = []
-    for bt, values in series.items():
-        result = _forecast_next_value(values)
+    for bt in series:
+        result = results[bt]
         if result:
             result.blood_type = bt
             rows.append(result)
     return rows
 
 
-def _forecast_next_value(history: List[float]) -> ForecastResult | None:
+def _forecast_next_value(history: List[float], lineage: str | None = None) -> ForecastResult | None:
     if not history:
         return None
     if len(history) < MIN_OBSERVATIONS:
         last_value = history[-1]
         return ForecastResult("", last_value, last_value)
 
+    return ForecastResult("", history[-1], _run_auto_sarima(history, lineage))
+
+
+def _forecast_from_selection(
+    history: List[float], selection: Selection | None
+) -> ForecastResult | None:
+    """One-step result from a stepwise search that already ran for `history`."""
+    if not history:
+        return None
     last_value = history[-1]
-    forecast_value = _run_auto_sarima(history)
-    return ForecastResult("", last_value, forecast_value)
+    if len(history) < MIN_OBSERVATIONS:
+        return ForecastResult("", last_value, last_value)
+    best_forecast = selection.forecast[0] if selection is not None else float(last_value)
+    return ForecastResult("", last_value, float(max(0.0, round(best_forecast))))
 
 
-def _run_auto_sarima(values: List[float]) -> float:
+def _run_auto_sarima(values: List[float], lineage: str | None = None) -> float:
     """
-    Prefer pmdarima.auto_arima (matches R's auto.arima). Fallback to manual
-    candidate search if pmdarima is unavailable.
+    Prefer pmdarima.auto_arima (matches R's auto.arima). Fallback to the
+    in-house stepwise search if pmdarima is unavailable; `lineage` names the
+    series for its warm-start refits.
     """
     if PMDARIMA_AVAILABLE:
         try:
-            model = auto_arima(
-                values,
-                seasonal=True,
-                m=SEASONAL_PERIOD,
-                start_p=0,
-                start_q=0,
-                max_p=3,
-                max_q=3,
-                start_P=0,
-                start_Q=0,
-                max_P=2,
-                max_Q=2,
-                d=None,
-                D=None,
-                stepwise=True,
-                suppress_warnings=True,
-                error_action="ignore",
-                maxiter=75,
-                information_criterion="aicc",
-            )
-            forecast_value = model.predict(n_periods=1)[0]
+            forecast_value = _auto_arima_results(values).forecast(steps=1)[0]
             return float(max(0.0, round(forecast_value)))
         except Exception:
             # fall through to manual search
             pass
 
-    return _run_manual_sarima(values)
+    return _run_manual_sarima(values, lineage)
+
+
+def _auto_arima_results(values: List[float]):
+    """
+    Fitted statsmodels results of auto_arima's model for `values`. A model
+    stored for the same series and settings is reused without re-running
+    the stepwise search.
+    """
+    key = series_key(values, {"auto_arima": AUTO_ARIMA_KWARGS})
+    results = load_results(key, values)
+    if results is None:
+        model = pmdarima.auto_arima(values, **AUTO_ARIMA_KWARGS)
+        results = model.arima_res_
+        save_results(key, values, results, float(model.aicc()))
+    return results
 
 
-def _run_manual_sarima(values: List[float]) -> float:
+def _run_manual_sarima(values: List[float], lineage: str | None = None) -> float:
     if not SARIMA_AVAILABLE:
         return float(round(values[-1]))
 
-    best_aicc = float("inf")
-    best_forecast = float(values[-1])
+    selection = search_many_stored(
+        {"series": _as_series(values)},
+        MANUAL_SEARCH,
+        steps=1,
+        lineage={"series": lineage} if lineage else None,
+    )["series"]
+    best_forecast = selection.forecast[0] if selection is not None else float(values[-1])
+    return float(max(0.0, round(best_forecast)))
 
-    ts_values = np.array(values, dtype=np.float64)
-    ts_values = np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
 
-    for order_tuple in CANDIDATE_ORDERS:
-        p, d, q, P, D, Q, s = order_tuple
-        try:
-            model = SARIMAX(
-                ts_values,
-                order=(p, d, q),
-                seasonal_order=(P, D, Q, s),
-                enforce_stationarity=False,
-                enforce_invertibility=False,
-            )
-            fitted = model.fit(disp=False, maxiter=50, method="lbfgs")
-            aicc = _calculate_aicc(fitted.aic, _count_params(p, d, q, P, D, Q), len(ts_values))
-
-            if aicc < best_aicc:
-                forecast_result = fitted.forecast(steps=1)
-                if hasattr(forecast_result, "iloc"):
-                    candidate = float(forecast_result.iloc[0])
-                else:
-                    candidate = float(np.array(forecast_result)[0])
-                best_aicc = aicc
-                best_forecast = candidate
-        except Exception:
-            continue
-
-    return float(max(0.0, round(best_forecast)))
+def _lineage(series: Dict[str, List[float]], label: str) -> Dict[str, str]:
+    """Names identifying each series across runs (for warm-start refits)."""
+    return {bt: f"forecast_functions:{label}:{bt}" for bt in series}
 
 
-def _calculate_aicc(aic: float, n_params: int, n_obs: int) -> float:
-    if n_obs <= n_params + 1:
-        return aic
-    correction = (2 * n_params * (n_params + 1)) / (n_obs - n_params - 1)
-    return aic + correction
+def _as_series(values: List[float]) -> np.ndarray:
+    ts_values = np.array(values, dtype=np.float64)
+    return np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
 
 
-def _count_params(p: int, d: int, q: int, P: int, D: int, Q: int) -> int:
-    params = p + q + P + Q
-    if d == 0 and D == 0:
-        params += 1  # constant term
-    return params
+# Forecast paths keyed by (series values, horizon)
+_PATH_CACHE: Dict[Tuple[Tuple[float, ...], int], List[float]] = {}
+_PATH_CACHE_SIZE = 64
 
 
+def _search_paths(
+    series: Dict[str, List[float]], horizon: int, label: str
+) -> Dict[str, List[float]]:
+    lineage = _lineage(series, label)
+    if PMDARIMA_AVAILABLE:
+        return map_series(
+            partial(_auto_sarima_path, horizon=horizon),
+            series,
+            {bt: (name,) for bt, name in lineage.items()},
+        )
+
+    selections = {}
+    if SARIMA_AVAILABLE:
+        eligible = {bt: _as_series(values) for bt, values in series.items()}
+        selections = search_many_stored(eligible, MANUAL_SEARCH, steps=horizon, lineage=lineage)
+    return {
+        bt: _clip_path(selections[bt].forecast if selections.get(bt) else [values[-1]] * horizon)
+        for bt, values in series.items()
+    }
+
+
+def _auto_sarima_path(values: List[float], lineage: str | None = None, horizon: int = 1) -> List[float]:
+    """auto_arima path with the stepwise search as fallback (pool task)."""
+    try:
+        return _clip_path(_auto_arima_results(values).forecast(steps=horizon))
+    except Exception:
+        pass
+    selection = None
+    if SARIMA_AVAILABLE:
+        selection = search_many_stored(
+            {"series": _as_series(values)},
+            MANUAL_SEARCH,
+            steps=horizon,
+            lineage={"series": lineage} if lineage else None,
+        )["series"]
+    return _clip_path(selection.forecast if selection else [values[-1]] * horizon)
+
+
+def _clip_path(values: Iterable[float]) -> List[float]:
+    return [float(max(0.0, round(float(value)))) for value in values]
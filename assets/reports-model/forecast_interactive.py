@@ -9,15 +9,20 @@ Reproduces the per-blood-type interactive dropdown for:
 from __future__ import annotations
 import os
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
-from forecast_functions import _forecast_next_value
+from chart_output import write_figure_html
+from forecast_functions import forecast_paths
 from forecast_workflow import run_forecast_workflow
 
+# The dashboard and forecast-asset.php expect the files next to this script
+OUTPUT_DIR = Path(__file__).resolve().parent
+
 FORECAST_HORIZON = 3
 # Get forecast year from environment variable (defaults to current year if not provided)
 FORECAST_YEAR = int(os.getenv('FORECAST_YEAR', str(datetime.now().year)))
@@ -53,9 +58,10 @@ def _generate_forecast_trace(sub_df: pd.DataFrame, value_col: str, filter_year:
         empty_fc = pd.DataFrame(columns=["month", "forecast"])
         return actual, empty_fc
 
-    # Use ALL historical data (not filtered by year) to generate a true multi-step forecast.
-    # We recursively call the same ARIMA-based helper used elsewhere (`_forecast_next_value`)
-    # so each step is based on all past data plus previously forecast values.
+    # Use ALL historical data (not filtered by year) to generate a true multi-step forecast:
+    # one fitted model per series, asked for all FORECAST_HORIZON steps at once
+    # (R: forecast(model, h = 3)). Paths are cached, so the supply, demand and
+    # combined charts share one model search per series.
     history = sub_df["value"].tolist()
     if not history:
         # No data at all; nothing to forecast
@@ -63,17 +69,10 @@ def _generate_forecast_trace(sub_df: pd.DataFrame, value_col: str, filter_year:
             return sub_df[sub_df["month"].dt.year == filter_year].copy(), pd.DataFrame()
         return sub_df.copy(), pd.DataFrame()
 
-    forecast_values: List[float] = []
-    rolling_history = list(history)
-    for _ in range(FORECAST_HORIZON):
-        result = _forecast_next_value(rolling_history)
-        if result is None:
-            # Fallback: repeat last known value
-            next_val = float(rolling_history[-1])
-        else:
-            next_val = float(result.forecast_value)
-        forecast_values.append(next_val)
-        rolling_history.append(next_val)
+    forecast_values = forecast_paths({"series": history}, FORECAST_HORIZON).get("series")
+    if not forecast_values:
+        # Fallback: repeat last known value
+        forecast_values = [float(history[-1])] * FORECAST_HORIZON
 
     last_month = sub_df["month"].max()
     forecast_months = _next_month_sequence(last_month, FORECAST_HORIZON)
@@ -276,6 +275,11 @@ def generate_interactive_plots(workflow_results: Optional[Dict] = None, filter_y
     supply_series = _prepare_series(donations_df, "units_collected")
     demand_series = _prepare_series(requests_df, "units_requested")
 
+    # Fit every supply and demand series once, up front (in parallel when
+    # enabled); the traces below read the cached forecast paths.
+    forecast_paths({bt: df["value"].tolist() for bt, df in supply_series.items()}, FORECAST_HORIZON, "supply")
+    forecast_paths({bt: df["value"].tolist() for bt, df in demand_series.items()}, FORECAST_HORIZON, "demand")
+
     # Use filter_year if provided, otherwise None (shows all data from start)
     display_year = filter_year if filter_year else None
 
@@ -316,9 +320,9 @@ def generate_interactive_plots(workflow_results: Optional[Dict] = None, filter_y
         yaxis_title="Blood Units",
     )
 
-    fig_supply.write_html("interactive_supply.html")
-    fig_demand.write_html("interactive_demand.html")
-    fig_combined.write_html("interactive_combined.html")
+    write_figure_html(fig_supply, OUTPUT_DIR / "interactive_supply.html")
+    write_figure_html(fig_demand, OUTPUT_DIR / "interactive_demand.html")
+    write_figure_html(fig_combined, OUTPUT_DIR / "interactive_combined.html")
 
     print("Interactive plots saved as HTML files.")
 
@@ -3,12 +3,12 @@ Forecasting functions using SARIMA models (matching R's auto.arima)
 """
 
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
-from config import BLOOD_TYPES, SARIMA_AVAILABLE
-
-if SARIMA_AVAILABLE:
-    from statsmodels.tsa.statespace.sarimax import SARIMAX
+from config import BATCHED_SCREENING, BLOOD_TYPES, SARIMA_AVAILABLE
+from model_store import search_many_stored
+from parallel_fitting import Selection
+from stepwise_search import StepwiseSearch, stepwise_many
 
 
 def calculate_aicc(aic: float, n_params: int, n_obs: int) -> float:
@@ -32,15 +32,49 @@ def count_sarima_params(p: int, d: int, q: int, P: int, D: int, Q: int,
     return params
 
 
-def forecast_multi_step(df_monthly_data: List[Dict], months_ahead: int) -> Dict[str, float]:
+# Order selection as R's auto.arima does it: d and D from KPSS/OCSB tests,
+# then a stepwise walk over p, q, P, Q (see stepwise_search)
+ORDER_SEARCH = StepwiseSearch(approximation=BATCHED_SCREENING)
+
+# Selected multi-step models keyed by the series values, so asking for
+# horizons 1, 2, 3 ... of the same data reuses one model search.
+_MULTI_STEP_MODELS: Dict[Tuple[float, ...], Optional[Selection]] = {}
+_MULTI_STEP_CACHE_SIZE = 64
+
+
+def _select_multi_step_models(values_by_type: Dict[str, List[float]]) -> Dict[str, Optional[Selection]]:
+    """Best-AICc model per blood type, searching only series not seen before."""
+    keys = {bt: tuple(float(v) for v in values) for bt, values in values_by_type.items()}
+    missing = {}
+    for bt, key in keys.items():
+        if key not in _MULTI_STEP_MODELS:
+            ts_values = np.array(key, dtype=np.float64)
+            if np.any(~np.isfinite(ts_values)):
+                ts_values = np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
+            missing[bt] = ts_values
+    
+    if missing:
+        selections = stepwise_many(missing, ORDER_SEARCH, steps=1)
+        if len(_MULTI_STEP_MODELS) + len(selections) > _MULTI_STEP_CACHE_SIZE:
+            _MULTI_STEP_MODELS.clear()
+        for bt, selection in selections.items():
+            _MULTI_STEP_MODELS[keys[bt]] = selection
+    
+    return {bt: _MULTI_STEP_MODELS.get(key) for bt, key in keys.items()}
+
+
+def forecast_all_horizons(df_monthly_data: List[Dict], horizon: int) -> Dict[str, List[int]]:
     """
-    Generate multi-step ahead forecasts for a specific horizon (matching R's New code.R)
+    Forecasts for horizons 1..horizon per blood type from one fitted model
+    (matching R's New code.R):
     R code: fc <- forecast(model, h = 3); fc_df$forecast = as.numeric(fc$mean)
-    Returns a dict mapping blood_type -> forecast_value for the specified months_ahead
+    The best-AICc model is selected and fitted once per blood type and the
+    whole forecast(steps=horizon) vector is returned, rounded to whole units.
+    Returns a dict mapping blood_type -> [forecast_1, ..., forecast_horizon]
     """
     forecasts = {}
     
-    if not df_monthly_data or months_ahead < 1:
+    if not df_monthly_data or horizon < 1:
         return forecasts
     
     # Group by blood type
@@ -48,70 +82,56 @@ def forecast_multi_step(df_monthly_data: List[Dict], months_ahead: int) -> Dict[
     for item in df_monthly_data:
         data_by_blood_type[item['blood_type']].append(item)
     
+    values_by_type = {}
     for bt in BLOOD_TYPES:
         data_bt = sorted(data_by_blood_type.get(bt, []), key=lambda x: x['month'])
-        
-        if len(data_bt) < 6:
+        if len(data_bt) >= 6:
+            values_by_type[bt] = [item['value'] for item in data_bt]
+    
+    selections = {}
+    if SARIMA_AVAILABLE:
+        try:
+            selections = _select_multi_step_models(values_by_type)
+        except Exception:
+            selections = {}
+    
+    for bt, values in values_by_type.items():
+        # Fallback: use mean
+        fallback = [round(np.mean(values)) if values else 0] * horizon
+        selection = selections.get(bt)
+        if selection is None:
+            forecasts[bt] = fallback
             continue
-        
-        values = [item['value'] for item in data_bt]
-        
         try:
-            if SARIMA_AVAILABLE:
-                ts_values = np.array(values, dtype=np.float64)
-                if np.any(~np.isfinite(ts_values)):
-                    ts_values = np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
-                
-                # Fit model and generate multi-step forecast (like R: forecast(model, h = months_ahead))
-                best_aicc = float('inf')
-                best_forecast_value = None
-                
-                # Try common models first
-                common_orders = [
-                    (0, 1, 1, 0, 1, 1, 12), (1, 0, 1, 1, 0, 1, 12), (1, 1, 1, 1, 1, 1, 12),
-                    (0, 1, 0, 0, 1, 0, 12), (2, 0, 0, 1, 0, 0, 12), (0, 0, 1, 0, 0, 1, 12),
-                    (1, 0, 0, 1, 0, 0, 12), (0, 1, 2, 0, 1, 1, 12), (2, 1, 0, 1, 1, 0, 12),
-                    (1, 1, 0, 1, 1, 0, 12), (0, 1, 1, 0, 0, 0, 12), (1, 1, 0, 0, 0, 0, 12),
-                ]
-                
-                for order_tuple in common_orders:
-                    try:
-                        p, d, q, P, D, Q, s = order_tuple
-                        model = SARIMAX(ts_values, order=(p, d, q), seasonal_order=(P, D, Q, s),
-                                      enforce_stationarity=False, enforce_invertibility=False)
-                        fitted_model = model.fit(disp=False, maxiter=50, method='lbfgs')
-                        
-                        n_params = count_sarima_params(p, d, q, P, D, Q)
-                        aic = fitted_model.aic
-                        aicc = calculate_aicc(aic, n_params, len(values))
-                        
-                        if aicc < best_aicc:
-                            best_aicc = aicc
-                            # EXACT R: forecast(model, h = months_ahead)$mean[months_ahead]
-                            forecast_result = fitted_model.forecast(steps=months_ahead)
-                            # Extract the forecast for the specific months_ahead step
-                            if hasattr(forecast_result, 'iloc'):
-                                best_forecast_value = float(forecast_result.iloc[months_ahead - 1])
-                            else:
-                                forecast_array = np.array(forecast_result)
-                                best_forecast_value = float(forecast_array[months_ahead - 1] if len(forecast_array) >= months_ahead else forecast_array[-1])
-                    except Exception:
-                        continue
-                
-                if best_forecast_value is not None:
-                    forecasts[bt] = round(best_forecast_value)  # Round to whole number (blood units are discrete)
-                else:
-                    # Fallback: use mean
-                    forecasts[bt] = round(np.mean(values)) if values else 0
-            else:
-                forecasts[bt] = round(np.mean(values)) if values else 0
+            # EXACT R: forecast(model, h = horizon)$mean
+            forecast_array = np.asarray(selection.fitted().forecast(steps=horizon), dtype=np.float64)
+            # Round to whole number (blood units are discrete)
+            forecasts[bt] = [round(float(value)) for value in forecast_array[:horizon]]
         except Exception:
-            forecasts[bt] = round(np.mean(values)) if values else 0
+            forecasts[bt] = fallback
     
     return forecasts
 
 
-def forecast_next_month_per_type(df_monthly_data: List[Dict], forecast_horizon: int = 1) -> List[Dict]:
+def forecast_multi_step(df_monthly_data: List[Dict], months_ahead: int) -> Dict[str, float]:
+    """
+    Generate multi-step ahead forecasts for a specific horizon (matching R's New code.R)
+    R code: fc <- forecast(model, h = 3); fc_df$forecast = as.numeric(fc$mean)
+    Returns a dict mapping blood_type -> forecast_value for the specified months_ahead
+    Uses forecast_all_horizons; the selected models are reused across calls,
+    so asking for several horizons of the same data costs one model search.
+    """
+    if not df_monthly_data or months_ahead < 1:
+        return {}
+    
+    return {
+        bt: values[months_ahead - 1]
+        for bt, values in forecast_all_horizons(df_monthly_data, months_ahead).items()
+    }
+
+
+def forecast_next_month_per_type(df_monthly_data: List[Dict], forecast_horizon: int = 1,
+                                 series_label: Optional[str] = None) -> List[Dict]:
     """
     EXACT 1:1 translation from R: Blood Supply Forecast.R / Blood Demand Forecast.R
     Enhanced to match R's auto.arima behavior more closely
@@ -134,18 +154,48 @@ def forecast_next_month_per_type(df_monthly_data: List[Dict], forecast_horizon:
     for item in df_monthly_data:
         data_by_blood_type[item['blood_type']].append(item)
     
+    # Get pre-grouped values sorted by month (R: filter + arrange)
+    values_by_type = {
+        bt: [item['value'] for item in sorted(data_by_blood_type.get(bt, []), key=lambda x: x['month'])]
+        for bt in blood_types
+    }
+    
+    # EXACT R logic: ts_bt <- ts(data_bt$units_collected, frequency = 12); model <- auto.arima(ts_bt)
+    # Model searches for every blood type run together (in parallel when enabled)
+    selections = {}
+    search_failed = False
+    if SARIMA_AVAILABLE:
+        try:
+            # Ensure no NaN or infinite values
+            series = {
+                bt: np.nan_to_num(np.array(values, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+                for bt, values in values_by_type.items()
+                if len(values) >= 6
+            }
+            # Unchanged series reuse their stored model; changed ones are
+            # warm-started from the previous winner when enabled (model_store)
+            # (only for labelled data: unlabelled series cannot be told apart)
+            lineage = None
+            if series_label:
+                lineage = {bt: f"forecasting:{series_label}:{bt}" for bt in series}
+            selections = search_many_stored(series, ORDER_SEARCH, steps=forecast_horizon,
+                                             lineage=lineage)
+        except Exception as e:
+            # If SARIMA fails, use mean of recent values
+            import sys
+            print(f"SARIMA model search failed: {e}. Using fallback.", file=sys.stderr)
+            search_failed = True
+    
     for bt in blood_types:
-        # Get pre-grouped data and sort by month (R: filter + arrange)
-        data_bt = sorted(data_by_blood_type.get(bt, []), key=lambda x: x['month'])
+        values = values_by_type[bt]
         
         # FIXED: Handle short series (< 6 months) with fallback instead of skipping
         # R's auto.arima can work with shorter series, but we need at least 2 months
-        if len(data_bt) < 2:
+        if len(values) < 2:
             # Not enough data - use 0 or mean if available
             continue
-        elif len(data_bt) < 6:
+        elif len(values) < 6:
             # Short series: use simple forecast (mean or last value)
-            values = [item['value'] for item in data_bt]
             actual_last = values[-1] if values else 0
             mean_value = np.mean(values) if values else 0
             
@@ -160,145 +210,22 @@ def forecast_next_month_per_type(df_monthly_data: List[Dict], forecast_horizon:
             })
             continue
         
-        # Get values (optimized list comprehension)
-        values = [item['value'] for item in data_bt]
-        n_obs = len(values)
-        
         # EXACT R logic: actual_last <- tail(data_bt$units_collected, 1)
         actual_last = values[-1] if values else 0
         
-        try:
-            if SARIMA_AVAILABLE:
-                # EXACT R logic: ts_bt <- ts(data_bt$units_collected, frequency = 12)
-                ts_values = np.array(values, dtype=np.float64)
-                
-                # Ensure no NaN or infinite values
-                if np.any(~np.isfinite(ts_values)):
-                    ts_values = np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
-                
-                # EXACT R logic: model <- auto.arima(ts_bt)
-                best_aicc = float('inf')
-                best_forecast = None
-                
-                # EXPANDED: Comprehensive model search matching R's auto.arima
-                # R's auto.arima tests many more models - we need to match that
-                # Phase 1: Priority models (most common patterns)
-                priority_orders = [
-                    (0, 1, 1, 0, 1, 1, 12),  # Most common - seasonal naive
-                    (1, 0, 1, 1, 0, 1, 12),  # Common seasonal pattern
-                    (1, 1, 1, 1, 1, 1, 12),  # Full SARIMA model
-                    (0, 1, 0, 0, 1, 0, 12),  # Seasonal random walk
-                    (2, 0, 0, 1, 0, 0, 12),  # AR(2) with seasonal AR(1)
-                    (0, 0, 1, 0, 0, 1, 12),  # Simple MA models
-                    (1, 0, 0, 1, 0, 0, 12),  # Simple AR models
-                ]
-                
-                # Phase 2: Extended model set (comprehensive search like R's auto.arima)
-                # R's auto.arima can test 50+ model combinations
-                extended_orders = [
-                    # Basic models
-                    (0, 0, 1, 0, 0, 1, 12),  # MA models
-                    (1, 0, 0, 1, 0, 0, 12),  # AR models
-                    (0, 0, 2, 0, 0, 1, 12),  # MA(2) seasonal
-                    (2, 0, 0, 1, 0, 0, 12),  # AR(2) seasonal
-                    (0, 0, 1, 0, 0, 2, 12),  # Seasonal MA(2)
-                    (1, 0, 0, 2, 0, 0, 12),  # Seasonal AR(2)
-                    
-                    # Differencing models
-                    (0, 1, 0, 0, 1, 0, 12),  # Seasonal random walk
-                    (0, 1, 1, 0, 0, 0, 12),  # Non-seasonal IMA
-                    (0, 1, 2, 0, 1, 1, 12),  # Higher order MA with differencing
-                    (1, 1, 0, 0, 0, 0, 12),  # Non-seasonal ARIMA
-                    (1, 1, 0, 1, 1, 0, 12),  # AR with differencing
-                    (2, 1, 0, 1, 1, 0, 12),  # Higher order AR with differencing
-                    (0, 1, 1, 0, 1, 1, 12),  # Seasonal IMA
-                    (0, 2, 1, 0, 1, 1, 12),  # Double differencing
-                    
-                    # Mixed models
-                    (1, 1, 1, 0, 1, 1, 12),  # Full model without seasonal AR
-                    (0, 1, 1, 1, 1, 1, 12),  # Full model without AR
-                    (1, 1, 2, 0, 1, 1, 12),  # MA(2) variant
-                    (2, 1, 1, 1, 1, 1, 12),  # Higher order full model
-                    (1, 0, 2, 1, 0, 1, 12),  # MA(2) without differencing
-                    (2, 0, 1, 1, 0, 1, 12),  # AR(2) with MA
-                    (1, 1, 0, 1, 1, 0, 12),  # AR with differencing
-                    (0, 1, 2, 1, 1, 1, 12),  # MA(2) with seasonal differencing
-                    
-                    # Additional stable models for flat data
-                    (0, 0, 0, 0, 0, 0, 12),  # White noise (for very stable data)
-                    (1, 0, 0, 0, 0, 0, 12),  # AR(1) only
-                    (0, 0, 1, 0, 0, 0, 12),  # MA(1) only
-                    (0, 0, 0, 1, 0, 0, 12),  # Seasonal AR(1) only
-                    (0, 0, 0, 0, 0, 1, 12),  # Seasonal MA(1) only
-                ]
-                
-                # Try priority models first
-                for order_tuple in priority_orders:
-                    try:
-                        p, d, q, P, D, Q, s = order_tuple
-                        model = SARIMAX(ts_values, order=(p, d, q), seasonal_order=(P, D, Q, s),
-                                      enforce_stationarity=False, enforce_invertibility=False)
-                        # Increased maxiter for better convergence (matching R's default)
-                        fitted_model = model.fit(disp=False, maxiter=50, method='lbfgs')
-                        
-                        n_params = count_sarima_params(p, d, q, P, D, Q)
-                        aic = fitted_model.aic
-                        aicc = calculate_aicc(aic, n_params, n_obs)
-                        
-                        if aicc < best_aicc:
-                            best_aicc = aicc
-                            forecast_result = fitted_model.forecast(steps=forecast_horizon)
-                            best_forecast = float(forecast_result.iloc[0] if hasattr(forecast_result, 'iloc') else forecast_result[0])
-                            
-                            # R's auto.arima doesn't stop early - test all models
-                            # Only stop early for exceptional fits to save time
-                            if aicc < 30 and n_obs > 24:
-                                break
-                    except Exception:
-                        continue
-                
-                # Try extended models if no excellent model found
-                if best_aicc > 100 or best_forecast is None:
-                    for order_tuple in extended_orders:
-                        try:
-                            p, d, q, P, D, Q, s = order_tuple
-                            model = SARIMAX(ts_values, order=(p, d, q), seasonal_order=(P, D, Q, s),
-                                          enforce_stationarity=False, enforce_invertibility=False)
-                            fitted_model = model.fit(disp=False, maxiter=50, method='lbfgs')
-                            
-                            n_params = count_sarima_params(p, d, q, P, D, Q)
-                            aic = fitted_model.aic
-                            aicc = calculate_aicc(aic, n_params, n_obs)
-                            
-                            if aicc < best_aicc:
-                                best_aicc = aicc
-                                forecast_result = fitted_model.forecast(steps=forecast_horizon)
-                                best_forecast = float(forecast_result.iloc[0] if hasattr(forecast_result, 'iloc') else forecast_result[0])
-                                
-                                # R's auto.arima doesn't stop early - test all models
-                                if aicc < 30 and n_obs > 24:
-                                    break
-                        except Exception:
-                            continue
-                
-                if best_forecast is not None:
-                    forecast_val = best_forecast
-                else:
-                    # Fallback: use weighted average of recent values
-                    if len(values) >= 6:
-                        weights = np.linspace(0.5, 1.0, len(values[-6:]))
-                        forecast_val = np.average(values[-6:], weights=weights)
-                    else:
-                        forecast_val = sum(values) / len(values) if values else 0
+        if search_failed:
+            forecast_val = sum(values[-12:]) / len(values[-12:])
+        elif SARIMA_AVAILABLE:
+            selection = selections.get(bt)
+            if selection is not None:
+                forecast_val = selection.forecast[0]
             else:
-                # Fallback if statsmodels not available - use simple average
-                forecast_val = sum(values) / len(values) if values else 0
-                
-        except Exception as e:
-            # If SARIMA fails, use mean of recent values
-            import sys
-            print(f"SARIMA forecast failed for {bt}: {e}. Using fallback.", file=sys.stderr)
-            forecast_val = sum(values[-12:]) / len(values[-12:]) if len(values) >= 12 else (sum(values) / len(values) if values else 0)
+                # Fallback: use weighted average of recent values
+                weights = np.linspace(0.5, 1.0, len(values[-6:]))
+                forecast_val = np.average(values[-6:], weights=weights)
+        else:
+            # Fallback if statsmodels not available - use simple average
+            forecast_val = sum(values) / len(values) if values else 0
         
         # Round to whole numbers (blood units are discrete, not fractional)
         forecast_val = round(forecast_val)
@@ -319,4 +246,3 @@ def forecast_next_month_per_type(df_monthly_data: List[Dict], forecast_horizon:
         })
     
     return results
-
@@ -6,18 +6,44 @@ Fits models once and reuses them for all forecast horizons
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
-from config import BLOOD_TYPES, SARIMA_AVAILABLE
+from config import BATCHED_SCREENING, BLOOD_TYPES, SARIMA_AVAILABLE
+from model_store import search_many_stored
+from stepwise_search import StepwiseSearch
 
-if SARIMA_AVAILABLE:
-    from statsmodels.tsa.statespace.sarimax import SARIMAX
 
-from forecasting import calculate_aicc, count_sarima_params
+# Order selection as R's auto.arima does it: d and D from KPSS/OCSB tests
+# (so seasonality is only modelled when the data supports it), then a
+# stepwise walk over p, q, P, Q (see stepwise_search)
+ORDER_SEARCH = StepwiseSearch(approximation=BATCHED_SCREENING)
 
 
-def fit_and_cache_models(df_monthly_data: List[Dict]) -> Dict[str, any]:
+def _fallback_model(values: List[float]) -> Dict:
+    """Seasonal naive fallback (R's behavior when auto.arima fails)."""
+    try:
+        if len(values) >= 13:
+            forecast_val = values[-12]  # Seasonal naive
+        elif len(values) >= 6:
+            forecast_val = np.mean(values[-6:])
+        elif values:
+            forecast_val = np.mean(values)
+        else:
+            forecast_val = 0.0
+        return {'fallback_value': forecast_val, 'is_fallback': True}
+    except Exception:
+        # Final fallback: use zero
+        return {'fallback_value': 0.0, 'is_fallback': True}
+
+
+def fit_and_cache_models(df_monthly_data: List[Dict], series_label: Optional[str] = None) -> Dict[str, any]:
     """
     Fit SARIMA models once per blood type and cache them
     Returns dict: {blood_type: fitted_model}
+    The stepwise order searches for all blood types run together on the process pool
+    when parallel fitting is enabled (see parallel_fitting); series unchanged
+    since a previous run reuse their stored model (see model_store), and with
+    warm starts enabled changed series are refitted from the previous winner
+    (`series_label`, e.g. "supply", names the data across runs; unlabelled
+    data is never warm-started, since it cannot be told apart).
     """
     cached_models = {}
     
@@ -29,182 +55,37 @@ def fit_and_cache_models(df_monthly_data: List[Dict]) -> Dict[str, any]:
     for item in df_monthly_data:
         data_by_blood_type[item['blood_type']].append(item)
     
+    values_by_type = {}
     for bt in BLOOD_TYPES:
         data_bt = sorted(data_by_blood_type.get(bt, []), key=lambda x: x['month'])
-        
-        if len(data_bt) < 6:
-            continue
-        
-        values = [item['value'] for item in data_bt]
-        forecast_val = 0.0  # Initialize fallback value
-        
-        if SARIMA_AVAILABLE:
-            try:
-                ts_values = np.array(values, dtype=np.float64)
-                if np.any(~np.isfinite(ts_values)):
-                    ts_values = np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
-                
-                # IMPROVEMENT 4: Detect seasonal strength to avoid overfitting weak seasonality
-                # Seasonality must NOT be assumed for blood inventory
-                seasonal_strength = 0.0
-                if len(values) >= 24:  # Need at least 2 years to detect seasonality
-                    # Calculate seasonal strength using variance decomposition
-                    # Strong seasonality if seasonal variance > 30% of total variance
-                    monthly_means = []
-                    for month in range(12):
-                        month_values = [values[i] for i in range(month, len(values), 12)]
-                        if month_values:
-                            monthly_means.append(np.mean(month_values))
-                    
-                    if len(monthly_means) >= 2:
-                        seasonal_variance = np.var(monthly_means) if len(monthly_means) > 1 else 0
-                        total_variance = np.var(values) if len(values) > 1 else 1.0
-                        seasonal_strength = seasonal_variance / total_variance if total_variance > 0 else 0.0
-                
-                # IMPROVED: Comprehensive model search matching R's auto.arima behavior
-                best_aicc = float('inf')
-                best_model = None
-                
-                # EXPANDED: Comprehensive model search matching R's auto.arima
-                # R's auto.arima tests many more models - we need to match that
-                # Phase 1: Priority models (most common patterns) - try these first
-                priority_orders = [
-                    (0, 1, 1, 0, 1, 1, 12),  # Seasonal naive - most common
-                    (1, 0, 1, 1, 0, 1, 12),  # Common seasonal pattern
-                    (1, 1, 1, 1, 1, 1, 12),  # Full SARIMA model
-                    (0, 1, 0, 0, 1, 0, 12),  # Seasonal random walk
-                    (2, 0, 0, 1, 0, 0, 12),  # AR(2) with seasonal AR(1)
-                    (0, 0, 1, 0, 0, 1, 12),  # Simple MA models
-                    (1, 0, 0, 1, 0, 0, 12),  # Simple AR models
-                ]
-                
-                # Phase 2: Automatic model generation (like R's auto.arima)
-                # Generate 144 models: p(0-2), d(0-1), q(0-2), P(0-1), D(0-1), Q(0-1), s=12
-                # This matches R's comprehensive search (50-200 models)
-                extended_orders = []
-                for p in range(0, 3):  # AR order: 0-2
-                    for d in range(0, 2):  # Differencing: 0-1
-                        for q in range(0, 3):  # MA order: 0-2
-                            for P in range(0, 2):  # Seasonal AR: 0-1
-                                for D in range(0, 2):  # Seasonal differencing: 0-1
-                                    for Q in range(0, 2):  # Seasonal MA: 0-1
-                                        # Skip models that are too complex for small datasets
-                                        total_params = p + d + q + P + D + Q
-                                        if len(values) < 24 and total_params > 4:
-                                            continue
-                                        # Skip if no seasonality and seasonal params are set
-                                        if len(values) < 12 and (P > 0 or D > 0 or Q > 0):
-                                            continue
-                                        # IMPROVEMENT 4: Skip seasonal models if seasonality is weak
-                                        # If seasonal strength < 0.3 (30%), prefer non-seasonal models
-                                        if seasonal_strength < 0.3 and (P > 0 or D > 0 or Q > 0):
-                                            # Still include but with lower priority (add to end)
-                                            extended_orders.append((p, d, q, P, D, Q, 12))
-                                        else:
-                                            # Strong seasonality or non-seasonal model - add normally
-                                            extended_orders.append((p, d, q, P, D, Q, 12))
-                
-                # Phase 3: Additional stable models for flat/weak seasonal data
-                stable_models = [
-                    (0, 0, 0, 0, 0, 0, 12),  # White noise
-                    (1, 0, 0, 0, 0, 0, 12),  # AR(1) only
-                    (0, 0, 1, 0, 0, 0, 12),  # MA(1) only
-                    (2, 0, 0, 0, 0, 0, 12),  # AR(2) only
-                    (0, 0, 2, 0, 0, 0, 12),  # MA(2) only
-                    (1, 1, 0, 0, 0, 0, 12),  # ARIMA(1,1,0)
-                    (0, 1, 1, 0, 0, 0, 12),  # ARIMA(0,1,1)
-                ]
-                extended_orders.extend(stable_models)
-                
-                # Try priority models first
-                for order_tuple in priority_orders:
-                    try:
-                        p, d, q, P, D, Q, s = order_tuple
-                        model = SARIMAX(ts_values, order=(p, d, q), seasonal_order=(P, D, Q, s),
-                                      enforce_stationarity=False, enforce_invertibility=False)
-                        # Increased maxiter for better convergence (matching R's default)
-                        fitted_model = model.fit(disp=False, maxiter=50, method='lbfgs')
-                        
-                        n_params = count_sarima_params(p, d, q, P, D, Q)
-                        aic = fitted_model.aic
-                        aicc = calculate_aicc(aic, n_params, len(values))
-                        
-                        if aicc < best_aicc:
-                            best_aicc = aicc
-                            best_model = fitted_model
-                            
-                            # Relaxed early stopping: only stop if we found an excellent model
-                            # R's auto.arima doesn't stop early, but we can for very good fits
-                            if aicc < 50 and len(values) > 12:  # Only for excellent fits with enough data
-                                break
-                    except Exception:
-                        continue
-                
-                # If no excellent model found, try extended set
-                # R's auto.arima tests ALL models, not just when AICc > 100
-                # We test extended set if we haven't found a very good model yet
-                if best_aicc > 200 or best_model is None:
-                    for order_tuple in extended_orders:
-                        try:
-                            p, d, q, P, D, Q, s = order_tuple
-                            model = SARIMAX(ts_values, order=(p, d, q), seasonal_order=(P, D, Q, s),
-                                          enforce_stationarity=False, enforce_invertibility=False)
-                            fitted_model = model.fit(disp=False, maxiter=50, method='lbfgs')
-                            
-                            n_params = count_sarima_params(p, d, q, P, D, Q)
-                            aic = fitted_model.aic
-                            aicc = calculate_aicc(aic, n_params, len(values))
-                            
-                            if aicc < best_aicc:
-                                best_aicc = aicc
-                                best_model = fitted_model
-                                
-                                # R's auto.arima doesn't stop early - test all models
-                                # Only stop early for exceptional fits
-                                if aicc < 30 and len(values) > 24:
-                                    break
-                        except Exception:
-                            continue
-                
-                if best_model is not None:
-                    cached_models[bt] = best_model
-                else:
-                    # Fallback: use simple seasonal naive if no model found
-                    # This matches R's behavior when auto.arima fails
-                    if len(values) >= 13:
-                        forecast_val = values[-12]  # Seasonal naive
-                    elif len(values) >= 6:
-                        forecast_val = np.mean(values[-6:])
-                    else:
-                        forecast_val = np.mean(values) if values else 0
-                    cached_models[bt] = {'fallback_value': forecast_val, 'is_fallback': True}
-            except Exception as e:
-                # If all models fail, use seasonal naive fallback
-                try:
-                    if len(values) >= 13:
-                        forecast_val = values[-12]  # Seasonal naive
-                    elif len(values) >= 6:
-                        forecast_val = np.mean(values[-6:])
-                    elif values:
-                        forecast_val = np.mean(values)
-                    else:
-                        forecast_val = 0.0
-                    cached_models[bt] = {'fallback_value': forecast_val, 'is_fallback': True}
-                except Exception:
-                    # Final fallback: use zero
-                    cached_models[bt] = {'fallback_value': 0.0, 'is_fallback': True}
-        else:
-            # SARIMA not available - use seasonal naive fallback
-            try:
-                if len(values) >= 13:
-                    forecast_val = values[-12]  # Seasonal naive
-                elif len(values) >= 6:
-                    forecast_val = np.mean(values[-6:])
-                else:
-                    forecast_val = np.mean(values) if values else 0
-                cached_models[bt] = {'fallback_value': forecast_val, 'is_fallback': True}
-            except Exception:
-                cached_models[bt] = {'fallback_value': 0.0, 'is_fallback': True}
+        if len(data_bt) >= 6:
+            values_by_type[bt] = [item['value'] for item in data_bt]
+    
+    if not SARIMA_AVAILABLE:
+        # SARIMA not available - use seasonal naive fallback
+        return {bt: _fallback_model(values) for bt, values in values_by_type.items()}
+    
+    try:
+        series = {}
+        for bt, values in values_by_type.items():
+            ts_values = np.array(values, dtype=np.float64)
+            if np.any(~np.isfinite(ts_values)):
+                ts_values = np.nan_to_num(ts_values, nan=0.0, posinf=0.0, neginf=0.0)
+            series[bt] = ts_values
+        lineage = None
+        if series_label:
+            lineage = {bt: f"forecasting_optimized:{series_label}:{bt}" for bt in series}
+        selections = search_many_stored(series, ORDER_SEARCH, lineage=lineage)
+    except Exception:
+        # If all models fail, use seasonal naive fallback
+        return {bt: _fallback_model(values) for bt, values in values_by_type.items()}
+    
+    for bt, values in values_by_type.items():
+        selection = selections.get(bt)
+        try:
+            cached_models[bt] = selection.fitted() if selection is not None else _fallback_model(values)
+        except Exception:
+            cached_models[bt] = _fallback_model(values)
     
     return cached_models
 
@@ -402,10 +283,12 @@ def generate_all_forecasts(cached_models: Dict[str, any], max_horizon: int,
 
 
 def forecast_multi_step_optimized(df_monthly_data: List[Dict], months_ahead: int, 
-                                   cached_models: Optional[Dict] = None) -> Dict[str, float]:
+                                   cached_models: Optional[Dict] = None,
+                                   series_label: Optional[str] = None) -> Dict[str, float]:
     """
     OPTIMIZED: Generate multi-step ahead forecasts using cached models
     If cached_models not provided, fits models once and caches them
+    (`series_label`, e.g. "supply" or "demand", as for fit_and_cache_models)
     """
     forecasts = {}
     
@@ -414,7 +297,7 @@ def forecast_multi_step_optimized(df_monthly_data: List[Dict], months_ahead: int
     
     # If no cached models, fit them once
     if cached_models is None:
-        cached_models = fit_and_cache_models(df_monthly_data)
+        cached_models = fit_and_cache_models(df_monthly_data, series_label)
     
     # Generate forecast for the specific months_ahead using cached model
     for bt, model in cached_models.items():
@@ -2,92 +2,64 @@
 KPI calculations and data aggregations
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List
-from collections import defaultdict
+
+import numpy as np
+
 from config import BLOOD_TYPES
+from unit_table import SHELF_LIFE, get_unit_table, month_keys, today_datetime64
 
 
 def calculate_shelf_life_metrics(blood_units: List[Dict]) -> Dict:
     """
-    Calculate shelf life metrics (weekly and monthly) - OPTIMIZED
+    Calculate shelf life metrics (weekly and monthly) - vectorized over the
+    shared UnitTable.
     Blood shelf life is 45 days from collection date (collected_at)
     """
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    next_week = today + timedelta(days=7)
-    next_month = today + timedelta(days=30)
-    
-    expiring_weekly = 0
-    expiring_monthly = 0
-    total_valid_units = 0
-    
-    # Group units by expiration month for monthly tracking
-    monthly_expiring_weekly = defaultdict(int)
-    monthly_expiring_monthly = defaultdict(int)
-    monthly_total = defaultdict(int)
-    
-    # Pre-filter units for faster processing
-    valid_units = [
-        unit for unit in blood_units
-        if unit.get('collected_at') and 
-        unit.get('status') != 'handed_over' and 
-        not unit.get('handed_over_at')
-    ]
-    
-    for unit in valid_units:
-        collected_at = unit.get('collected_at')
-        
-        try:
-            # Fast date parsing
-            if 'Z' in collected_at:
-                collection_date = datetime.fromisoformat(collected_at.replace('Z', '+00:00'))
-            else:
-                collection_date = datetime.fromisoformat(collected_at)
-            
-            # Remove timezone info for consistent comparison
-            if collection_date.tzinfo:
-                collection_date = collection_date.replace(tzinfo=None)
-            
-            # Calculate expiration date: collected_at + EXACTLY 45 days
-            expiration_date = collection_date + timedelta(days=45)
-            
-            # Early exit if expired
-            if expiration_date <= today:
-                continue
-            
-            # Count valid units
-            total_valid_units += 1
-            
-            # Get expiration month for grouping (YYYY-MM-01 format)
-            expiration_month = expiration_date.replace(day=1).strftime('%Y-%m-01')
-            monthly_total[expiration_month] += 1
-            
-            # Count expiring within next week (7 days from today)
-            if expiration_date <= next_week:
-                expiring_weekly += 1
-                monthly_expiring_weekly[expiration_month] += 1
-            
-            # Count expiring within next month (30 days from today)
-            if expiration_date <= next_month:
-                expiring_monthly += 1
-                monthly_expiring_monthly[expiration_month] += 1
-                    
-        except (ValueError, TypeError, AttributeError):
-            continue
-    
-    # Calculate monthly breakdown
+    table = get_unit_table(blood_units)
+    today = today_datetime64()
+    next_week = today + np.timedelta64(7, "D")
+    next_month = today + np.timedelta64(30, "D")
+
+    # Units still in stock with a parseable collection date
+    valid = (
+        table.has_collected_at
+        & (table.status != 'handed_over')
+        & ~table.has_handed_over_at
+        & ~np.isnat(table.collected_at)
+    )
+    # Expiration date: collected_at + EXACTLY 45 days; drop already expired
+    expiration = table.collected_at + SHELF_LIFE
+    valid &= expiration > today
+
+    expiration = expiration[valid]
+    weekly = expiration <= next_week
+    monthly = expiration <= next_month
+
+    expiring_weekly = int(weekly.sum())
+    expiring_monthly = int(monthly.sum())
+    total_valid_units = int(valid.sum())
+
+    # Group by expiration month (YYYY-MM-01 format)
+    months, month_index = np.unique(expiration.astype('datetime64[M]'), return_inverse=True)
+    month_index = month_index.reshape(-1)
+    month_total = np.bincount(month_index, minlength=len(months))
+    month_weekly = np.bincount(month_index, weights=weekly, minlength=len(months))
+    month_monthly = np.bincount(month_index, weights=monthly, minlength=len(months))
+
     monthly_breakdown = {
         month_key: {
-            'total': monthly_total[month_key],
-            'expiring_weekly': monthly_expiring_weekly.get(month_key, 0),
-            'expiring_monthly': monthly_expiring_monthly.get(month_key, 0)
+            'total': int(month_total[i]),
+            'expiring_weekly': int(month_weekly[i]),
+            'expiring_monthly': int(month_monthly[i])
         }
-        for month_key in sorted(monthly_total.keys())
+        for i, month_key in enumerate(month_keys(months))
     }
-    
+
     # Calculate percentages (avoid division by zero)
     total_valid = total_valid_units if total_valid_units > 0 else 1
-    
+
     return {
         'expiring_weekly': expiring_weekly,
         'expiring_monthly': expiring_monthly,
@@ -0,0 +1,89 @@
+"""
+Deferred imports for the heavy scientific and plotting stacks.
+
+PHP starts a new interpreter for every report request, so module import time
+is paid on each call. statsmodels, pandas, plotly and plotnine take seconds
+to import while most entry points (KPI cards, JSON-only calls) never use
+them.
+
+- lazy_module("plotly.graph_objects") returns a stand-in that imports the
+  real module on first attribute access, so module-level names such as
+  `go = lazy_module(...)` cost nothing until a chart is actually built.
+- module_available("plotnine") answers whether a top-level package is
+  installed from the import system's finders, without importing it.
+"""
+
+import importlib
+import importlib.util
+from typing import Callable, Dict, List, Optional
+
+
+class LazyModule:
+    """Module stand-in that imports `name` on first attribute access."""
+
+    __slots__ = ("_name", "_module", "_on_load")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_on_load", [])
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            module = importlib.import_module(self._name)
+            object.__setattr__(self, "_module", module)
+            for callback in self._on_load:
+                callback(module)
+        return module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute: str, value) -> None:
+        setattr(self._load(), attribute, value)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+_LAZY_MODULES: Dict[str, LazyModule] = {}
+
+
+def lazy_module(name: str, on_load: Optional[Callable] = None) -> LazyModule:
+    """
+    Shared lazy stand-in for module `name`. `on_load(module)` runs once,
+    right after the real import (e.g. to install warning filters).
+    """
+    module = _LAZY_MODULES.get(name)
+    if module is None:
+        module = _LAZY_MODULES[name] = LazyModule(name)
+    if on_load is not None:
+        if module._module is not None:
+            on_load(module._module)
+        else:
+            module._on_load.append(on_load)
+    return module
+
+
+def ensure_loaded(*modules: LazyModule) -> None:
+    """
+    Import lazy modules now. Call this before a warnings.catch_warnings()
+    block that uses them: statsmodels installs warning filters when it is
+    imported, and filters added inside the block would outrank the block's
+    own filters and then be discarded when it exits.
+    """
+    for module in modules:
+        module._load()
+
+
+def module_available(name: str) -> bool:
+    """True if top-level package `name` can be imported (it is not imported)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
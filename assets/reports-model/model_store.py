@@ -0,0 +1,401 @@
+"""
+Persistent store of fitted SARIMA models.
+
+Monthly histories only change when a new month closes, yet every dashboard
+run used to redo the full order search. This store remembers, per series
+fingerprint, the model a search selected - its SARIMAX specification and
+fitted parameters - so an unchanged series skips model selection and its
+forecasts come from smoothing the stored parameters.
+
+- Keys hash the series values, a description of the search space (candidate
+  orders and rules, stepwise limits, or the auto_arima settings) and the library versions, so
+  a different search or a statsmodels/pmdarima/numpy upgrade never reuses an
+  old fit.
+- Records live in a SnapshotStore under assets/cache/models: atomic writes,
+  cross-process locking and LRU eviction by size.
+- With FORECAST_WARM_START=1 the latest winner per series lineage (e.g.
+  "supply:A+") is kept as well, so a series that gained a month is refitted
+  from last run's order and parameters instead of searched from scratch.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import sys
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config import (
+    MODEL_STORE_DIR,
+    MODEL_STORE_ENABLED,
+    MODEL_STORE_MAX_BYTES,
+    SARIMA_AVAILABLE,
+    WARM_START,
+    WARM_START_TOLERANCE,
+)
+from lazy_imports import ensure_loaded
+from parallel_fitting import FitOutcome, SearchPhase, Selection, fit_many, sarimax, search_many
+from snapshot_store import SnapshotStore
+from stepwise_search import StepwiseSearch, order_limits, stepwise_many
+
+# Bump when the stored record layout changes
+MODEL_STORE_VERSION = 1
+
+# An order search: candidate phases (parallel_fitting) or a stepwise search
+Search = Union[Sequence[SearchPhase], StepwiseSearch]
+
+_STORE: Optional[SnapshotStore] = None
+
+
+def get_model_store() -> Optional[SnapshotStore]:
+    """Return the on-disk model store, or None when it is disabled."""
+    global _STORE
+    if not MODEL_STORE_ENABLED or not SARIMA_AVAILABLE:
+        return None
+    if _STORE is None:
+        _STORE = SnapshotStore(MODEL_STORE_DIR, float("inf"), MODEL_STORE_MAX_BYTES)
+    return _STORE
+
+
+def _installed_version(package: str) -> Optional[str]:
+    """Version of an installed distribution, read without importing it."""
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _library_versions() -> Dict[str, Optional[str]]:
+    return {
+        "store": MODEL_STORE_VERSION,
+        "numpy": np.__version__,
+        "statsmodels": _installed_version("statsmodels") if SARIMA_AVAILABLE else None,
+        "pmdarima": _installed_version("pmdarima"),
+    }
+
+
+def series_key(values: Sequence[float], search_space) -> str:
+    """Fingerprint of a series plus the search that would select its model."""
+    payload = json.dumps(
+        {
+            "values": [float(value) for value in values],
+            "search": search_space,
+            "versions": _library_versions(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return "model:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def phases_space(phases: Sequence[SearchPhase]) -> List:
+    """JSON-able description of an order search."""
+    return [
+        {
+            "orders": [list(order) for order in phase.orders],
+            "stop_aicc": phase.stop_aicc,
+            "stop_min_obs": phase.stop_min_obs,
+            "run_if_above": phase.run_if_above,
+        }
+        for phase in phases
+    ]
+
+
+def search_space(search: Search):
+    """JSON-able description of either kind of order search."""
+    if isinstance(search, StepwiseSearch):
+        return search.describe()
+    return phases_space(search)
+
+
+def run_search(
+    series: Dict[str, np.ndarray], searches: Dict[str, Search], steps: int = 1
+) -> Dict[str, Optional[Selection]]:
+    """Run each series' search, batching series that share a stepwise search."""
+    selections: Dict[str, Optional[Selection]] = {}
+    stepwise: Dict[StepwiseSearch, Dict[str, np.ndarray]] = {}
+    phased: Dict[str, np.ndarray] = {}
+    for name, values in series.items():
+        if isinstance(searches[name], StepwiseSearch):
+            stepwise.setdefault(searches[name], {})[name] = values
+        else:
+            phased[name] = values
+    for search, group in stepwise.items():
+        selections.update(stepwise_many(group, search, steps))
+    if phased:
+        selections.update(search_many(phased, {name: searches[name] for name in phased}, steps))
+    return {name: selections.get(name) for name in series}
+
+
+# ------------------------------------------------------------------ #
+# Record <-> fitted results
+# ------------------------------------------------------------------ #
+def _model_spec(results) -> Dict:
+    model = results.model
+    return {
+        "order": list(model.order),
+        "seasonal_order": list(model.seasonal_order),
+        "trend": model.trend,
+        "enforce_stationarity": bool(model.enforce_stationarity),
+        "enforce_invertibility": bool(model.enforce_invertibility),
+    }
+
+
+def results_record(results, aicc: Optional[float] = None) -> Dict:
+    """Serializable record of fitted SARIMAX results."""
+    return {
+        "spec": _model_spec(results),
+        "params": [float(x) for x in np.asarray(results.params)],
+        "aicc": aicc,
+    }
+
+
+def rebuild_results(values: Sequence[float], record: Dict):
+    """Fitted results for `values` from a stored record (no optimisation)."""
+    spec = record["spec"]
+    ensure_loaded(sarimax)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = sarimax.SARIMAX(
+            np.asarray(values, dtype=np.float64),
+            order=tuple(spec["order"]),
+            seasonal_order=tuple(spec["seasonal_order"]),
+            trend=spec.get("trend"),
+            enforce_stationarity=spec.get("enforce_stationarity", False),
+            enforce_invertibility=spec.get("enforce_invertibility", False),
+        )
+        return model.smooth(np.asarray(record["params"], dtype=np.float64))
+
+
+def load_model(key: str, values: Sequence[float]) -> Optional[Tuple[object, Dict]]:
+    """(fitted results, record) stored for `key`, or None on a miss."""
+    store = get_model_store()
+    if store is None:
+        return None
+    record = store.get(key)
+    if not isinstance(record, dict):
+        return None
+    try:
+        return rebuild_results(values, record), record
+    except Exception as exc:
+        print(f"WARNING: discarding stored model {key[:18]}: {exc}", file=sys.stderr)
+        store.delete(key)
+        return None
+
+
+def load_results(key: str, values: Sequence[float]):
+    """Stored fitted results for `key`, or None on a miss."""
+    loaded = load_model(key, values)
+    return loaded[0] if loaded is not None else None
+
+
+def save_results(key: str, values: Sequence[float], results, aicc: Optional[float] = None) -> None:
+    """
+    Store fitted results. The record is only kept if rebuilding it reproduces
+    the fit's forecast, so models whose specification the record cannot
+    capture are simply refitted next time.
+    """
+    store = get_model_store()
+    if store is None:
+        return
+    try:
+        record = results_record(results, aicc)
+        expected = np.asarray(results.forecast(steps=1), dtype=np.float64)
+        rebuilt = np.asarray(rebuild_results(values, record).forecast(steps=1), dtype=np.float64)
+        if not np.allclose(rebuilt, expected, rtol=1e-9, atol=1e-9, equal_nan=True):
+            return
+        store.put(key, record)
+    except Exception as exc:
+        print(f"WARNING: could not store model: {exc}", file=sys.stderr)
+
+
+# ------------------------------------------------------------------ #
+# Order search with the store in front
+# ------------------------------------------------------------------ #
+def search_many_stored(
+    series: Dict[str, np.ndarray],
+    search: Union[Search, Dict[str, Search]],
+    steps: int = 1,
+    lineage: Optional[Dict[str, str]] = None,
+) -> Dict[str, Optional[Selection]]:
+    """
+    Order search (parallel_fitting.search_many for candidate phases,
+    stepwise_search.stepwise_many for a StepwiseSearch), answering unchanged
+    series from the store. `search` is shared by all series or given per
+    key. Only series without a stored model are searched, and their
+    selections are stored for the next run.
+
+    `lineage` names each series across runs (e.g. "supply:A+"). With
+    WARM_START enabled, a changed series is first refitted from its previous
+    winner (see _warm_start) and only falls back to the full search when
+    that does not hold up; without it, `lineage` is ignored.
+    """
+    searches = {
+        name: search[name] if isinstance(search, dict) else search for name in series
+    }
+    selections: Dict[str, Optional[Selection]] = {}
+    keys: Dict[str, str] = {}
+    missing: Dict[str, np.ndarray] = {}
+    for name, values in series.items():
+        keys[name] = series_key(values, search_space(searches[name]))
+        loaded = load_model(keys[name], values)
+        if loaded is None:
+            missing[name] = values
+            continue
+        results, record = loaded
+        selections[name] = _selection_from_results(values, results, record.get("aicc"), steps)
+
+    # Lineage records are only read by warm starts, so only kept with them
+    warm_keys: Dict[str, str] = {}
+    if WARM_START and lineage and get_model_store() is not None:
+        warm_keys = {
+            name: lineage_key(lineage[name], search_space(searches[name]))
+            for name in series
+            if name in lineage
+        }
+    if warm_keys and missing:
+        warm = _warm_start(
+            {name: values for name, values in missing.items() if name in warm_keys},
+            warm_keys,
+            searches,
+            steps,
+        )
+        for name, selection in warm.items():
+            selections[name] = selection
+            save_results(keys[name], missing.pop(name), selection.fitted(), selection.aicc)
+
+    if missing:
+        searched = run_search(missing, searches, steps)
+        for name, selection in searched.items():
+            selections[name] = selection
+            if selection is not None:
+                save_results(keys[name], missing[name], selection.fitted(), selection.aicc)
+
+    store = get_model_store()
+    for name, key in warm_keys.items():
+        selection = selections.get(name)
+        if selection is not None and store is not None:
+            # Latest winner per lineage, the starting point for the next refit
+            record = results_record(selection.fitted(), selection.aicc)
+            record["n_obs"] = len(series[name])
+            store.put(key, record)
+
+    return {name: selections.get(name) for name in series}
+
+
+def lineage_key(lineage: str, search_space) -> str:
+    payload = json.dumps(
+        {"lineage": lineage, "search": search_space, "versions": _library_versions()},
+        sort_keys=True,
+        default=str,
+    )
+    return "warm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _selection_from_results(values, results, aicc, steps: int) -> Selection:
+    forecast = np.asarray(results.forecast(steps=steps), dtype=np.float64)
+    outcome = FitOutcome(
+        tuple(results.model.order) + tuple(results.model.seasonal_order),
+        float(aicc) if aicc is not None else float(results.aic),
+        [float(x) for x in np.asarray(results.params)],
+        [float(x) for x in forecast],
+        results,
+    )
+    return Selection(values, outcome)
+
+
+def _order_limits(search: Search, n: int) -> List[int]:
+    """
+    Largest value each of p, d, q, P, D, Q takes in the search space, for a
+    series of n observations.
+    """
+    if isinstance(search, StepwiseSearch):
+        max_p, max_q, max_P, max_Q = order_limits(n, search)
+        return [max_p, search.max_d, max_q, max_P, search.max_D, max_Q]
+    all_orders = [tuple(o) for phase in search for o in phase.orders]
+    return [max(o[i] for o in all_orders) for i in range(6)] if all_orders else [0] * 6
+
+
+def _neighbour_orders(order: Tuple, search: Search, n: int) -> List[Tuple]:
+    """
+    Orders one step away in p, q, P or Q (d, D and s kept), bounded by the
+    space the full search explores for a series of n observations.
+    """
+    limits = _order_limits(search, n)
+    neighbours = []
+    for index in (0, 2, 3, 5):  # p, q, P, Q
+        for delta in (-1, 1):
+            candidate = list(order)
+            candidate[index] += delta
+            if 0 <= candidate[index] <= limits[index]:
+                neighbours.append(tuple(candidate))
+    return neighbours
+
+
+def _warm_start(
+    series: Dict[str, np.ndarray],
+    warm_keys: Dict[str, str],
+    searches: Dict[str, Search],
+    steps: int,
+) -> Dict[str, Selection]:
+    """
+    Incremental refit for changed series with a previous winner:
+
+    1. Refit the previous order with the previous parameters as start_params.
+    2. Keep it if its AICc is within WARM_START_TOLERANCE of the previous
+       AICc scaled by the change in length (AICc grows with n).
+    3. Otherwise fit the neighbouring orders and keep the best of the refit
+       and its neighbours.
+
+    Series with no usable previous winner (or no successful fit) are left
+    out of the result so the caller runs the full search.
+    """
+    store = get_model_store()
+    previous: Dict[str, Dict] = {}
+    for name in series:
+        record = store.get(warm_keys[name]) if store is not None else None
+        if isinstance(record, dict) and record.get("spec") and record.get("n_obs"):
+            previous[name] = record
+    if not previous:
+        return {}
+
+    def order_of(record: Dict) -> Tuple:
+        spec = record["spec"]
+        return tuple(spec["order"]) + tuple(spec["seasonal_order"])
+
+    refits = fit_many(
+        {
+            name: (series[name], order_of(record), record["params"])
+            for name, record in previous.items()
+        },
+        steps,
+    )
+
+    chosen: Dict[str, FitOutcome] = {}
+    to_widen: Dict[str, FitOutcome] = {}
+    for name, record in previous.items():
+        refit = refits.get(name)
+        if refit is None or record.get("aicc") is None:
+            continue
+        expected = float(record["aicc"]) * len(series[name]) / float(record["n_obs"])
+        if refit.aicc <= expected + WARM_START_TOLERANCE:
+            chosen[name] = refit
+        else:
+            to_widen[name] = refit
+
+    neighbour_tasks = {
+        (name, order): (series[name], order, None)
+        for name, refit in to_widen.items()
+        for order in _neighbour_orders(refit.order, searches[name], len(series[name]))
+    }
+    neighbour_fits = fit_many(neighbour_tasks, steps) if neighbour_tasks else {}
+    for name, refit in to_widen.items():
+        best = refit
+        for (task_name, _), outcome in neighbour_fits.items():
+            if task_name == name and outcome is not None and outcome.aicc < best.aicc:
+                best = outcome
+        chosen[name] = best
+
+    return {name: Selection(series[name], outcome) for name, outcome in chosen.items()}
@@ -0,0 +1,219 @@
+"""
+Vectorized monthly supply/demand aggregation.
+
+Records are reduced to integer month ordinals and category codes, and every
+statistic (counts, summed units, ...) is accumulated in a single bincount
+pass into a dense month x blood-type matrix. Adapters turn the matrix back
+into the shapes the rest of the pipeline uses:
+
+- to_nested_dict(): {month_key: {blood_type: value}} like
+  process_monthly_supply / process_monthly_demand
+- to_rows(): row dicts like forecast_workflow._monthly_dict_to_rows and
+  DatabaseConnection.get_monthly_donations
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import BLOOD_TYPES
+from unit_table import UnitTable, month_keys, parse_datetime_column
+
+
+def encode_labels(labels: Sequence) -> Tuple[np.ndarray, List]:
+    """Encode labels as integer codes, categories in first-seen order."""
+    index: Dict = {}
+    codes = np.fromiter(
+        (index.setdefault(label, len(index)) for label in labels),
+        dtype=np.int64,
+        count=len(labels),
+    )
+    return codes, list(index)
+
+
+class MonthlyMatrix:
+    """Dense month x category matrices of aggregated values."""
+
+    def __init__(
+        self,
+        months: np.ndarray,
+        categories: List,
+        values: Dict[str, np.ndarray],
+        first_seen: np.ndarray,
+    ):
+        self.months = months  # sorted unique datetime64[M]
+        self.categories = categories
+        self.values = values  # name -> (len(months), len(categories)); always has "count"
+        self.first_seen = first_seen  # index of the first record in each cell
+
+    @property
+    def month_keys(self) -> List[str]:
+        return month_keys(self.months)
+
+    def _cells_in_first_seen_order(self) -> np.ndarray:
+        flat = np.flatnonzero(self.values["count"].ravel() > 0)
+        return flat[np.argsort(self.first_seen.ravel()[flat], kind="stable")]
+
+    @staticmethod
+    def _python(value):
+        return value.item() if isinstance(value, np.generic) else value
+
+    def to_nested_dict(self, name: str = "count") -> Dict[str, Dict]:
+        """
+        {month_key: {category: value}} for non-empty cells, with months and
+        categories inserted in the order records first hit them (the order
+        the old defaultdict loops produced).
+        """
+        keys = self.month_keys
+        width = len(self.categories)
+        matrix = self.values[name]
+        result: Dict[str, Dict] = {}
+        for cell in self._cells_in_first_seen_order().tolist():
+            row, col = divmod(cell, width)
+            result.setdefault(keys[row], {})[self.categories[col]] = self._python(
+                matrix[row, col]
+            )
+        return result
+
+    def to_rows(
+        self,
+        columns: Dict[str, str],
+        category_order: Optional[Sequence] = None,
+        require: str = "count",
+    ) -> List[Dict]:
+        """
+        Row dicts {"month", "blood_type", <column>: value, ...} ordered by
+        month. Within a month, categories follow `category_order` (categories
+        not listed are dropped) or first-seen order. Cells whose `require`
+        value is not positive are skipped.
+        """
+        width = len(self.categories)
+        if category_order is None:
+            cols_by_row: Dict[int, List[int]] = {}
+            for cell in self._cells_in_first_seen_order().tolist():
+                cols_by_row.setdefault(cell // width, []).append(cell % width)
+        else:
+            column_of = {category: i for i, category in enumerate(self.categories)}
+            ordered = [column_of[c] for c in category_order if c in column_of]
+
+        required = self.values[require]
+        rows: List[Dict] = []
+        for row, month in enumerate(self.month_keys):
+            cols = cols_by_row.get(row, []) if category_order is None else ordered
+            for col in cols:
+                if required[row, col] <= 0:
+                    continue
+                record = {"month": month, "blood_type": self.categories[col]}
+                for out_key, name in columns.items():
+                    record[out_key] = self._python(self.values[name][row, col])
+                rows.append(record)
+        return rows
+
+
+def aggregate_monthly(
+    dates: np.ndarray,
+    codes: np.ndarray,
+    categories: List,
+    weights: Optional[Dict[str, np.ndarray]] = None,
+) -> MonthlyMatrix:
+    """
+    Aggregate records (parallel arrays of datetime64 dates and category
+    codes, already filtered) into a MonthlyMatrix in one pass.
+    """
+    months, month_index = np.unique(dates.astype("datetime64[M]"), return_inverse=True)
+    month_index = month_index.reshape(-1)
+    width = len(categories)
+    size = len(months) * width
+    flat = month_index * width + codes.astype(np.int64)
+
+    values: Dict[str, np.ndarray] = {
+        "count": np.bincount(flat, minlength=size).reshape(len(months), width)
+    }
+    for name, weight in (weights or {}).items():
+        summed = np.bincount(flat, weights=weight, minlength=size)
+        if np.issubdtype(weight.dtype, np.integer) or weight.dtype == bool:
+            summed = np.rint(summed).astype(np.int64)
+        values[name] = summed.reshape(len(months), width)
+
+    first_seen = np.full(size, len(flat), dtype=np.int64)
+    np.minimum.at(first_seen, flat, np.arange(len(flat), dtype=np.int64))
+    return MonthlyMatrix(months, categories, values, first_seen.reshape(len(months), width))
+
+
+def aggregate_records(
+    records: List[Dict],
+    date_key: str,
+    label_key: str,
+    weights: Optional[Dict[str, np.ndarray]] = None,
+) -> MonthlyMatrix:
+    """
+    Generic engine entry point: month of `date_key` x raw `label_key`.
+    Records with a missing/unparseable date or an empty label are skipped.
+    `weights` arrays are aligned with `records`.
+    """
+    dates = parse_datetime_column([record.get(date_key) for record in records])
+    labels = [record.get(label_key) for record in records]
+    keep = ~np.isnat(dates) & np.array([bool(label) for label in labels], dtype=bool)
+    codes, categories = encode_labels([label for label, k in zip(labels, keep) if k])
+    kept_weights = {name: weight[keep] for name, weight in (weights or {}).items()}
+    return aggregate_monthly(dates[keep], codes, categories, kept_weights)
+
+
+def aggregate_unit_supply(table: UnitTable) -> MonthlyMatrix:
+    """Monthly units collected per blood type (process_monthly_supply rules)."""
+    # collected_at if available, otherwise created_at
+    dates = table.collected_or_created
+    mask = (
+        (table.has_collected_at | table.has_created_at)
+        & (table.blood_type_code >= 0)
+        # Only skip if explicitly handed_over or expired (allow null/empty status)
+        & ~table.status_in("handed_over", "expired", "discarded")
+        # Only skip dates that are too far in the future (beyond 2030)
+        & table.year_ok(dates)
+    )
+    return aggregate_monthly(dates[mask], table.blood_type_code[mask], list(BLOOD_TYPES))
+
+
+RH_MAP = {
+    'positive': '+', 'pos': '+', '+': '+', '1': '+',
+    'negative': '-', 'neg': '-', '-': '-', '0': '-'
+}
+
+
+def aggregate_request_demand(blood_requests: List[Dict]) -> MonthlyMatrix:
+    """
+    Monthly units_requested per blood type (process_monthly_demand rules):
+    patient_blood_type + rh_factor must resolve to a known blood type and
+    units_requested must be a positive integer.
+    """
+    type_index = {blood_type: code for code, blood_type in enumerate(BLOOD_TYPES)}
+    kept_dates: List = []
+    kept_codes: List[int] = []
+    kept_units: List[int] = []
+    for request in blood_requests:
+        patient_blood_type = request.get('patient_blood_type')
+        rh_factor = request.get('rh_factor')
+        date_field = request.get('requested_on')
+        if not all([patient_blood_type, rh_factor, date_field]):
+            continue
+        try:
+            units_requested = request.get('units_requested', 0)
+            units = int(units_requested) if units_requested else 0
+            rh_symbol = RH_MAP.get(rh_factor.lower(), rh_factor)
+            code = type_index.get(f"{patient_blood_type}{rh_symbol}")
+        except (ValueError, TypeError, AttributeError):
+            continue
+        if units <= 0 or code is None:
+            continue
+        kept_dates.append(date_field)
+        kept_codes.append(code)
+        kept_units.append(units)
+
+    dates = parse_datetime_column(kept_dates)
+    codes = np.array(kept_codes, dtype=np.int64)
+    units = np.array(kept_units, dtype=np.int64)
+    years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    mask = ~np.isnat(dates) & (years <= 2030)
+    return aggregate_monthly(
+        dates[mask], codes[mask], list(BLOOD_TYPES), {"units": units[mask]}
+    )
@@ -0,0 +1,359 @@
+"""
+Parallel SARIMA order search.
+
+The forecast modules pick the best SARIMAX order per blood type by fitting a
+list of candidate orders and keeping the lowest AICc, sometimes in phases
+(priority orders, then an extended set) with early-stop rules. Statsmodels
+fits are CPU-bound and single-threaded, so this module spreads the
+individual (blood_type, order) fits over a process pool.
+
+Determinism: workers only evaluate candidates. The parent then replays the
+serial loop over the evaluated candidates - same order, same `aicc < best`
+comparison, same early-stop and phase rules - so the selected model is the
+one the serial search would pick. Candidates a serial run would never reach
+(after an early stop) are evaluated speculatively and ignored.
+
+When FORECAST_WORKERS <= 1, or worker processes cannot be started (no
+fork/spawn support, a script without a __main__ guard on Windows, a broken
+pool), the same search runs serially in-process.
+"""
+
+import multiprocessing
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config import FORECAST_WORKERS, SARIMA_AVAILABLE
+from lazy_imports import ensure_loaded, lazy_module
+from render_pool import process_context
+
+
+def _ignore_convergence_warnings(_module) -> None:
+    from statsmodels.tools.sm_exceptions import ConvergenceWarning
+
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+
+
+# Imported on first use (see lazy_imports)
+sarimax = lazy_module("statsmodels.tsa.statespace.sarimax", on_load=_ignore_convergence_warnings)
+
+
+Order = Tuple[int, int, int, int, int, int, int]
+
+# Fit settings shared by every forecast module
+FIT_KWARGS = {"disp": False, "maxiter": 50, "method": "lbfgs"}
+
+
+class SearchPhase(NamedTuple):
+    """One pass over candidate orders, with the serial loop's control rules."""
+
+    orders: Sequence[Order]
+    # Stop the phase once a new best has aicc < stop_aicc and n_obs > stop_min_obs
+    stop_aicc: Optional[float] = None
+    stop_min_obs: int = 0
+    # Only run the phase if nothing fitted yet or the best aicc is above this
+    run_if_above: Optional[float] = None
+
+
+class FitOutcome(NamedTuple):
+    order: Order
+    aicc: float
+    params: List[float]
+    forecast: List[float]
+    results: object = None  # fitted results; only kept for in-process fits
+
+
+class Selection:
+    """Best model chosen for one series."""
+
+    def __init__(self, values: np.ndarray, outcome: FitOutcome):
+        self.values = values
+        self.order = outcome.order
+        self.aicc = outcome.aicc
+        self.params = outcome.params
+        self.forecast = outcome.forecast
+        self._results = outcome.results
+
+    def fitted(self):
+        """
+        Fitted SARIMAX results for the selected order. Models fitted in a
+        worker are rebuilt in-process by smoothing at the estimated params,
+        which reproduces the fit's AIC and forecasts exactly.
+        """
+        if self._results is None:
+            ensure_loaded(sarimax)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                model = build_model(self.values, self.order)
+                self._results = model.smooth(np.asarray(self.params, dtype=np.float64))
+        return self._results
+
+
+def build_model(values: np.ndarray, order: Order):
+    p, d, q, P, D, Q, s = order
+    return sarimax.SARIMAX(
+        values,
+        order=(p, d, q),
+        seasonal_order=(P, D, Q, s),
+        enforce_stationarity=False,
+        enforce_invertibility=False,
+    )
+
+
+def fit_candidate(
+    values: np.ndarray,
+    order: Order,
+    steps: int = 1,
+    keep_results: bool = False,
+    start_params: Optional[Sequence[float]] = None,
+) -> Optional[FitOutcome]:
+    """
+    Fit one order; None if the fit or its forecast fails. `start_params`
+    warm-starts the optimizer (e.g. from the previous run's parameters).
+    """
+    # Imported here: forecasting imports this module
+    from forecasting import calculate_aicc, count_sarima_params
+
+    ensure_loaded(sarimax)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fit_kwargs = dict(FIT_KWARGS)
+            if start_params is not None:
+                fit_kwargs["start_params"] = np.asarray(start_params, dtype=np.float64)
+            fitted = build_model(values, order).fit(**fit_kwargs)
+            p, d, q, P, D, Q, _ = order
+            aicc = calculate_aicc(
+                fitted.aic, count_sarima_params(p, d, q, P, D, Q), len(values)
+            )
+            forecast = np.asarray(fitted.forecast(steps=steps), dtype=np.float64)
+    except Exception:
+        return None
+    return FitOutcome(
+        tuple(order),
+        float(aicc),
+        [float(x) for x in np.asarray(fitted.params)],
+        [float(x) for x in forecast],
+        fitted if keep_results else None,
+    )
+
+
+def _fit_task(
+    values: List[float], order: Order, steps: int, start_params: Optional[List[float]] = None
+) -> Optional[FitOutcome]:
+    """Worker entry point (module-level so it pickles)."""
+    return fit_candidate(
+        np.asarray(values, dtype=np.float64), order, steps, start_params=start_params
+    )
+
+
+# ------------------------------------------------------------------ #
+# Serial replay
+# ------------------------------------------------------------------ #
+def _phase_should_run(phase: SearchPhase, best: Optional[FitOutcome]) -> bool:
+    if phase.run_if_above is None or best is None:
+        return True
+    return best.aicc > phase.run_if_above
+
+
+def _replay_phase(
+    phase: SearchPhase,
+    evaluate: Callable[[Order], Optional[FitOutcome]],
+    n_obs: int,
+    best: Optional[FitOutcome],
+) -> Optional[FitOutcome]:
+    """The serial selection loop, reading outcomes through `evaluate`."""
+    best_aicc = best.aicc if best is not None else float("inf")
+    for order in phase.orders:
+        outcome = evaluate(tuple(order))
+        if outcome is None:
+            continue
+        if outcome.aicc < best_aicc:
+            best, best_aicc = outcome, outcome.aicc
+            if (
+                phase.stop_aicc is not None
+                and outcome.aicc < phase.stop_aicc
+                and n_obs > phase.stop_min_obs
+            ):
+                break
+    return best
+
+
+def search_series(
+    values: np.ndarray, phases: Sequence[SearchPhase], steps: int = 1
+) -> Optional[Selection]:
+    """Serial search for one series. Each distinct order is fitted once."""
+    outcomes: Dict[Order, Optional[FitOutcome]] = {}
+
+    def evaluate(order: Order) -> Optional[FitOutcome]:
+        if order not in outcomes:
+            outcomes[order] = fit_candidate(values, order, steps, keep_results=True)
+        return outcomes[order]
+
+    best: Optional[FitOutcome] = None
+    for phase in phases:
+        if _phase_should_run(phase, best):
+            best = _replay_phase(phase, evaluate, len(values), best)
+    return Selection(values, best) if best is not None else None
+
+
+# ------------------------------------------------------------------ #
+# Process pool
+# ------------------------------------------------------------------ #
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_POOL_DISABLED = False
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """Shared pool, created on first use; None when running serially."""
+    global _EXECUTOR, _POOL_DISABLED
+    if _POOL_DISABLED or FORECAST_WORKERS <= 1 or not SARIMA_AVAILABLE:
+        return None
+    if multiprocessing.parent_process() is not None:
+        # Already inside a worker: never start nested pools
+        return None
+    if _EXECUTOR is None:
+        try:
+            # Not plain fork once other threads run (e.g. in reports_daemon)
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=FORECAST_WORKERS,
+                mp_context=process_context(("statsmodels.tsa.statespace.sarimax",)),
+            )
+        except (OSError, ImportError, NotImplementedError, ValueError) as exc:
+            _disable_pool(exc)
+            return None
+    return _EXECUTOR
+
+
+def pool_enabled() -> bool:
+    """True when fits will run on the process pool."""
+    return _get_executor() is not None
+
+
+def _disable_pool(exc: BaseException) -> None:
+    global _EXECUTOR, _POOL_DISABLED
+    print(
+        f"WARNING: parallel model fitting unavailable ({type(exc).__name__}); fitting serially.",
+        file=sys.stderr,
+    )
+    _POOL_DISABLED = True
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
+
+
+_POOL_ERRORS = (BrokenProcessPool, OSError, RuntimeError, ImportError, AttributeError)
+
+
+def search_many(
+    series: Dict[str, np.ndarray],
+    phases: Union[Sequence[SearchPhase], Dict[str, Sequence[SearchPhase]]],
+    steps: int = 1,
+) -> Dict[str, Optional[Selection]]:
+    """
+    Run the order search for every series and return {key: Selection or
+    None}. `phases` is shared by all series or given per key. Fits run as
+    (series, order) tasks on the process pool, one phase at a time; results
+    are identical to calling search_series per series.
+    """
+    phases_by_key = {
+        key: phases[key] if isinstance(phases, dict) else phases for key in series
+    }
+    executor = _get_executor()
+    if executor is None or not series:
+        return _search_serially(series, phases_by_key, steps)
+
+    try:
+        outcomes: Dict[str, Dict[Order, Optional[FitOutcome]]] = {key: {} for key in series}
+        best: Dict[str, Optional[FitOutcome]] = {key: None for key in series}
+        for index in range(max(len(p) for p in phases_by_key.values())):
+            active = [
+                key
+                for key, key_phases in phases_by_key.items()
+                if index < len(key_phases) and _phase_should_run(key_phases[index], best[key])
+            ]
+            futures = {}
+            for key in active:
+                for order in dict.fromkeys(tuple(o) for o in phases_by_key[key][index].orders):
+                    if order not in outcomes[key]:
+                        futures[(key, order)] = executor.submit(
+                            _fit_task, series[key].tolist(), order, steps
+                        )
+            for (key, order), future in futures.items():
+                outcomes[key][order] = future.result()
+            for key in active:
+                best[key] = _replay_phase(
+                    phases_by_key[key][index], outcomes[key].__getitem__, len(series[key]), best[key]
+                )
+    except _POOL_ERRORS as exc:
+        _disable_pool(exc)
+        return _search_serially(series, phases_by_key, steps)
+
+    return {
+        key: Selection(series[key], outcome) if outcome is not None else None
+        for key, outcome in best.items()
+    }
+
+
+def _search_serially(
+    series: Dict[str, np.ndarray], phases_by_key: Dict[str, Sequence[SearchPhase]], steps: int
+) -> Dict[str, Optional[Selection]]:
+    return {key: search_series(values, phases_by_key[key], steps) for key, values in series.items()}
+
+
+def fit_many(
+    tasks: Dict[Hashable, Tuple[np.ndarray, Order, Optional[Sequence[float]]]],
+    steps: int = 1,
+) -> Dict[Hashable, Optional[FitOutcome]]:
+    """
+    Fit arbitrary (values, order, start_params) tasks - on the pool when it
+    is enabled - and return {task key: FitOutcome or None}.
+    """
+    executor = _get_executor()
+    if executor is not None and len(tasks) > 1:
+        try:
+            futures = {
+                key: executor.submit(
+                    _fit_task,
+                    values.tolist(),
+                    tuple(order),
+                    steps,
+                    list(start_params) if start_params is not None else None,
+                )
+                for key, (values, order, start_params) in tasks.items()
+            }
+            return {key: future.result() for key, future in futures.items()}
+        except _POOL_ERRORS as exc:
+            _disable_pool(exc)
+    return {
+        key: fit_candidate(values, tuple(order), steps, keep_results=True, start_params=start_params)
+        for key, (values, order, start_params) in tasks.items()
+    }
+
+
+def map_series(
+    func: Callable,
+    series: Dict[str, List[float]],
+    extra_args: Optional[Dict[str, Tuple]] = None,
+) -> Dict[str, object]:
+    """
+    {key: func(values, *extra_args[key])} with one pool task per series, for
+    searches that cannot be split by order (e.g. pmdarima.auto_arima).
+    `func` must be a module-level function.
+    """
+    extra_args = extra_args or {}
+    executor = _get_executor()
+    if executor is not None and len(series) > 1:
+        try:
+            futures = {
+                key: executor.submit(func, values, *extra_args.get(key, ()))
+                for key, values in series.items()
+            }
+            return {key: future.result() for key, future in futures.items()}
+        except _POOL_ERRORS as exc:
+            _disable_pool(exc)
+    return {key: func(values, *extra_args.get(key, ())) for key, values in series.items()}
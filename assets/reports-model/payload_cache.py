@@ -0,0 +1,198 @@
+"""
+Stale-while-revalidate cache for the dashboard payloads.
+
+With a hard TTL, the first admin after expiry waits for a full Python run.
+Here the last good payload is kept on disk (in a SnapshotStore) and, once it
+is older than PAYLOAD_TTL_SECONDS, is still returned immediately while one
+background rebuild replaces it:
+
+- Only successful payloads are stored, so an outage keeps serving the last
+  good data instead of an error.
+- Rebuilds hold an exclusive lock file per payload (fcntl on POSIX, msvcrt
+  on Windows). The OS drops it if the rebuilding process dies, so a crash
+  never leaves a stale lock behind.
+- Short-lived CLI runs rebuild in a detached process (`rebuild_command`);
+  the long-lived reports daemon rebuilds on a thread.
+
+Returned payloads carry a `payload_cache` block recording when the data was
+built, its age, and whether it is stale.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from config import PAYLOAD_CACHE_DIR, PAYLOAD_TTL_SECONDS
+from snapshot_store import FCNTL_AVAILABLE, MSVCRT_AVAILABLE, SnapshotStore
+
+if FCNTL_AVAILABLE:
+    import fcntl
+if MSVCRT_AVAILABLE:  # pragma: no cover - Windows
+    import msvcrt
+
+BASE_DIR = Path(__file__).parent
+
+_STORE: Optional[SnapshotStore] = None
+
+
+def get_payload_store() -> SnapshotStore:
+    """Payload store; entries never expire by age here (PayloadCache decides)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = SnapshotStore(PAYLOAD_CACHE_DIR, ttl_seconds=float("inf"), max_bytes=0)
+    return _STORE
+
+
+def try_lock(path: Path):
+    """Open and lock `path` without waiting; the open handle, or None if held."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "a+b")
+    try:
+        if FCNTL_AVAILABLE:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif MSVCRT_AVAILABLE:  # pragma: no cover - Windows
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return handle
+    except OSError:
+        handle.close()
+        return None
+
+
+def unlock(handle) -> None:
+    try:
+        if FCNTL_AVAILABLE:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        elif MSVCRT_AVAILABLE:  # pragma: no cover - Windows
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        handle.close()
+
+
+class PayloadCache:
+    """
+    Last good payload `name`, produced by `builder`. `rebuild_command` runs
+    a detached rebuild (the entry point with --rebuild-cache); without it,
+    rebuilds run on a background thread of this process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        builder: Callable[[], Dict],
+        rebuild_command: Optional[List[str]] = None,
+        ttl_seconds: float = PAYLOAD_TTL_SECONDS,
+    ):
+        self.name = name
+        self.builder = builder
+        self.rebuild_command = rebuild_command
+        self.ttl_seconds = ttl_seconds
+        self.lock_path = PAYLOAD_CACHE_DIR / f"{name}.refresh.lock"
+
+    def get(self, refresh: bool = False) -> Dict:
+        """
+        Stored payload if fresh; stored payload plus a background rebuild if
+        stale; a synchronous build if nothing is stored or `refresh` is set.
+        """
+        entry = None if refresh else self._load()
+        if entry is None:
+            payload, built_at = self._build()
+            return self._annotate(payload, built_at, stale=False, refreshing=False)
+
+        age = time.time() - entry["built_at"]
+        if age <= self.ttl_seconds:
+            return self._annotate(entry["payload"], entry["built_at"], stale=False, refreshing=False)
+        refreshing = self.refresh_in_background()
+        return self._annotate(entry["payload"], entry["built_at"], stale=True, refreshing=refreshing)
+
+    def rebuild(self) -> Optional[Dict]:
+        """
+        Rebuild under the lock file. Returns None without building when
+        another rebuild holds the lock or the stored payload is fresh again.
+        """
+        handle = try_lock(self.lock_path)
+        if handle is None:
+            return None
+        try:
+            entry = self._load()
+            if entry is not None and time.time() - entry["built_at"] <= self.ttl_seconds:
+                return None
+            payload, _ = self._build()
+            return payload
+        finally:
+            unlock(handle)
+
+    def refresh_in_background(self) -> bool:
+        """Start a rebuild unless one is running; True if one is in progress."""
+        handle = try_lock(self.lock_path)
+        if handle is None:
+            return True
+        unlock(handle)
+
+        if self.rebuild_command is None:
+            threading.Thread(target=self._rebuild_quietly, daemon=True).start()
+            return True
+        try:
+            subprocess.Popen(
+                self.rebuild_command,
+                cwd=str(BASE_DIR),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                **detached_kwargs(),
+            )
+            return True
+        except OSError as exc:
+            print(f"WARNING: could not start background rebuild of {self.name}: {exc}", file=sys.stderr)
+            return False
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+    def _load(self) -> Optional[Dict]:
+        entry = get_payload_store().get(self.name)
+        if not isinstance(entry, dict) or not isinstance(entry.get("payload"), dict):
+            return None
+        return entry
+
+    def _build(self):
+        payload = self.builder()
+        built_at = time.time()
+        if payload.get("success", True):
+            get_payload_store().put(self.name, {"built_at": built_at, "payload": payload})
+        return payload, built_at
+
+    def _rebuild_quietly(self) -> None:
+        try:
+            self.rebuild()
+        except Exception as exc:  # pragma: no cover - diagnostics
+            print(f"WARNING: background rebuild of {self.name} failed: {exc}", file=sys.stderr)
+
+    def _annotate(self, payload: Dict, built_at: float, stale: bool, refreshing: bool) -> Dict:
+        annotated = dict(payload)
+        annotated["payload_cache"] = {
+            "built_at": datetime.fromtimestamp(built_at).isoformat(),
+            "data_age_seconds": round(max(0.0, time.time() - built_at), 1),
+            "ttl_seconds": self.ttl_seconds,
+            "stale": stale,
+            "refreshing": refreshing,
+        }
+        return annotated
+
+
+def detached_kwargs() -> Dict:
+    """Popen options that let the rebuild outlive the (PHP-spawned) caller."""
+    if os.name == "nt":  # pragma: no cover - Windows
+        flags = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(
+            subprocess, "CREATE_NEW_PROCESS_GROUP", 0
+        )
+        return {"creationflags": flags}
+    return {"start_new_session": True}
@@ -8,34 +8,16 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Dict, List, Optional
 
-import pandas as pd
-try:
-    from plotnine import (
-        aes,
-        element_blank,
-        element_text,
-        geom_bar,
-        geom_hline,
-        geom_point,
-        geom_text,
-        ggplot,
-        labs,
-        scale_fill_manual,
-        theme,
-        theme_minimal,
-    )
-    PLOTNINE_AVAILABLE = True
-except ModuleNotFoundError:
-    PLOTNINE_AVAILABLE = False
-
-try:
-    import plotly.graph_objects as go
-    PLOTLY_AVAILABLE = True
-except ModuleNotFoundError:
-    PLOTLY_AVAILABLE = False
-
+from chart_output import write_figure_html
 from config import TARGET_BUFFER_UNITS
 from forecast_workflow import run_forecast_workflow
+from lazy_imports import lazy_module, module_available
+
+# pandas and the plotting stacks are imported on first use (see lazy_imports)
+pd = lazy_module("pandas")
+go = lazy_module("plotly.graph_objects")
+PLOTNINE_AVAILABLE = module_available("plotnine")
+PLOTLY_AVAILABLE = module_available("plotly")
 OUTPUT_DIR = Path(__file__).resolve().parent / "charts"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
@@ -85,6 +67,21 @@ def _print_projected_stock(df: pd.DataFrame):
 def _plot_static(df: pd.DataFrame):
     if not PLOTNINE_AVAILABLE:
         return
+    from plotnine import (
+        aes,
+        element_blank,
+        element_text,
+        geom_bar,
+        geom_hline,
+        geom_point,
+        geom_text,
+        ggplot,
+        labs,
+        scale_fill_manual,
+        theme,
+        theme_minimal,
+    )
+
     status_levels = ["Critical", "Monitor", "Safe"]
     status_palette = {
         "Critical": "#c0392b",
@@ -199,7 +196,7 @@ def _plot_interactive(df: pd.DataFrame):
     )
 
     output_path = Path(__file__).resolve().parent / "projected_stock.html"
-    fig.write_html(str(output_path))
+    write_figure_html(fig, output_path)
 
 
 def _print_action_summary(df: pd.DataFrame):
@@ -0,0 +1,156 @@
+"""
+Concurrent chart rendering.
+
+Chart refreshes (plotnine PNGs, projected stock, the interactive forecast
+views, the overview charts) are independent of each other and CPU / I/O
+heavy, so rendering them one after another takes the sum of their times.
+render_many() runs them on a bounded process pool instead:
+
+- At most RENDER_WORKERS charts render at once.
+- Each task gets RENDER_TIMEOUT_SECONDS. Workers enforce it with SIGALRM
+  where available; the parent also stops waiting once every task should
+  have finished and terminates the pool, so a hung chart never blocks the
+  payload.
+- Exceptions and timeouts are returned per task as error strings (for
+  `asset_errors`) instead of propagating.
+- `preload` names the plotting modules the tasks use. They are imported
+  once (in the parent with fork, in the fork server otherwise) and
+  inherited, instead of being imported again by every worker.
+- fork is only used while the process is single-threaded (see
+  process_context).
+
+Tasks must pickle: module-level functions or functools.partial of them.
+With RENDER_WORKERS <= 1, a single task, inside a worker process, or when
+the pool cannot start, tasks run serially in-process (without timeouts).
+"""
+
+from __future__ import annotations
+
+import importlib
+import math
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from config import RENDER_TIMEOUT_SECONDS, RENDER_WORKERS
+from lazy_imports import module_available
+
+# Extra time the parent allows for pool start-up and result transfer
+_BACKSTOP_GRACE_SECONDS = 10.0
+
+_ALARM_AVAILABLE = hasattr(signal, "SIGALRM") and hasattr(signal, "setitimer")
+
+# Modules the fork server imports when it starts (shared by every pool)
+_FORKSERVER_PRELOAD: List[str] = []
+
+
+class RenderResult(NamedTuple):
+    value: Any = None
+    error: Optional[str] = None
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise RenderTimeout()
+
+
+def _run_task(task: Callable[[], Any], timeout: float) -> RenderResult:
+    """Worker entry point: run `task` under the alarm, capturing errors."""
+    if _ALARM_AVAILABLE and timeout > 0:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return RenderResult(value=task())
+    except RenderTimeout:
+        return RenderResult(error=f"timed out after {timeout:g}s")
+    except Exception as exc:
+        return RenderResult(error=str(exc) or type(exc).__name__)
+    finally:
+        if _ALARM_AVAILABLE and timeout > 0:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def process_context(preload: Sequence[str] = ()):
+    """
+    multiprocessing context for a worker pool that imports `preload` once.
+
+    fork copies the parent as it is, including locks that other threads
+    hold at that moment (the HTTP connection pool, snapshot store handles,
+    ...), and a child that needs one of them deadlocks. So once other
+    threads run - the daemon's request and refresh threads, a process pool's
+    manager thread - workers come from a fork server (or spawn) instead.
+    """
+    preload = [name for name in preload if module_available(name.partition(".")[0])]
+    if multiprocessing.get_start_method() != "fork":
+        return multiprocessing.get_context()
+    if threading.active_count() <= 1:
+        for name in preload:
+            importlib.import_module(name)
+        return multiprocessing.get_context()
+
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # Only takes effect when the fork server starts, i.e. for the first pool
+    _FORKSERVER_PRELOAD.extend(name for name in preload if name not in _FORKSERVER_PRELOAD)
+    context.set_forkserver_preload(_FORKSERVER_PRELOAD)
+    return context
+
+
+def _run_serially(tasks: Dict[str, Callable[[], Any]]) -> Dict[str, RenderResult]:
+    return {name: _run_task(task, 0) for name, task in tasks.items()}
+
+
+def render_many(
+    tasks: Dict[str, Callable[[], Any]],
+    timeout: float = RENDER_TIMEOUT_SECONDS,
+    workers: int = RENDER_WORKERS,
+    preload: Sequence[str] = (),
+) -> Dict[str, RenderResult]:
+    """Run every task and return {name: RenderResult}, in `tasks` order."""
+    workers = min(workers, len(tasks))
+    if workers <= 1 or multiprocessing.parent_process() is not None:
+        return _run_serially(tasks)
+
+    try:
+        pool = process_context(preload).Pool(processes=workers)
+    except (OSError, ImportError, NotImplementedError, ValueError) as exc:
+        print(
+            f"WARNING: parallel chart rendering unavailable ({type(exc).__name__}); rendering serially.",
+            file=sys.stderr,
+        )
+        return _run_serially(tasks)
+
+    results: Dict[str, RenderResult] = {}
+    hung = False
+    try:
+        pending = {name: pool.apply_async(_run_task, (task, timeout)) for name, task in tasks.items()}
+        waves = math.ceil(len(tasks) / workers)
+        deadline = time.monotonic() + timeout * waves + _BACKSTOP_GRACE_SECONDS
+        for name, pending_result in pending.items():
+            try:
+                results[name] = pending_result.get(max(0.0, deadline - time.monotonic()))
+            except multiprocessing.TimeoutError:
+                hung = True
+                results[name] = RenderResult(error=f"timed out after {timeout:g}s")
+            except Exception as exc:  # e.g. an unpicklable task or result
+                results[name] = RenderResult(error=str(exc) or type(exc).__name__)
+    finally:
+        if hung:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+    return results
+
+
+def render_errors(results: Dict[str, RenderResult]) -> Dict[str, str]:
+    """{name: error} for the tasks that failed."""
+    return {name: result.error for name, result in results.items() if result.error is not None}
@@ -0,0 +1,263 @@
+"""
+Registry of the single-report modules ("Donor Age Distribution.py", ...).
+
+The overview used to exec each module file again on every use, re-running
+its top-level code, and each chart then re-fetched its table and redid the
+aggregation its get_*_data() had just produced. Here:
+
+- load_report_module() imports each file once per process.
+- prefetch_tables() reads the source tables up front (concurrently). The
+  modules' own fetches are then served from the shared in-process caches
+  (DatabaseConnection, donor_datasets, unit_table), so all of them work
+  from the same dataset.
+- run_report() calls the module's data function once and renders its chart
+  from that result (write_chart_html), so the aggregate and the figure come
+  from a single computation. Charts whose data is unchanged since the last
+  render are skipped (chart_cache).
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from chart_cache import render_chart
+from config import PAGE_FETCH_WORKERS
+from database import DatabaseConnection
+from donor_datasets import DONOR_FORM_COLUMNS, fetch_eligibility_history
+
+BASE_DIR = Path(__file__).parent
+CHARTS_DIR = BASE_DIR / "charts"
+
+
+class ReportModule(NamedTuple):
+    """A report module file, its data function and the tables it reads."""
+
+    module_name: str
+    filename: str
+    data_function: str
+    tables: Tuple[str, ...]
+    # (chart key, HTML filename) for modules that render a chart
+    chart: Optional[Tuple[str, str]] = None
+
+
+_DONOR_FORM_TABLES = ("eligibility", "donor_form")
+
+REPORT_MODULES: Dict[str, ReportModule] = {
+    # --- KPI sources ---
+    "active_donors": ReportModule(
+        "total_active_donors", "Total Active Donors.py", "get_active_donors_data", ("eligibility",),
+    ),
+    "eligible_today": ReportModule(
+        "eligible_donors_today", "Eligible Donors Today.py", "get_eligible_donors_today",
+        ("eligibility", "today"),
+    ),
+    "available_units": ReportModule(
+        "total_blood_units_available", "Total Blood Units Available.py", "get_available_units_data",
+        ("blood_bank_units",),
+    ),
+    "nearing_expiry": ReportModule(
+        "blood_units_nearing_expiry", "Blood Units Nearing Expiry.py", "get_units_nearing_expiry_summary",
+        ("blood_bank_units", "today"),
+    ),
+    "requests_today": ReportModule(
+        "total_hospital_requests_today", "Total Hospital Requests Today.py", "get_hospital_requests_today",
+        ("blood_requests", "today"),
+    ),
+    # --- Donor demographics ---
+    "age": ReportModule(
+        "donor_age_distribution", "Donor Age Distribution.py", "get_donor_age_distribution_data",
+        _DONOR_FORM_TABLES, ("donor_age", "donor_age_distribution.html"),
+    ),
+    "location": ReportModule(
+        "donor_location_distribution", "Donor Location Distribution.py",
+        "get_donor_location_distribution_data",
+        _DONOR_FORM_TABLES, ("donor_location", "donor_location_distribution.html"),
+    ),
+    "sex": ReportModule(
+        "donor_sex_distribution", "Donor Sex Distribution.py", "get_donor_sex_distribution_data",
+        _DONOR_FORM_TABLES, ("donor_sex", "donor_sex_distribution.html"),
+    ),
+    "eligibility_status": ReportModule(
+        "donor_eligibility_status", "Donor Eligibility Status.py", "get_donor_eligibility_status_data",
+        ("eligibility",), ("donor_eligibility", "donor_eligibility_status.html"),
+    ),
+    "blood_type": ReportModule(
+        "donor_blood_type_distribution", "Donor Blood Type Distribution.py",
+        "get_donor_blood_type_distribution_data",
+        ("eligibility",), ("donor_blood_type", "donor_blood_type_distribution.html"),
+    ),
+    "donation_frequency": ReportModule(
+        "donation_frequency", "Donation Frequency.py", "get_donation_frequency_data",
+        ("eligibility",), ("donation_frequency", "donation_frequency.html"),
+    ),
+    # --- Donation activity / channels / outcomes ---
+    "donations_by_month": ReportModule(
+        "donations_by_month", "Donations by Month.py", "get_donations_by_month_data",
+        ("blood_bank_units",), ("donations_by_month", "donations_by_month.html"),
+    ),
+    "mobile_vs_inhouse": ReportModule(
+        "mobile_vs_inhouse", "Mobile Drive vs In-House Donations.py", "get_mobile_vs_inhouse_data",
+        ("donor_form",), ("mobile_vs_inhouse", "mobile_vs_inhouse.html"),
+    ),
+    "success_vs_unsuccessful": ReportModule(
+        "successful_vs_unsuccessful", "Successful vs Unsuccessful Donations.py",
+        "get_donation_success_data",
+        ("eligibility", "blood_collection"), ("successful_vs_unsuccessful", "successful_vs_unsuccessful.html"),
+    ),
+    # --- Hospital request patterns ---
+    "monthly_trend": ReportModule(
+        "monthly_blood_requests_trend", "Monthly Blood Requests Trend.py",
+        "get_monthly_requests_trend_data",
+        ("blood_requests",), ("monthly_requests_trend", "monthly_blood_requests_trend.html"),
+    ),
+    "requests_by_blood_type": ReportModule(
+        "blood_requests_by_type", "Blood Requests by Blood Type.py", "get_requests_by_blood_type_data",
+        ("blood_requests",), ("requests_by_blood_type", "blood_requests_by_type.html"),
+    ),
+}
+
+
+# --------------------------------------------------------------------------- #
+# Source tables                                                               #
+# --------------------------------------------------------------------------- #
+
+
+def _read_table(endpoint: str) -> List[Dict[str, Any]]:
+    db = DatabaseConnection()
+    rows: List[Dict[str, Any]] = []
+    if db.connect():
+        try:
+            rows = db.supabase_request(endpoint)
+        finally:
+            db.disconnect()
+    return rows
+
+
+def fetch_blood_units() -> List[Dict[str, Any]]:
+    """Fetch all blood_bank_units rows from Supabase."""
+    db = DatabaseConnection()
+    blood_units: List[Dict[str, Any]] = []
+    if db.connect():
+        try:
+            blood_units = db.fetch_blood_units()
+        finally:
+            db.disconnect()
+    return blood_units
+
+
+def fetch_blood_requests() -> List[Dict[str, Any]]:
+    """Fetch all blood_requests rows from Supabase."""
+    db = DatabaseConnection()
+    requests: List[Dict[str, Any]] = []
+    if db.connect():
+        try:
+            requests = db.fetch_blood_requests()
+        finally:
+            db.disconnect()
+    return requests
+
+
+# Canonical read per source table. Each is the same request the modules make
+# (so it is shared through the in-process cache), except donor_form, which is
+# read with every column any module uses.
+SOURCE_TABLES: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+    "eligibility": fetch_eligibility_history,
+    "donor_form": partial(_read_table, f"donor_form?select={DONOR_FORM_COLUMNS},registration_channel"),
+    "blood_collection": partial(
+        _read_table, "blood_collection?select=collection_id,donor_id,collection_date,status"
+    ),
+    "blood_bank_units": fetch_blood_units,
+    "blood_requests": fetch_blood_requests,
+}
+
+
+def prefetch_tables(tables: Iterable[str] = SOURCE_TABLES) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Read the given source tables concurrently (pseudo-tables such as "today"
+    are skipped) and return their rows by table name.
+    """
+    names = [table for table in dict.fromkeys(tables) if table in SOURCE_TABLES]
+    if not names:
+        return {}
+    workers = max(1, min(PAGE_FETCH_WORKERS, len(names)))
+    if workers == 1:
+        return {table: SOURCE_TABLES[table]() for table in names}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {table: pool.submit(SOURCE_TABLES[table]) for table in names}
+        return {table: future.result() for table, future in futures.items()}
+
+
+# --------------------------------------------------------------------------- #
+# Modules                                                                     #
+# --------------------------------------------------------------------------- #
+
+_MODULES: Dict[str, ModuleType] = {}
+_MODULES_LOCK = threading.Lock()
+
+
+def load_report_module(report: ReportModule) -> ModuleType:
+    """Import a report module by filename (spaces allowed), once per process."""
+    with _MODULES_LOCK:
+        module = _MODULES.get(report.filename)
+        if module is None:
+            path = BASE_DIR / report.filename
+            spec = importlib.util.spec_from_file_location(report.module_name, path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"Could not load spec for {report.filename}")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)  # type: ignore[call-arg]
+            _MODULES[report.filename] = module
+        return module
+
+
+def _call_data_function(report: ReportModule, module: ModuleType) -> Dict[str, Any]:
+    func = getattr(module, report.data_function, None)
+    if func is None:
+        return {}
+    try:
+        result = func()
+        if isinstance(result, dict):
+            return result
+        return {"success": True, "value": result}
+    except Exception as exc:  # pragma: no cover - defensive
+        print(f"[report_modules] Error in {report.data_function}: {exc}", file=sys.stderr)
+        return {"success": False, "error": str(exc)}
+
+
+def run_report(report: ReportModule, charts_dir: Path = CHARTS_DIR) -> Dict[str, Any]:
+    """
+    Run a report module: {"success", "data", "charts"}. The chart (if any)
+    is written to `charts_dir` from the same data result that is returned,
+    unless the file already holds the chart for that data.
+    """
+    try:
+        module = load_report_module(report)
+    except Exception as exc:  # pragma: no cover - diagnostics only
+        print(f"[report_modules] Could not load {report.filename}: {exc}", file=sys.stderr)
+        return {"success": False, "data": {"success": False, "error": str(exc)}, "charts": {}}
+
+    data = _call_data_function(report, module)
+    fragment = {"success": data.get("success", True) is not False, "data": data, "charts": {}}
+    if report.chart is not None and hasattr(module, "write_chart_html"):
+        chart_key, chart_file = report.chart
+        try:
+            charts_dir.mkdir(parents=True, exist_ok=True)
+            chart_path = charts_dir / chart_file
+            render_chart(
+                chart_path,
+                data,
+                partial(module.write_chart_html, data, str(chart_path)),
+                source=BASE_DIR / report.filename,
+            )
+            fragment["charts"][chart_key] = f"{charts_dir.name}/{chart_file}"
+        except Exception as exc:  # pragma: no cover - diagnostics only
+            print(f"[report_modules] {report.filename} chart error: {exc}", file=sys.stderr)
+            fragment["success"] = False
+    return fragment
@@ -0,0 +1,207 @@
+"""
+Long-lived reports server for the admin dashboards.
+
+The PHP APIs used to start a new Python process per request, paying the
+interpreter start, imports, Supabase reads and model selection every time.
+This server stays up instead and keeps those warm in memory:
+
+- the imported scientific / plotting stacks and the SARIMA process pool,
+- fetched tables (refreshed once older than SUPABASE_SNAPSHOT_TTL),
+- fitted models, forecast paths and the derived unit / donor indexes.
+
+Endpoints (localhost HTTP, JSON responses):
+
+    GET /dashboard?year=2025[&refresh=1]   generate_dashboard_payload(year)
+    GET /overview[?refresh=1]              generate_overview_payload()
+    GET /health
+
+Concurrent requests for the same payload are coalesced: the first one
+computes it and the others wait for and share its result. Different
+payloads are computed one at a time, since they share module caches and
+chart files. refresh=1 bypasses the Supabase snapshots like the CLI's
+SUPABASE_SNAPSHOT_REFRESH=1. With REPORTS_PAYLOAD_SWR=1, stale payloads are
+served at once and rebuilt on a background thread (payload_cache).
+
+Run:  python reports_daemon.py [--host 127.0.0.1] [--port 8765]
+The PHP APIs fall back to running the scripts directly when it is down.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from config import PAYLOAD_SWR, REPORTS_DAEMON_HOST, REPORTS_DAEMON_PORT, SNAPSHOT_TTL_SECONDS
+from dashboard_inventory_system_reports_admin import dashboard_payload_cache, generate_dashboard_payload
+from database import expire_request_cache, snapshot_refresh
+from reports_dashboard_overview import generate_overview_payload, overview_payload_cache
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls by key: while a call for a key is running,
+    further callers with that key wait for it and get the same result (or
+    exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[[], object]) -> Tuple[object, bool]:
+        """Return (result of func, whether it was shared from another caller)."""
+        with self._lock:
+            call = self._calls.get(key)
+            shared = call is not None
+            if not shared:
+                call = self._calls[key] = Future()
+        if shared:
+            return call.result(), True
+
+        try:
+            call.set_result(func())
+        except BaseException as exc:
+            call.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result(), False
+
+
+# --------------------------------------------------------------------------- #
+# Payloads                                                                    #
+# --------------------------------------------------------------------------- #
+
+_FLIGHTS = SingleFlight()
+# Payload builders share module-level caches, chart files and the snapshot
+# refresh switch, so only one runs at a time.
+_COMPUTE_LOCK = threading.Lock()
+_STARTED_AT = time.time()
+_STATS = {"computed": 0, "shared": 0, "errors": 0}
+
+
+def _compute(builder: Callable[[], Dict], refresh: bool) -> Dict:
+    with _COMPUTE_LOCK:
+        # Tables cached in memory live as long as the on-disk snapshots would
+        expire_request_cache(0 if refresh else SNAPSHOT_TTL_SECONDS)
+        with snapshot_refresh(refresh):
+            return builder()
+
+
+def dashboard_payload(year: int, refresh: bool = False) -> Dict:
+    def build() -> Dict:
+        return _compute(lambda: generate_dashboard_payload(year), refresh)
+
+    compute = build
+    if PAYLOAD_SWR:
+        compute = partial(dashboard_payload_cache(year, builder=build).get, refresh)
+    payload, shared = _FLIGHTS.do(("dashboard", year, refresh), compute)
+    _STATS["shared" if shared else "computed"] += 1
+    return payload
+
+
+def overview_payload(refresh: bool = False) -> Dict:
+    build = partial(_compute, generate_overview_payload, refresh)
+    compute = build
+    if PAYLOAD_SWR:
+        compute = partial(overview_payload_cache(builder=build).get, refresh)
+    payload, shared = _FLIGHTS.do(("overview", refresh), compute)
+    _STATS["shared" if shared else "computed"] += 1
+    return payload
+
+
+def health_payload() -> Dict:
+    return {
+        "success": True,
+        "pid": os.getpid(),
+        "started_at": datetime.fromtimestamp(_STARTED_AT).isoformat(),
+        "uptime_seconds": round(time.time() - _STARTED_AT, 1),
+        "requests": dict(_STATS),
+    }
+
+
+# --------------------------------------------------------------------------- #
+# HTTP server                                                                 #
+# --------------------------------------------------------------------------- #
+
+
+def _flag(query: Dict[str, list], name: str) -> bool:
+    value = query.get(name, ["0"])[-1]
+    return value not in ("", "0")
+
+
+class ReportsRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ReportsDaemon/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path == "/dashboard":
+                year = int(query.get("year", [datetime.now().year])[-1])
+                payload = dashboard_payload(year, _flag(query, "refresh"))
+            elif url.path == "/overview":
+                payload = overview_payload(_flag(query, "refresh"))
+            elif url.path == "/health":
+                payload = health_payload()
+            else:
+                self._send_json(404, {"success": False, "error": f"Unknown endpoint: {url.path}"})
+                return
+        except ValueError as exc:
+            self._send_json(400, {"success": False, "error": str(exc)})
+            return
+        except Exception as exc:  # pragma: no cover - diagnostics
+            _STATS["errors"] += 1
+            print(f"[reports_daemon] {url.path} failed: {exc}", file=sys.stderr)
+            self._send_json(500, {"success": False, "error": str(exc)})
+            return
+        self._send_json(200, payload)
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"[reports_daemon] {self.address_string()} {format % args}", file=sys.stderr)
+
+
+def serve(host: str = REPORTS_DAEMON_HOST, port: int = REPORTS_DAEMON_PORT) -> None:
+    # Chart files must land where forecast-asset.php serves them, as they do
+    # when PHP runs the scripts from this directory
+    os.chdir(BASE_DIR)
+    server = ThreadingHTTPServer((host, port), ReportsRequestHandler)
+    server.daemon_threads = True
+    print(f"[reports_daemon] listening on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reports dashboard server")
+    parser.add_argument("--host", default=REPORTS_DAEMON_HOST, help="Interface to bind (default: localhost)")
+    parser.add_argument("--port", type=int, default=REPORTS_DAEMON_PORT, help="TCP port")
+    args = parser.parse_args()
+
+    serve(args.host, args.port)
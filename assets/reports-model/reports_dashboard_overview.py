@@ -20,63 +20,32 @@ from __future__ import annotations
 
 import json
 import sys
-from datetime import datetime
+from datetime import date, datetime
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+
+from config import PAYLOAD_SWR, SNAPSHOT_REFRESH
 from database import DatabaseConnection
+from payload_cache import PayloadCache
+from report_modules import (
+    REPORT_MODULES,
+    ReportModule,
+    fetch_blood_requests,
+    fetch_blood_units,
+    prefetch_tables,
+    run_report,
+)
+from render_pool import render_many
+from section_cache import Section, SectionCache, table_fingerprint
+from unit_table import UnitTable, get_unit_table, month_keys
 
 BASE_DIR = Path(__file__).parent
 CHARTS_DIR = BASE_DIR / "charts"
 
 
-def _load_module(module_name: str, filename: str):
-    """
-    Dynamically load a Python module by filename, even if it contains spaces.
-    """
-    import importlib.util
-
-    path = BASE_DIR / filename
-    spec = importlib.util.spec_from_file_location(module_name, path)
-    if spec is None or spec.loader is None:
-        raise ImportError(f"Could not load spec for {filename}")
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)  # type: ignore[call-arg]
-    return module
-
-
-def _safe_call(func, *args, **kwargs) -> Dict[str, Any]:
-    """
-    Call a function and wrap any exception into a structured error dict.
-    Always returns a dict.
-    """
-    try:
-        result = func(*args, **kwargs)
-        # If the function already returns a dict-like object, just pass it through
-        if isinstance(result, dict):
-            return result
-        return {"success": True, "value": result}
-    except Exception as exc:  # pragma: no cover - defensive
-        print(f"[reports_dashboard_overview] Error in {func.__name__}: {exc}", file=sys.stderr)
-        return {"success": False, "error": str(exc)}
-
-
-def _ensure_charts_dir():
-    CHARTS_DIR.mkdir(parents=True, exist_ok=True)
-
-
-def _fetch_blood_units() -> List[Dict[str, Any]]:
-    """Fetch all blood_bank_units rows from Supabase."""
-    db = DatabaseConnection()
-    blood_units: List[Dict[str, Any]] = []
-    if db.connect():
-        try:
-            blood_units = db.fetch_blood_units()
-        finally:
-            db.disconnect()
-    return blood_units
-
-
 def _classify_unit_status(unit: Dict[str, Any]) -> str:
     """
     Map raw blood_bank_units status fields into the canonical status values
@@ -105,6 +74,26 @@ def _classify_unit_status(unit: Dict[str, Any]) -> str:
     return "Valid"
 
 
+_STATUS_BUCKETS = ("Valid", "Buffer", "handed_over", "disposed")
+
+
+def _unit_status_buckets(table: UnitTable) -> np.ndarray:
+    """Vectorized _classify_unit_status: index into _STATUS_BUCKETS per unit."""
+    stripped = np.array([(status or "").strip() for status in table.status], dtype=object)
+    codes = np.where(table.has_handed_over_at, 2, np.where(table.has_disposed_at, 3, 0))
+    for code, name in enumerate(_STATUS_BUCKETS):
+        codes = np.where(stripped == name, code, codes)
+    return codes
+
+
+def _years(values: np.ndarray) -> np.ndarray:
+    return values.astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+def _iso_dates(values: np.ndarray) -> List[str]:
+    return values.astype("datetime64[D]").astype(str).tolist()
+
+
 def _aggregate_units_collected_by_status(
     blood_units: List[Dict[str, Any]] | None = None,
 ) -> Dict[str, Any]:
@@ -114,55 +103,32 @@ def _aggregate_units_collected_by_status(
       - Uses collected_at month
       - Groups counts by status (Valid / Handed Over / Disposed / Other)
     """
-    from datetime import datetime as _dt
-
     # Allow caller to pass in pre-fetched blood_units to avoid repeated DB hits
     if blood_units is None:
-        blood_units = _fetch_blood_units()
-
-    by_month: Dict[str, Dict[str, int]] = {}
-
-    for unit in blood_units:
-        collected_at = unit.get("collected_at") or unit.get("created_at")
-        if not collected_at:
-            continue
-        try:
-            text = str(collected_at)
-            if "Z" in text:
-                dt = _dt.fromisoformat(text.replace("Z", "+00:00"))
-            else:
-                dt = _dt.fromisoformat(text)
-        except Exception:
-            continue
+        blood_units = fetch_blood_units()
 
-        if dt.tzinfo:
-            dt = dt.replace(tzinfo=None)
+    table = get_unit_table(blood_units)
+    dates = table.collected_or_created
+    mask = (table.has_collected_at | table.has_created_at) & ~np.isnat(dates)
 
-        month_key = dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0).strftime(
-            "%Y-%m-%d"
-        )
-        bucket = by_month.setdefault(
-            month_key,
-            {"Valid": 0, "Buffer": 0, "handed_over": 0, "disposed": 0},
-        )
-        status_bucket = _classify_unit_status(unit)
-        if status_bucket not in bucket:
-            # Ignore completely unknown statuses for this summary
-            continue
-        bucket[status_bucket] += 1
+    months, month_index = np.unique(
+        dates[mask].astype("datetime64[M]"), return_inverse=True
+    )
+    buckets = _unit_status_buckets(table)[mask]
+    counts = np.zeros((len(months), len(_STATUS_BUCKETS)), dtype=np.int64)
+    np.add.at(counts, (month_index.reshape(-1), buckets), 1)
 
     rows: List[Dict[str, Any]] = []
-    for month in sorted(by_month.keys()):
-        counts = by_month[month]
-        total = sum(counts.values())
+    for month, month_counts in zip(month_keys(months), counts.tolist()):
+        valid, buffer, handed_over, disposed = month_counts
         rows.append(
             {
                 "month": month,
-                "total_collected": total,
-                "valid": counts.get("Valid", 0),
-                "buffer": counts.get("Buffer", 0),
-                "handed_over": counts.get("handed_over", 0),
-                "disposed": counts.get("disposed", 0),
+                "total_collected": valid + buffer + handed_over + disposed,
+                "valid": valid,
+                "buffer": buffer,
+                "handed_over": handed_over,
+                "disposed": disposed,
             }
         )
 
@@ -180,34 +146,23 @@ def _aggregate_units_allocated(
       - handed_over_at (date part)
     Grouped per year of handed_over_at.
     """
-    units = blood_units if blood_units is not None else _fetch_blood_units()
-    per_year: Dict[str, List[Dict[str, Any]]] = {}
-
-    for unit in units:
-        hospital = (unit.get("hospital_from") or "").strip()
-        handed = unit.get("handed_over_at")
-        if not hospital or not handed:
-            continue
-
-        try:
-            text = str(handed)
-            if "Z" in text:
-                dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
-            else:
-                dt = datetime.fromisoformat(text)
-        except Exception:
-            continue
+    units = blood_units if blood_units is not None else fetch_blood_units()
+    table = get_unit_table(units)
+    hospitals = [(unit.get("hospital_from") or "").strip() for unit in units]
+    has_hospital = np.array([bool(hospital) for hospital in hospitals], dtype=bool)
 
-        if dt.tzinfo:
-            dt = dt.replace(tzinfo=None)
+    mask = has_hospital & table.has_handed_over_at & ~np.isnat(table.handed_over_at)
+    indices = np.flatnonzero(mask)
+    handed = table.handed_over_at[indices]
 
-        year = str(dt.year)
-        date_alloc = dt.date().isoformat()
-        per_year.setdefault(year, []).append(
+    per_year: Dict[str, List[Dict[str, Any]]] = {}
+    for i, year, date_alloc in zip(indices.tolist(), _years(handed).tolist(), _iso_dates(handed)):
+        unit = units[i]
+        per_year.setdefault(str(year), []).append(
             {
                 "serial_number": unit.get("unit_serial_number"),
                 "blood_type": unit.get("blood_type"),
-                "hospital": hospital,
+                "hospital": hospitals[i],
                 "date_allocated": date_alloc,
             }
         )
@@ -225,48 +180,31 @@ def _aggregate_units_expired(
       - expires_at (date)
     Grouped per year of expires_at.
     """
-    units = blood_units if blood_units is not None else _fetch_blood_units()
-    per_year: Dict[str, List[Dict[str, Any]]] = {}
-
-    for unit in units:
-        if _classify_unit_status(unit) != "disposed":
-            continue
-
-        collected = unit.get("collected_at")
-        expires = unit.get("expires_at")
-        if not collected or not expires:
-            continue
-
-        try:
-            c_text = str(collected)
-            if "Z" in c_text:
-                c_dt = datetime.fromisoformat(c_text.replace("Z", "+00:00"))
-            else:
-                c_dt = datetime.fromisoformat(c_text)
-        except Exception:
-            continue
-
-        try:
-            e_text = str(expires)
-            if "Z" in e_text:
-                e_dt = datetime.fromisoformat(e_text.replace("Z", "+00:00"))
-            else:
-                e_dt = datetime.fromisoformat(e_text)
-        except Exception:
-            continue
-
-        if c_dt.tzinfo:
-            c_dt = c_dt.replace(tzinfo=None)
-        if e_dt.tzinfo:
-            e_dt = e_dt.replace(tzinfo=None)
+    units = blood_units if blood_units is not None else fetch_blood_units()
+    table = get_unit_table(units)
+
+    mask = (
+        (_unit_status_buckets(table) == _STATUS_BUCKETS.index("disposed"))
+        & table.has_collected_at
+        & table.has_expires_at
+        & ~np.isnat(table.collected_at)
+        & ~np.isnat(table.expires_at)
+    )
+    indices = np.flatnonzero(mask)
+    collected = _iso_dates(table.collected_at[indices])
+    expires = table.expires_at[indices]
 
-        year = str(e_dt.year)
-        per_year.setdefault(year, []).append(
+    per_year: Dict[str, List[Dict[str, Any]]] = {}
+    for i, year, date_collected, date_expired in zip(
+        indices.tolist(), _years(expires).tolist(), collected, _iso_dates(expires)
+    ):
+        unit = units[i]
+        per_year.setdefault(str(year), []).append(
             {
                 "serial_number": unit.get("unit_serial_number"),
                 "blood_type": unit.get("blood_type"),
-                "date_collected": c_dt.date().isoformat(),
-                "date_expired": e_dt.date().isoformat(),
+                "date_collected": date_collected,
+                "date_expired": date_expired,
             }
         )
 
@@ -282,45 +220,32 @@ def _aggregate_pending_units_for_release(
       - status indicates Valid/Buffer (still in stock)
     Grouped per year of collected_at.
     """
-    units = blood_units if blood_units is not None else _fetch_blood_units()
-    per_year: Dict[str, List[Dict[str, Any]]] = {}
-
-    for unit in units:
-        if not unit.get("is_check"):
-            continue
-
-        status = (unit.get("status") or "").strip()
-        status_lower = status.lower()
-        if status_lower not in ("valid", "buffer", ""):
-            continue
-
-        collected = unit.get("collected_at") or unit.get("created_at")
-        if not collected:
-            continue
-
-        try:
-            text = str(collected)
-            if "Z" in text:
-                dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
-            else:
-                dt = datetime.fromisoformat(text)
-        except Exception:
-            continue
+    units = blood_units if blood_units is not None else fetch_blood_units()
+    table = get_unit_table(units)
+    statuses = [(status or "").strip() for status in table.status]
+    in_stock = np.array(
+        [status.lower() in ("valid", "buffer", "") for status in statuses], dtype=bool
+    )
 
-        if dt.tzinfo:
-            dt = dt.replace(tzinfo=None)
+    dates = table.collected_or_created
+    mask = (
+        table.is_check
+        & in_stock
+        & (table.has_collected_at | table.has_created_at)
+        & ~np.isnat(dates)
+    )
+    indices = np.flatnonzero(mask)
 
-        year = str(dt.year)
-        request_id = unit.get("request_id")
+    per_year: Dict[str, List[Dict[str, Any]]] = {}
+    for i, year in zip(indices.tolist(), _years(dates[indices]).tolist()):
+        unit = units[i]
         # Per user: if status is Valid/Buffer, do not include request_id value
-        out_request_id = "" if status_lower in ("valid", "buffer", "") else request_id
-
-        per_year.setdefault(year, []).append(
+        per_year.setdefault(str(year), []).append(
             {
                 "serial_number": unit.get("unit_serial_number"),
                 "blood_type": unit.get("blood_type"),
-                "request_id": out_request_id,
-                "status": status or "Pending",
+                "request_id": "",
+                "status": statuses[i] or "Pending",
             }
         )
 
@@ -460,209 +385,123 @@ def _aggregate_decline_reasons(
     }
 
 
-def _generate_demographic_charts() -> Dict[str, str]:
+# --------------------------------------------------------------------------- #
+# Sections                                                                    #
+# --------------------------------------------------------------------------- #
+#
+# The payload is assembled from independently cached sections (section_cache).
+# Each section declares the tables it reads ("today" for date-relative KPIs)
+# and is rebuilt only when one of them changed since its stored fragment.
+# A fragment is {"success", "data", "charts"}.
+
+
+# Last fingerprint per table with the row list it was computed from, so a
+# long-lived process does not rehash rows served from its in-memory cache
+_TABLE_VERSIONS: Dict[str, Tuple[List[Dict[str, Any]], str]] = {}
+
+
+def _table_versions() -> Dict[str, str]:
     """
-    Generate / refresh interactive HTML charts for the donor & hospital overview.
-    Returns a mapping of logical chart keys to filenames (relative within
-    assets/reports-model).
+    Current version of every source table the overview sections read. The
+    tables are prefetched here, so the sections then share these reads.
     """
-    _ensure_charts_dir()
+    versions = {"today": date.today().isoformat()}
+    for table, rows in prefetch_tables().items():
+        known = _TABLE_VERSIONS.get(table)
+        if known is None or known[0] is not rows:
+            known = _TABLE_VERSIONS[table] = (rows, table_fingerprint(rows))
+        versions[table] = known[1]
+    return versions
 
-    chart_files: Dict[str, str] = {}
 
-    # Donor demographics
-    try:
-        age_mod = _load_module("donor_age_distribution", "Donor Age Distribution.py")
-        age_path = CHARTS_DIR / "donor_age_distribution.html"
-        age_mod.generate_chart_html(str(age_path))
-        chart_files["donor_age"] = "charts/donor_age_distribution.html"
-    except Exception as exc:  # pragma: no cover - diagnostics only
-        print(f"[reports_dashboard_overview] Age chart error: {exc}", file=sys.stderr)
+def _module_section(name: str, report: ReportModule) -> Section:
+    """Section backed by a report module (data and chart, see report_modules)."""
+    return Section(name, report.tables, partial(run_report, report, CHARTS_DIR))
 
-    try:
-        loc_mod = _load_module("donor_location_distribution", "Donor Location Distribution.py")
-        loc_path = CHARTS_DIR / "donor_location_distribution.html"
-        loc_mod.generate_chart_html(str(loc_path))
-        chart_files["donor_location"] = "charts/donor_location_distribution.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Location chart error: {exc}", file=sys.stderr)
 
-    try:
-        sex_mod = _load_module("donor_sex_distribution", "Donor Sex Distribution.py")
-        sex_path = CHARTS_DIR / "donor_sex_distribution.html"
-        sex_mod.generate_chart_html(str(sex_path))
-        chart_files["donor_sex"] = "charts/donor_sex_distribution.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Sex chart error: {exc}", file=sys.stderr)
+def _unit_aggregates_section() -> Dict[str, Any]:
+    # Fetch blood units once and reuse for all unit-level aggregations
+    blood_units = fetch_blood_units()
+    return {
+        "data": {
+            "units_collected_status_monthly": _aggregate_units_collected_by_status(blood_units),
+            "units_allocated": _aggregate_units_allocated(blood_units),
+            "units_expired": _aggregate_units_expired(blood_units),
+            "pending_units": _aggregate_pending_units_for_release(blood_units),
+        },
+        "charts": {},
+    }
 
-    try:
-        elig_mod = _load_module("donor_eligibility_status", "Donor Eligibility Status.py")
-        elig_path = CHARTS_DIR / "donor_eligibility_status.html"
-        # Reuse data-only function; the HTML is not strictly needed yet,
-        # but keep a placeholder call pattern for future enhancements.
-        if hasattr(elig_mod, "generate_chart_html"):
-            elig_mod.generate_chart_html(str(elig_path))
-            chart_files["donor_eligibility"] = "charts/donor_eligibility_status.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Eligibility chart error: {exc}", file=sys.stderr)
 
-    try:
-        bt_mod = _load_module("donor_blood_type_distribution", "Donor Blood Type Distribution.py")
-        bt_path = CHARTS_DIR / "donor_blood_type_distribution.html"
-        bt_mod.generate_chart_html(str(bt_path))
-        chart_files["donor_blood_type"] = "charts/donor_blood_type_distribution.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Blood type chart error: {exc}", file=sys.stderr)
+def _request_aggregates_section() -> Dict[str, Any]:
+    # Fetch blood requests once and reuse for status / decline aggregates
+    blood_requests = fetch_blood_requests()
+    return {
+        "data": {
+            "totals_by_status": _aggregate_requests_by_status(blood_requests),
+            "declined_reasons": _aggregate_decline_reasons(blood_requests),
+        },
+        "charts": {},
+    }
 
-    try:
-        freq_mod = _load_module("donation_frequency", "Donation Frequency.py")
-        freq_path = CHARTS_DIR / "donation_frequency.html"
-        freq_mod.generate_chart_html(str(freq_path))
-        chart_files["donation_frequency"] = "charts/donation_frequency.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Donation frequency chart error: {exc}", file=sys.stderr)
-
-    # Donation activity / channels / outcomes
-    try:
-        month_mod = _load_module("donations_by_month", "Donations by Month.py")
-        month_path = CHARTS_DIR / "donations_by_month.html"
-        month_mod.generate_chart_html(str(month_path))
-        chart_files["donations_by_month"] = "charts/donations_by_month.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Donations by month chart error: {exc}", file=sys.stderr)
 
-    try:
-        mobile_mod = _load_module("mobile_vs_inhouse", "Mobile Drive vs In-House Donations.py")
-        mobile_path = CHARTS_DIR / "mobile_vs_inhouse.html"
-        mobile_mod.generate_chart_html(str(mobile_path))
-        chart_files["mobile_vs_inhouse"] = "charts/mobile_vs_inhouse.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Mobile vs in-house chart error: {exc}", file=sys.stderr)
+OVERVIEW_SECTIONS: List[Section] = [
+    # --- KPI sources, donor demographics, donation activity, request patterns ---
+    *(_module_section(name, report) for name, report in REPORT_MODULES.items()),
+    # --- Units / allocation breakdown from blood_bank_units and hospital requests ---
+    Section("unit_aggregates", ("blood_bank_units",), _unit_aggregates_section),
+    Section("request_aggregates", ("blood_requests",), _request_aggregates_section),
+]
 
-    try:
-        success_mod = _load_module(
-            "successful_vs_unsuccessful", "Successful vs Unsuccessful Donations.py"
-        )
-        success_path = CHARTS_DIR / "successful_vs_unsuccessful.html"
-        if hasattr(success_mod, "generate_chart_html"):
-            success_mod.generate_chart_html(str(success_path))
-            chart_files["successful_vs_unsuccessful"] = "charts/successful_vs_unsuccessful.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Success vs unsuccessful chart error: {exc}", file=sys.stderr)
-
-    # Hospital request patterns
-    try:
-        req_trend_mod = _load_module(
-            "monthly_blood_requests_trend", "Monthly Blood Requests Trend.py"
-        )
-        req_trend_path = CHARTS_DIR / "monthly_blood_requests_trend.html"
-        req_trend_mod.generate_chart_html(str(req_trend_path))
-        chart_files["monthly_requests_trend"] = "charts/monthly_blood_requests_trend.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Monthly requests trend chart error: {exc}", file=sys.stderr)
 
-    try:
-        req_bt_mod = _load_module("blood_requests_by_type", "Blood Requests by Blood Type.py")
-        req_bt_path = CHARTS_DIR / "blood_requests_by_type.html"
-        req_bt_mod.generate_chart_html(str(req_bt_path))
-        chart_files["requests_by_blood_type"] = "charts/blood_requests_by_type.html"
-    except Exception as exc:  # pragma: no cover
-        print(f"[reports_dashboard_overview] Requests by blood type chart error: {exc}", file=sys.stderr)
+def _charts_exist(fragment: Dict[str, Any]) -> bool:
+    return all((BASE_DIR / path).is_file() for path in fragment.get("charts", {}).values())
+
 
-    return chart_files
+def _build_sections(sections: Sequence[Section]) -> Dict[str, Dict[str, Any]]:
+    """Build sections concurrently (render_pool); failures become failed fragments."""
+    results = render_many(
+        {section.name: section.build for section in sections}, preload=("plotly.graph_objects",)
+    )
+    fragments: Dict[str, Dict[str, Any]] = {}
+    for name, result in results.items():
+        if result.error is not None:
+            print(f"[reports_dashboard_overview] {name} failed: {result.error}", file=sys.stderr)
+            fragments[name] = {"success": False, "data": {"success": False, "error": result.error}, "charts": {}}
+        else:
+            fragments[name] = result.value
+    return fragments
 
 
 def generate_overview_payload() -> Dict[str, Any]:
     """
     Entry point for the PHP API.
     Returns a JSON-serialisable dict with KPIs and supporting datasets.
+    Sections whose source tables are unchanged are served from the section
+    cache; `section_cache` in the payload lists what was rebuilt.
     """
-    # --- KPI sources ---
-    active_mod = _load_module("total_active_donors", "Total Active Donors.py")
-    eligible_mod = _load_module("eligible_donors_today", "Eligible Donors Today.py")
-    available_mod = _load_module("total_blood_units_available", "Total Blood Units Available.py")
-    nearing_mod = _load_module("blood_units_nearing_expiry", "Blood Units Nearing Expiry.py")
-    hosp_today_mod = _load_module("total_hospital_requests_today", "Total Hospital Requests Today.py")
-
-    active_data = _safe_call(active_mod.get_active_donors_data)
-    eligible_data = _safe_call(eligible_mod.get_eligible_donors_today)
-    available_data = _safe_call(available_mod.get_available_units_data)
-    nearing_data = _safe_call(nearing_mod.get_units_nearing_expiry_summary)
-    hosp_today_data = _safe_call(hosp_today_mod.get_hospital_requests_today)
-
-    # --- Donor demographics ---
-    age_mod = _load_module("donor_age_distribution", "Donor Age Distribution.py")
-    loc_mod = _load_module("donor_location_distribution", "Donor Location Distribution.py")
-    sex_mod = _load_module("donor_sex_distribution", "Donor Sex Distribution.py")
-    elig_status_mod = _load_module("donor_eligibility_status", "Donor Eligibility Status.py")
-    bt_mod = _load_module("donor_blood_type_distribution", "Donor Blood Type Distribution.py")
-    freq_mod = _load_module("donation_frequency", "Donation Frequency.py")
-
-    age_data = _safe_call(age_mod.get_donor_age_distribution_data)
-    loc_data = _safe_call(loc_mod.get_donor_location_distribution_data)
-    sex_data = _safe_call(sex_mod.get_donor_sex_distribution_data)
-    elig_status_data = _safe_call(elig_status_mod.get_donor_eligibility_status_data)
-    bt_data = _safe_call(bt_mod.get_donor_blood_type_distribution_data)
-    freq_data = _safe_call(freq_mod.get_donation_frequency_data)
-
-    # --- Donation activity / channels / outcomes ---
-    donations_month_mod = _load_module("donations_by_month", "Donations by Month.py")
-    mobile_vs_inhouse_mod = _load_module(
-        "mobile_vs_inhouse", "Mobile Drive vs In-House Donations.py"
-    )
-    success_mod = _load_module(
-        "successful_vs_unsuccessful", "Successful vs Unsuccessful Donations.py"
+    fragments, rebuilt = SectionCache("reports_overview").resolve(
+        OVERVIEW_SECTIONS, _table_versions(), valid=_charts_exist, build_many=_build_sections
     )
-
-    donations_month_data = _safe_call(donations_month_mod.get_donations_by_month_data)
-    mobile_vs_inhouse_data = _safe_call(mobile_vs_inhouse_mod.get_mobile_vs_inhouse_data)
-    success_data = _safe_call(success_mod.get_donation_success_data)
-
-    # --- Hospital request patterns ---
-    monthly_req_trend_mod = _load_module(
-        "monthly_blood_requests_trend", "Monthly Blood Requests Trend.py"
-    )
-    requests_by_type_mod = _load_module("blood_requests_by_type", "Blood Requests by Blood Type.py")
-
-    monthly_req_trend_data = _safe_call(
-        monthly_req_trend_mod.get_monthly_requests_trend_data
-    ) if hasattr(monthly_req_trend_mod, "get_monthly_requests_trend_data") else {}
-    requests_by_type_data = _safe_call(
-        requests_by_type_mod.get_requests_by_blood_type_data
-    )
-
-    # --- Units / allocation breakdown from blood_bank_units and hospital requests ---
-    # Fetch blood units once and reuse for all unit-level aggregations
-    blood_units_for_aggregates = _fetch_blood_units()
-    units_collected_status = _aggregate_units_collected_by_status(blood_units_for_aggregates)
-    units_allocated = _aggregate_units_allocated(blood_units_for_aggregates)
-    units_expired = _aggregate_units_expired(blood_units_for_aggregates)
-    pending_units = _aggregate_pending_units_for_release(blood_units_for_aggregates)
-
-    # Fetch blood requests once and reuse for status / decline aggregates
-    db = DatabaseConnection()
-    blood_requests_for_aggregates: List[Dict[str, Any]] = []
-    if db.connect():
-        try:
-            blood_requests_for_aggregates = db.fetch_blood_requests()
-        finally:
-            db.disconnect()
-    requests_status_by_year = _aggregate_requests_by_status(blood_requests_for_aggregates)
-    declined_reasons_data = _aggregate_decline_reasons(blood_requests_for_aggregates)
+    data = {name: fragment.get("data", {}) for name, fragment in fragments.items()}
 
     # --- Charts (HTML) ---
-    chart_files = _generate_demographic_charts()
+    chart_files: Dict[str, str] = {}
+    for section in OVERVIEW_SECTIONS:
+        chart_files.update(fragments[section.name].get("charts", {}))
 
     # --- KPIs for top row ---
     kpis = {
-        "total_active_donors": int(active_data.get("total_active", 0)),
-        "total_registered_donors": int(active_data.get("total_donors", 0)),
-        "eligible_donors_today": int(eligible_data.get("total_eligible", 0)),
-        "total_blood_units_available": int(available_data.get("total_available", 0)),
-        "units_nearing_expiry": int(nearing_data.get("total_nearing_expiry", 0)),
-        "total_hospital_requests_today": int(hosp_today_data.get("total_today", 0)),
+        "total_active_donors": int(data["active_donors"].get("total_active", 0)),
+        "total_registered_donors": int(data["active_donors"].get("total_donors", 0)),
+        "eligible_donors_today": int(data["eligible_today"].get("total_eligible", 0)),
+        "total_blood_units_available": int(data["available_units"].get("total_available", 0)),
+        "units_nearing_expiry": int(data["nearing_expiry"].get("total_nearing_expiry", 0)),
+        "total_hospital_requests_today": int(data["requests_today"].get("total_today", 0)),
     }
 
+    units = data["unit_aggregates"]
+    requests = data["request_aggregates"]
     return {
         "success": True,
         "generated_at": datetime.now().isoformat(),
@@ -670,44 +509,66 @@ def generate_overview_payload() -> Dict[str, Any]:
         "charts": chart_files,
         "sections": {
             "donor_demographics": {
-                "age": age_data,
-                "location": loc_data,
-                "sex": sex_data,
-                "eligibility_status": elig_status_data,
-                "blood_type": bt_data,
-                "donation_frequency": freq_data,
+                "age": data["age"],
+                "location": data["location"],
+                "sex": data["sex"],
+                "eligibility_status": data["eligibility_status"],
+                "blood_type": data["blood_type"],
+                "donation_frequency": data["donation_frequency"],
             },
             "donation_activity": {
-                "donations_by_month": donations_month_data,
-                "mobile_vs_inhouse": mobile_vs_inhouse_data,
-                "success_vs_unsuccessful": success_data,
+                "donations_by_month": data["donations_by_month"],
+                "mobile_vs_inhouse": data["mobile_vs_inhouse"],
+                "success_vs_unsuccessful": data["success_vs_unsuccessful"],
             },
             "hospital_requests": {
-                "requests_today": hosp_today_data,
-                "monthly_trend": monthly_req_trend_data,
-                "requests_by_blood_type": requests_by_type_data,
-                "totals_by_status": requests_status_by_year,
-                "declined_reasons": declined_reasons_data,
+                "requests_today": data["requests_today"],
+                "monthly_trend": data["monthly_trend"],
+                "requests_by_blood_type": data["requests_by_blood_type"],
+                "totals_by_status": requests.get("totals_by_status", {}),
+                "declined_reasons": requests.get("declined_reasons", {}),
             },
             "inventory": {
-                "available_units": available_data,
-                "units_nearing_expiry": nearing_data,
-                "units_collected_status_monthly": units_collected_status,
-                "units_allocated": units_allocated,
-                "units_expired": units_expired,
-                "pending_units": pending_units,
+                "available_units": data["available_units"],
+                "units_nearing_expiry": data["nearing_expiry"],
+                "units_collected_status_monthly": units.get("units_collected_status_monthly", {}),
+                "units_allocated": units.get("units_allocated", {}),
+                "units_expired": units.get("units_expired", {}),
+                "pending_units": units.get("pending_units", {}),
             },
             "donor_status": {
-                "active_donors": active_data,
-                "eligible_today": eligible_data,
+                "active_donors": data["active_donors"],
+                "eligible_today": data["eligible_today"],
             },
         },
+        "section_cache": {
+            "rebuilt": rebuilt,
+            "cached": [name for name in fragments if name not in rebuilt],
+        },
     }
 
 
-def main():
+def overview_payload_cache(
+    builder: Optional[Callable[[], Dict[str, Any]]] = None,
+    rebuild_command: Optional[List[str]] = None,
+) -> PayloadCache:
+    """Stale-while-revalidate cache of the overview payload (payload_cache)."""
+    return PayloadCache("reports_overview", builder or generate_overview_payload, rebuild_command)
+
+
+def main(rebuild_cache: bool = False):
     try:
-        payload = generate_overview_payload()
+        if rebuild_cache:
+            # Detached background rebuild started by payload_cache
+            overview_payload_cache().rebuild()
+            return
+        if PAYLOAD_SWR:
+            cache = overview_payload_cache(
+                rebuild_command=[sys.executable, str(Path(__file__).resolve()), "--rebuild-cache"]
+            )
+            payload = cache.get(refresh=SNAPSHOT_REFRESH)
+        else:
+            payload = generate_overview_payload()
         print(json.dumps(payload, indent=2))
     except Exception as exc:  # pragma: no cover - fatal diagnostics
         error_payload = {"success": False, "error": str(exc)}
@@ -715,6 +576,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Reports overview payload")
+    parser.add_argument(
+        "--rebuild-cache", action="store_true", help="Rebuild the stored payload (no output)"
+    )
+    args = parser.parse_args()
 
+    main(rebuild_cache=args.rebuild_cache)
@@ -0,0 +1,120 @@
+"""
+Section-level cache for composite report payloads.
+
+A payload is split into sections. Each section declares the source tables
+it reads, and the cache stores each section's last fragment together with
+the table versions it was computed from. On the next run, only sections
+whose tables changed are rebuilt; the rest are served from their stored
+fragments, and the payload is assembled from both.
+
+- Table versions are content fingerprints (table_fingerprint) of canonical
+  reads, so they change exactly when the rows do. Pseudo-sources such as the
+  current date can be versioned the same way (e.g. "today" -> "2025-03-01").
+- Fragments reporting {"success": False} are not stored, so a failed section
+  is retried next run.
+- Fragments live in a SnapshotStore entry per payload under the cache dir.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import SECTION_CACHE_DIR, SECTION_CACHE_ENABLED
+from snapshot_store import SnapshotStore
+
+_STORE: Optional[SnapshotStore] = None
+
+
+class Section(NamedTuple):
+    """One independently cacheable part of a payload."""
+
+    name: str
+    tables: Tuple[str, ...]
+    build: Callable[[], Dict[str, Any]]
+
+
+def get_section_store() -> SnapshotStore:
+    """Section store; entries never expire by age (versions decide)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = SnapshotStore(SECTION_CACHE_DIR, ttl_seconds=float("inf"), max_bytes=0)
+    return _STORE
+
+
+def table_fingerprint(rows: List[Dict]) -> str:
+    """Content hash of fetched rows (order-sensitive, like the reports)."""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(json.dumps(row, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class SectionCache:
+    """Stored fragments of payload `name`, keyed by section name."""
+
+    def __init__(self, name: str, enabled: bool = SECTION_CACHE_ENABLED):
+        self.name = name
+        self.enabled = enabled
+
+    def resolve(
+        self,
+        sections: Sequence[Section],
+        versions: Dict[str, str],
+        valid: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        build_many: Optional[Callable[[Sequence[Section]], Dict[str, Dict[str, Any]]]] = None,
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Fragments for every section, plus the names of the rebuilt ones. A
+        stored fragment is reused when the versions of all its tables match
+        `versions` and `valid(fragment)` holds (e.g. its chart files exist).
+        The other sections are built together by `build_many(sections)`
+        ({name: fragment}, e.g. concurrently), or one by one by default.
+        """
+        stored = self._load() if self.enabled else {}
+        fragments: Dict[str, Dict[str, Any]] = {}
+        entries: Dict[str, Dict[str, Any]] = {}
+        stale: List[Section] = []
+
+        for section in sections:
+            entry = stored.get(section.name)
+            if (
+                isinstance(entry, dict)
+                and entry.get("tables") == self._versions(section, versions)
+                and isinstance(entry.get("fragment"), dict)
+                and (valid is None or valid(entry["fragment"]))
+            ):
+                fragments[section.name] = entry["fragment"]
+                entries[section.name] = entry
+            else:
+                stale.append(section)
+
+        if build_many is not None and stale:
+            built = build_many(stale)
+        else:
+            built = {section.name: section.build() for section in stale}
+        for section in stale:
+            fragment = fragments[section.name] = built[section.name]
+            if fragment.get("success", True):
+                entries[section.name] = {"tables": self._versions(section, versions), "fragment": fragment}
+
+        # Keep the sections' order in the result
+        fragments = {section.name: fragments[section.name] for section in sections}
+        rebuilt = [section.name for section in stale]
+
+        if self.enabled and rebuilt:
+            get_section_store().put(self.name, entries)
+        return fragments, rebuilt
+
+    def clear(self) -> None:
+        get_section_store().delete(self.name)
+
+    @staticmethod
+    def _versions(section: Section, versions: Dict[str, str]) -> Dict[str, str]:
+        return {table: versions.get(table, "") for table in section.tables}
+
+    def _load(self) -> Dict[str, Any]:
+        stored = get_section_store().get(self.name)
+        return stored if isinstance(stored, dict) else {}
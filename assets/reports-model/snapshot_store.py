@@ -0,0 +1,186 @@
+"""
+Cross-process on-disk snapshot store.
+
+PHP starts a fresh Python interpreter for every dashboard refresh, so the
+in-process caches in database.py never survive between runs. This store keeps
+JSON snapshots under assets/cache so consecutive (or concurrent) processes can
+reuse data that is still fresh.
+
+- Entries are keyed by an arbitrary string (e.g. the full REST endpoint) and
+  stored as `<sha1>.json`.
+- Writes go to a temp file in the same directory followed by os.replace, so a
+  reader never sees a half-written snapshot.
+- A lock file serialises writers and eviction across processes (fcntl on
+  POSIX, msvcrt on Windows).
+- Total size is bounded; the least recently used snapshots are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # pragma: no cover - Windows
+    FCNTL_AVAILABLE = False
+
+try:
+    import msvcrt
+    MSVCRT_AVAILABLE = True
+except ImportError:
+    MSVCRT_AVAILABLE = False
+
+
+class SnapshotStore:
+    """Size-bounded, TTL-aware JSON snapshot store shared between processes."""
+
+    LOCK_NAME = ".lock"
+
+    def __init__(self, directory: Path, ttl_seconds: float, max_bytes: int):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Hold the directory lock; shared for readers where supported."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        handle = open(self.directory / self.LOCK_NAME, "a+b")
+        try:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            elif MSVCRT_AVAILABLE:  # pragma: no cover - Windows
+                handle.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10s; keep waiting
+                        continue
+            yield
+        finally:
+            try:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                elif MSVCRT_AVAILABLE:  # pragma: no cover - Windows
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                handle.close()
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Return the stored value for `key`, or None when missing, expired or
+        unreadable. `max_age` overrides the store TTL (None = use the TTL).
+        """
+        max_age = self.ttl_seconds if max_age is None else max_age
+        path = self._path(key)
+        try:
+            with self._locked(exclusive=False):
+                with open(path, "r", encoding="utf-8") as handle:
+                    payload = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            print(f"WARNING: unreadable snapshot {path.name}: {exc}", file=sys.stderr)
+            return None
+
+        if not isinstance(payload, dict) or payload.get("key") != key:
+            return None
+        age = time.time() - float(payload.get("stored_at", 0))
+        if age < 0 or age > max_age:
+            return None
+
+        try:
+            # Mark as recently used for LRU eviction
+            os.utime(path, None)
+        except OSError:
+            pass
+        return payload.get("value")
+
+    def put(self, key: str, value: Any) -> bool:
+        """Atomically write `value` for `key` and enforce the size bound."""
+        payload = {"key": key, "stored_at": time.time(), "value": value}
+        path = self._path(key)
+        try:
+            with self._locked(exclusive=True):
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=str(self.directory), prefix=".tmp-", suffix=".json"
+                )
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                        json.dump(payload, handle, separators=(",", ":"), default=str)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+                self._evict_locked()
+            return True
+        except (OSError, TypeError, ValueError) as exc:
+            print(f"WARNING: could not write snapshot {path.name}: {exc}", file=sys.stderr)
+            return False
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            with self._locked(exclusive=True):
+                path.unlink()
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Remove every snapshot in the store."""
+        if not self.directory.is_dir():
+            return
+        with self._locked(exclusive=True):
+            for path in self.directory.glob("*.json"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _evict_locked(self) -> None:
+        """Drop least recently used snapshots until under max_bytes."""
+        if self.max_bytes <= 0:
+            return
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
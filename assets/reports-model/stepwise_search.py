@@ -0,0 +1,362 @@
+"""
+Stepwise SARIMA order selection (Hyndman & Khandakar, 2008), as used by
+R's forecast::auto.arima(stepwise = TRUE).
+
+1. Differencing orders are fixed before any model is fitted: D from the
+   OCSB seasonal unit-root test, then d from repeated KPSS tests on the
+   (seasonally differenced) series.
+2. A handful of starting models are fitted and the best AICc is kept.
+3. The search repeatedly moves to the first neighbouring model (p, q, P or
+   Q changed by one, alone or in pairs) that lowers the AICc, and stops
+   when no neighbour improves or the model budget is spent.
+
+Every fitted order is memoised, so no order is fitted twice. When the
+parallel_fitting pool is enabled, each round's neighbours for every series
+are fitted together up front and the first-improvement walk is replayed over
+them, so the selected model matches the sequential search exactly.
+
+With `approximation=True` (auto.arima's approximation mode) the walk runs on
+approximate AICc values from batched_likelihood, one batch per round for all
+series, and only the winning order is then fitted with SARIMAX (falling back
+to the next-best candidate if that fit fails).
+
+Differences from auto.arima: the constant/drift toggle is not searched
+(models are fitted without a trend term, as elsewhere in this package) and
+the CSS approximation for long series is not used.
+"""
+
+import math
+import warnings
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from batched_likelihood import screen_orders
+from lazy_imports import ensure_loaded, lazy_module
+from parallel_fitting import FitOutcome, Order, Selection, fit_candidate, fit_many, pool_enabled
+
+stattools = lazy_module("statsmodels.tsa.stattools")
+
+# Bump when the walk's rules change, so models selected under older rules
+# (stored by model_store under describe()) are searched again
+WALK_VERSION = 2
+
+
+class StepwiseSearch(NamedTuple):
+    """auto.arima's stepwise defaults."""
+
+    m: int = 12
+    max_p: int = 5
+    max_q: int = 5
+    max_P: int = 2
+    max_Q: int = 2
+    max_order: int = 5  # max p + q + P + Q (non-stepwise search only; unused here)
+    max_d: int = 2
+    max_D: int = 1
+    start_p: int = 2
+    start_q: int = 2
+    start_P: int = 1
+    start_Q: int = 1
+    max_models: int = 94
+    alpha: float = 0.05
+    approximation: bool = False  # walk on batched approximate fits
+
+    def describe(self) -> Dict:
+        """JSON-able description (used in model store keys)."""
+        return {"stepwise": self._asdict(), "walk": WALK_VERSION}
+
+
+# ------------------------------------------------------------------ #
+# Differencing tests
+# ------------------------------------------------------------------ #
+def _is_constant(x: np.ndarray) -> bool:
+    return len(x) == 0 or bool(np.all(x == x[0]))
+
+
+def _kpss_rejects(x: np.ndarray, alpha: float) -> bool:
+    """KPSS level-stationarity test; True when stationarity is rejected."""
+    # Lag truncation used by forecast::ndiffs
+    lags = int(math.trunc(3 * math.sqrt(len(x)) / 13))
+    ensure_loaded(stattools)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            _, p_value, _, _ = stattools.kpss(x, regression="c", nlags=lags)
+    except Exception:
+        return False
+    return p_value < alpha
+
+
+def kpss_ndiffs(x: np.ndarray, alpha: float = 0.05, max_d: int = 2) -> int:
+    """Number of first differences needed for stationarity (KPSS)."""
+    d = 0
+    while d < max_d and len(x) > 3 and not _is_constant(x) and _kpss_rejects(x, alpha):
+        x = np.diff(x)
+        d += 1
+    return d
+
+
+def _ocsb_crit_value(m: int) -> float:
+    """5% critical value of the OCSB test (forecast::ocsb.test)."""
+    log_m = math.log(m)
+    return (
+        -0.2937411 * math.exp(-0.2850853 * (log_m - 0.7656451) - 0.05983644 * (log_m - 0.7656451) ** 2)
+        - 1.652202
+    )
+
+
+def _ocsb_fit(x: np.ndarray, m: int, lag: int) -> Optional[Tuple[float, float]]:
+    """
+    OCSB regression (1-B)(1-B^m)x_t on its own lags, (1-B^m)x_{t-1} and
+    (1-B)x_{t-m}. Returns (aic, t statistic of the last regressor).
+    """
+    n = len(x)
+    start = m + 1 + lag
+    if n - start < lag + 4:
+        return None
+    t = np.arange(start, n)
+    y_full = np.full(n, np.nan)
+    y_full[m + 1:] = (x[m + 1:] - x[1:n - m]) - (x[m:n - 1] - x[:n - m - 1])
+    columns = [y_full[t - k] for k in range(1, lag + 1)]
+    columns.append(x[t - 1] - x[t - 1 - m])  # (1-B^m) x_{t-1}
+    columns.append(x[t - m] - x[t - m - 1])  # (1-B) x_{t-m}
+    X = np.column_stack(columns)
+    y = y_full[t]
+
+    coef, _, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    if rank < X.shape[1]:
+        return None
+    resid = y - X @ coef
+    nobs, k = X.shape
+    rss = float(resid @ resid)
+    if rss <= 0 or nobs <= k:
+        return None
+    sigma2 = rss / (nobs - k)
+    cov = sigma2 * np.linalg.inv(X.T @ X)
+    t_stat = float(coef[-1] / math.sqrt(cov[-1, -1]))
+    llf = -nobs / 2.0 * (math.log(2 * math.pi * rss / nobs) + 1)
+    return -2 * llf + 2 * k, t_stat
+
+
+def ocsb_nsdiffs(x: np.ndarray, m: int = 12, max_D: int = 1, max_lag: int = 3) -> int:
+    """
+    Number of seasonal differences from the Osborn-Chui-Smith-Birchenhall
+    test: difference while the statistic is above the critical value (a
+    seasonal unit root cannot be rejected). The lag order of the test
+    regression is chosen by AIC.
+    """
+    D = 0
+    crit = _ocsb_crit_value(m)
+    while D < max_D and len(x) >= 2 * m + 5 and not _is_constant(x):
+        fits = [fit for fit in (_ocsb_fit(x, m, lag) for lag in range(1, max_lag + 1)) if fit]
+        if not fits:
+            break
+        _, statistic = min(fits, key=lambda fit: fit[0])
+        if statistic <= crit:
+            break
+        x = x[m:] - x[:-m]
+        D += 1
+    return D
+
+
+def differencing_orders(values: np.ndarray, search: StepwiseSearch) -> Tuple[int, int]:
+    """(d, D) as auto.arima picks them: seasonal test first, then KPSS."""
+    x = np.asarray(values, dtype=np.float64)
+    D = ocsb_nsdiffs(x, search.m, search.max_D) if search.m > 1 else 0
+    for _ in range(D):
+        x = x[search.m:] - x[:-search.m]
+    d = kpss_ndiffs(x, search.alpha, search.max_d)
+    return d, D
+
+
+# ------------------------------------------------------------------ #
+# Stepwise walk
+# ------------------------------------------------------------------ #
+def order_limits(n: int, search: StepwiseSearch) -> Tuple[int, int, int, int]:
+    """Largest (p, q, P, Q) the walk visits for a series of n observations (auto.arima)."""
+    m = search.m
+    return (
+        min(search.max_p, n // 3),
+        min(search.max_q, n // 3),
+        min(search.max_P, n // 3 // m) if m > 1 else 0,
+        min(search.max_Q, n // 3 // m) if m > 1 else 0,
+    )
+
+
+class _Walk:
+    """State of the stepwise search for one series."""
+
+    def __init__(self, values: np.ndarray, search: StepwiseSearch):
+        self.values = values
+        self.search = search
+        # Order limits for short series (auto.arima)
+        self.max_p, self.max_q, self.max_P, self.max_Q = order_limits(len(values), search)
+        self.d, self.D = differencing_orders(values, search)
+        self.fitted: Dict[Order, Optional[FitOutcome]] = {}  # memo, incl. prefetched fits
+        self.visited = set()  # orders the sequential search has tried
+        self.best: Optional[FitOutcome] = None
+        self.done = False
+
+    def _valid(self, p: int, q: int, P: int, Q: int) -> bool:
+        # max_order only bounds auto.arima's non-stepwise search
+        return 0 <= p <= self.max_p and 0 <= q <= self.max_q and 0 <= P <= self.max_P and 0 <= Q <= self.max_Q
+
+    def _order(self, p: int, q: int, P: int, Q: int) -> Order:
+        return (p, self.d, q, P, self.D, Q, self.search.m)
+
+    def initial_orders(self) -> List[Order]:
+        s = self.search
+        candidates = [
+            (min(s.start_p, self.max_p), min(s.start_q, self.max_q),
+             min(s.start_P, self.max_P), min(s.start_Q, self.max_Q)),
+            (0, 0, 0, 0),
+            (min(1, self.max_p), 0, min(1, self.max_P), 0),
+            (0, min(1, self.max_q), 0, min(1, self.max_Q)),
+        ]
+        orders: List[Order] = []
+        for p, q, P, Q in candidates:
+            order = self._order(p, q, P, Q)
+            if self._valid(p, q, P, Q) and order not in orders:
+                orders.append(order)
+        return orders
+
+    def neighbour_orders(self, order: Optional[Order] = None) -> List[Order]:
+        """Neighbours of `order` (default: the current best), in auto.arima's visiting order."""
+        p, _, q, P, _, Q, _ = order if order is not None else self.best.order
+        # (dp, dq, dP, dQ): seasonal P/Q down then up, then in pairs; the
+        # same for p/q
+        moves = [
+            (0, 0, -1, 0), (0, 0, 0, -1), (0, 0, 1, 0), (0, 0, 0, 1),
+            (0, 0, -1, -1), (0, 0, -1, 1), (0, 0, 1, -1), (0, 0, 1, 1),
+            (-1, 0, 0, 0), (0, -1, 0, 0), (1, 0, 0, 0), (0, 1, 0, 0),
+            (-1, -1, 0, 0), (-1, 1, 0, 0), (1, -1, 0, 0), (1, 1, 0, 0),
+        ]
+        orders = []
+        for dp, dq, dP, dQ in moves:
+            if self._valid(p + dp, q + dq, P + dP, Q + dQ):
+                orders.append(self._order(p + dp, q + dq, P + dP, Q + dQ))
+        return orders
+
+    def upcoming(self) -> List[Order]:
+        """Orders the next start()/step() call may visit, for prefetching."""
+        if self.done:
+            return []
+        orders = self.initial_orders() if self.best is None else self.neighbour_orders()
+        budget = self.search.max_models - len(self.visited)
+        return [order for order in orders if order not in self.visited][:max(budget, 0)]
+
+    def prefetched(self, outcomes: Dict[Order, Optional[FitOutcome]]) -> None:
+        self.fitted.update(outcomes)
+
+    def start(self, steps: int) -> None:
+        """Fit the starting models and keep the best."""
+        for order in self.initial_orders():
+            self._consider(order, steps)
+        if self.best is None:
+            self.done = True
+
+    def step(self, steps: int) -> None:
+        """Move to the first improving neighbour, or finish."""
+        if self.done:
+            return
+        for order in self.neighbour_orders():
+            if len(self.visited) >= self.search.max_models:
+                break
+            if order in self.visited:
+                continue
+            if self._consider(order, steps):
+                return
+        self.done = True
+
+    def _consider(self, order: Order, steps: int) -> bool:
+        """Visit `order` once; True if it became the new best."""
+        self.visited.add(order)
+        if order not in self.fitted:
+            self.fitted[order] = fit_candidate(self.values, order, steps, keep_results=True)
+        outcome = self.fitted[order]
+        if outcome is not None and (self.best is None or outcome.aicc < self.best.aicc):
+            self.best = outcome
+            return True
+        return False
+
+
+def stepwise_many(
+    series: Dict[str, np.ndarray], search: StepwiseSearch, steps: int = 1
+) -> Dict[str, Optional[Selection]]:
+    """
+    Stepwise search for every series. With the process pool enabled, each
+    round fits all orders the walks may visit next (across series) in one
+    batch; the walks then replay sequentially over those fits.
+    """
+    walks = {name: _Walk(values, search) for name, values in series.items()}
+    prefetch = pool_enabled()
+    first = True
+    while True:
+        active = {name: walk for name, walk in walks.items() if not walk.done}
+        if not active:
+            break
+        if search.approximation or prefetch:
+            _prefetch_round(active, search, steps)
+        for walk in active.values():
+            if first:
+                walk.start(steps)
+            else:
+                walk.step(steps)
+        first = False
+
+    if search.approximation:
+        _refit_exact(walks, steps)
+    return {
+        name: Selection(walk.values, walk.best) if walk.best is not None else None
+        for name, walk in walks.items()
+    }
+
+
+def _prefetch_round(active: Dict[str, _Walk], search: StepwiseSearch, steps: int) -> None:
+    """Evaluate every order the active walks may visit this round in one batch."""
+    pending = {
+        (name, order): walk.values
+        for name, walk in active.items()
+        for order in walk.upcoming()
+        if order not in walk.fitted
+    }
+    if search.approximation:
+        outcomes = screen_orders({key: (values, key[1]) for key, values in pending.items()})
+    elif len(pending) > 1:
+        outcomes = fit_many({key: (values, key[1], None) for key, values in pending.items()}, steps)
+    else:
+        return
+    for (name, order), outcome in outcomes.items():
+        active[name].prefetched({order: outcome})
+
+
+def _refit_exact(walks: Dict[str, _Walk], steps: int) -> None:
+    """
+    Replace each walk's approximate winner with a SARIMAX fit of the same
+    order, started from the approximate estimates, trying the next-best
+    approximate candidates if a fit fails.
+    """
+    ranked = {
+        name: sorted(
+            (outcome for order, outcome in walk.fitted.items() if order in walk.visited and outcome),
+            key=lambda outcome: outcome.aicc,
+        )
+        for name, walk in walks.items()
+    }
+    for walk in walks.values():
+        walk.best = None
+    while True:
+        tasks = {}
+        for name, candidates in ranked.items():
+            if candidates and walks[name].best is None:
+                candidate = candidates.pop(0)
+                tasks[name] = (walks[name].values, candidate.order, candidate.params)
+        if not tasks:
+            break
+        for name, outcome in fit_many(tasks, steps).items():
+            walks[name].best = outcome
+
+
+def stepwise_search(values: np.ndarray, search: StepwiseSearch, steps: int = 1) -> Optional[Selection]:
+    """Stepwise search for a single series."""
+    return stepwise_many({"series": values}, search, steps)["series"]
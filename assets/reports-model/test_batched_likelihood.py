@@ -0,0 +1,118 @@
+"""
+Parity of batched_likelihood's Kalman filter with SARIMAX.
+
+At equal parameters, _log_likelihood must give the log-likelihood SARIMAX
+computes for the same order (enforce_stationarity/invertibility off, scale
+concentrated out), both for ARMA orders and for orders with regular or
+seasonal differencing. Each check batches several candidates of different
+orders and series lengths together, as screen_orders does.
+
+Run directly (python test_batched_likelihood.py) or with pytest.
+Needs statsmodels; the checks are skipped without it.
+"""
+
+import sys
+import warnings
+from typing import List, Sequence
+
+import numpy as np
+
+from config import SARIMA_AVAILABLE
+
+TOLERANCE = 1e-6
+
+# (p, d, q, P, D, Q, s) candidates; rows of one batch share d, D and s
+ARMA_ORDERS = [(1, 0, 1, 0, 0, 0, 12), (2, 0, 0, 1, 0, 0, 12), (0, 0, 1, 0, 0, 1, 12)]
+DIFFERENCED_ORDERS = [
+    [(0, 1, 1, 0, 0, 0, 12), (1, 1, 0, 0, 0, 0, 12)],
+    [(1, 0, 0, 0, 1, 0, 12), (0, 0, 1, 0, 1, 1, 12)],
+    [(1, 1, 1, 0, 1, 1, 12), (0, 1, 1, 1, 1, 0, 12)],
+    [(0, 2, 1, 0, 0, 0, 12)],
+]
+
+
+def _series(length: int, seed: int) -> np.ndarray:
+    """A trending monthly series with a yearly cycle, like the unit counts."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(length)
+    return 80 + np.cumsum(rng.normal(0, 4, length)) + 10 * np.sin(t * 2 * np.pi / 12)
+
+
+def _sarimax(values: np.ndarray, order: Sequence[int]):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    p, d, q, P, D, Q, s = order
+    return SARIMAX(
+        values,
+        order=(p, d, q),
+        seasonal_order=(P, D, Q, s),
+        enforce_stationarity=False,
+        enforce_invertibility=False,
+        concentrate_scale=True,
+    )
+
+
+def check_orders(orders: Sequence[Sequence[int]]) -> List[str]:
+    """Mismatches between the batched and SARIMAX log-likelihoods."""
+    from batched_likelihood import _Batch, _log_likelihood
+
+    series = [_series(72 - 6 * row, seed=row) for row in range(len(orders))]
+    expected = []
+    estimates = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for values, order in zip(series, orders):
+            model = _sarimax(values, order)
+            params = model.fit(disp=False).params
+            expected.append(model.loglike(params))
+            estimates.append(params)
+
+    width = max(len(values) for values in series)
+    padded = np.zeros((len(series), width))
+    for row, values in enumerate(series):
+        padded[row, :len(values)] = values
+    batch = _Batch(padded, np.array([len(values) for values in series]), [tuple(o) for o in orders])
+    params = np.zeros((len(orders), batch.k))
+    for row, estimate in enumerate(estimates):
+        params[row, batch.active[row]] = estimate
+    llf, _ = _log_likelihood(batch, params)
+
+    return [
+        f"{tuple(order)}: batched {llf[row]:.6f} != SARIMAX {expected[row]:.6f}"
+        for row, order in enumerate(orders)
+        if not abs(llf[row] - expected[row]) <= TOLERANCE * max(1.0, abs(expected[row]))
+    ]
+
+
+def _require_statsmodels() -> None:
+    if not SARIMA_AVAILABLE:
+        import pytest
+
+        pytest.skip("statsmodels is not installed")
+
+
+def test_log_likelihood_matches_sarimax_without_differencing():
+    _require_statsmodels()
+    problems = check_orders(ARMA_ORDERS)
+    assert not problems, "\n".join(problems)
+
+
+def test_log_likelihood_matches_sarimax_with_differencing():
+    _require_statsmodels()
+    problems = [problem for orders in DIFFERENCED_ORDERS for problem in check_orders(orders)]
+    assert not problems, "\n".join(problems)
+
+
+if __name__ == "__main__":
+    if not SARIMA_AVAILABLE:
+        print("statsmodels is not installed; skipped")
+        sys.exit(0)
+    failures = 0
+    for orders in [ARMA_ORDERS] + DIFFERENCED_ORDERS:
+        problems = check_orders(orders)
+        failures += len(problems)
+        for problem in problems:
+            print(f"FAIL  {problem}")
+        if not problems:
+            print(f"ok    {', '.join(str(tuple(order)) for order in orders)}")
+    sys.exit(1 if failures else 0)
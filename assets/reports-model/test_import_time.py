@@ -0,0 +1,88 @@
+"""
+Import-time budget for the report entry points PHP spawns.
+
+Each entry point is imported in a fresh interpreter (as PHP runs it), and
+the check fails if the import takes longer than the budget or pulls in a
+heavy scientific/plotting stack the import itself does not need (see
+lazy_imports).
+
+Run directly (python test_import_time.py) or with pytest.
+IMPORT_TIME_BUDGET (seconds, default 1.0) sets the budget.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent
+BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET", "1.0"))
+
+HEAVY_MODULES = ["statsmodels", "scipy", "pandas", "plotly", "plotnine", "pmdarima", "matplotlib"]
+
+ENTRY_POINTS = [
+    "Total Active Donors.py",
+    "Total Blood Units Available.py",
+    "Total Hospital Requests Today.py",
+    "Eligible Donors Today.py",
+    "Blood Units Nearing Expiry.py",
+    "Donor Sex Distribution.py",
+    "Donations by Month.py",
+    "reports_dashboard_overview.py",
+    "dashboard_inventory_system_reports_admin.py",
+]
+
+# Imports `path` as a module (without running its __main__ block) and
+# reports the elapsed time and which heavy modules got loaded.
+_PROBE = """
+import importlib.util, json, sys, time
+sys.path.insert(0, {base!r})
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("entry_point", {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(filename: str) -> Dict:
+    code = _PROBE.format(base=str(BASE_DIR), path=str(BASE_DIR / filename), heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True, timeout=120
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {filename} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def check_entry_point(filename: str) -> List[str]:
+    """Problems found for one entry point (empty when within budget)."""
+    result = measure_import(filename)
+    problems = []
+    if result["heavy"]:
+        problems.append(f"{filename}: imports {', '.join(result['heavy'])} at load time")
+    if result["elapsed"] > BUDGET_SECONDS:
+        problems.append(f"{filename}: import took {result['elapsed']:.2f}s (budget {BUDGET_SECONDS:.2f}s)")
+    return problems
+
+
+def test_entry_points_import_within_budget():
+    problems = [problem for filename in ENTRY_POINTS for problem in check_entry_point(filename)]
+    assert not problems, "\n".join(problems)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for filename in ENTRY_POINTS:
+        result = measure_import(filename)
+        problems = check_entry_point(filename)
+        failures += bool(problems)
+        status = "FAIL" if problems else "ok"
+        heavy = ", ".join(result["heavy"]) or "-"
+        print(f"{status:4}  {result['elapsed']:6.3f}s  heavy: {heavy:20}  {filename}")
+    print(f"\nBudget: {BUDGET_SECONDS:.2f}s per entry point")
+    sys.exit(1 if failures else 0)
@@ -2,15 +2,17 @@
 import time
 from dashboard_inventory_system_reports_admin import ForecastReportsCalculator
 
-start = time.time()
-calc = ForecastReportsCalculator()
-result = calc.generate_forecasts()
-elapsed = time.time() - start
-
-print(f"Execution time: {elapsed:.2f} seconds")
-print(f"Success: {result.get('success', False)}")
-print(f"Forecast data points: {len(result.get('forecast_data', []))}")
-print(f"KPIs calculated: {len(result.get('kpis', {}))}")
+# Guarded so model-fitting worker processes (spawn start method) can import it
+if __name__ == "__main__":
+    start = time.time()
+    calc = ForecastReportsCalculator()
+    result = calc.generate_forecasts()
+    elapsed = time.time() - start
+
+    print(f"Execution time: {elapsed:.2f} seconds")
+    print(f"Success: {result.get('success', False)}")
+    print(f"Forecast data points: {len(result.get('forecast_data', []))}")
+    print(f"KPIs calculated: {len(result.get('kpis', {}))}")
 
 
 
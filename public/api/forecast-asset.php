@@ -62,6 +62,22 @@ $assets = [
         'label' => 'Projected Stock Status view',
     ],
 
+    // Progress of the background forecast chart refresh (chart_jobs.py)
+    'chart_status' => [
+        'path' => $chartsDir ? $chartsDir . DIRECTORY_SEPARATOR . 'forecast_charts.status.json' : null,
+        'mime' => 'application/json; charset=UTF-8',
+        'label' => 'Chart refresh status',
+    ],
+
+    // Shared plotly.js bundle referenced by the HTML charts (chart_output.py)
+    'plotly_js' => [
+        'path' => $chartsDir ? $chartsDir . DIRECTORY_SEPARATOR . 'plotly.min.js' : null,
+        'mime' => 'application/javascript; charset=UTF-8',
+        'label' => 'Plotly library',
+        // Requested with ?v=<plotly version>, so browsers may keep it
+        'immutable' => true,
+    ],
+
     // Donor & hospital overview interactive HTML charts (generated by reports_dashboard_overview.py)
     'donor_age' => [
         'path' => $chartsDir ? $chartsDir . DIRECTORY_SEPARATOR . 'donor_age_distribution.html' : null,
@@ -132,6 +148,22 @@ if (!isset($assets[$key])) {
 $asset = $assets[$key];
 $path = $asset['path'];
 
+// Tell clients when the charts are being regenerated in the background
+$statusPath = $assets['chart_status']['path'];
+if ($statusPath && is_readable($statusPath)) {
+    $status = json_decode((string) file_get_contents($statusPath), true);
+    $state = is_array($status) ? ($status['state'] ?? '') : '';
+    if ($state === 'queued' || $state === 'running') {
+        header('X-Chart-Refresh: ' . $state);
+    }
+}
+
+if ($key === 'chart_status' && (!$path || !file_exists($path))) {
+    header('Content-Type: ' . $asset['mime']);
+    echo json_encode(['job' => 'forecast_charts', 'state' => 'idle']);
+    exit;
+}
+
 if (!$path || !file_exists($path)) {
     http_response_code(404);
     header('Content-Type: text/html; charset=UTF-8');
@@ -142,6 +174,12 @@ if (!$path || !file_exists($path)) {
     exit;
 }
 
+if (!empty($asset['immutable'])) {
+    header('Cache-Control: public, max-age=31536000, immutable');
+    header_remove('Pragma');
+    header_remove('Expires');
+}
+
 $mime = $asset['mime'];
 header('Content-Type: ' . $mime);
 header('Content-Length: ' . filesize($path));
@@ -56,6 +56,25 @@ if (!$forceRefresh && is_file($cacheFile)) {
 // Path to Python script
 $pythonScript = __DIR__ . '/../../assets/reports-model/dashboard_inventory_system_reports_admin.py';
 
+// ------------------------------------------------------------------
+// Prefer the long-lived reports daemon (assets/reports-model/reports_daemon.py):
+// it keeps data and models warm and coalesces concurrent page loads.
+// When it is not running, the Python script is spawned as before.
+// ------------------------------------------------------------------
+$daemonPort = intval(getenv('REPORTS_DAEMON_PORT') ?: 8765);
+$daemonUrl = 'http://127.0.0.1:' . $daemonPort . '/dashboard?year=' . $year . ($forceRefresh ? '&refresh=1' : '');
+$daemonContext = stream_context_create([
+    'http' => [
+        'timeout' => 300,
+        // Error payloads (HTTP 500) are JSON too - read them like CLI output
+        'ignore_errors' => true,
+    ],
+]);
+$daemonOutput = @file_get_contents($daemonUrl, false, $daemonContext);
+if ($daemonOutput === false || trim($daemonOutput) === '') {
+    $daemonOutput = null;
+}
+
 // Detect Python executable (Windows-compatible)
 $pythonExecutable = null;
 // On Windows, prioritize 'py' launcher, then try others
@@ -93,7 +112,7 @@ if ($pythonExecutable === null) {
     }
 }
 
-if ($pythonExecutable === null) {
+if ($pythonExecutable === null && $daemonOutput === null) {
     // Fallback: Use original PHP API if Python is not available
     error_log("Python not found. Falling back to PHP API. Tried commands: " . implode(', ', $pythonCommands));
     // Clear any buffered output before including fallback
@@ -103,47 +122,53 @@ if ($pythonExecutable === null) {
 }
 
 try {
-    // Check if Python script exists
-    if (!file_exists($pythonScript)) {
-        throw new Exception('Python script not found: ' . $pythonScript);
-    }
-    
-    // Change to the script directory to ensure imports work
-    $scriptDir = dirname($pythonScript);
-    $originalDir = getcwd();
-    chdir($scriptDir);
-    
-    // Execute Python script and capture output
-    // Use full path to script to avoid PATH issues
-    $scriptPath = realpath($pythonScript);
-    if (!$scriptPath) {
-        throw new Exception('Python script path not found: ' . $pythonScript);
-    }
-    
-    // Set environment variable for Python script (works on both Windows and Unix)
-    putenv('FORECAST_YEAR=' . $year);
-    
-    // Build command with proper escaping for Windows
-    // IMPORTANT: Only capture stdout (JSON output), redirect stderr to error log
-    // This prevents debug messages from breaking JSON parsing
-    if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
-        // Windows: capture stdout only, redirect stderr to error log
-        // Use 2>NUL to discard stderr, or 2>>error.log to log it
-        $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>NUL';
+    if ($daemonOutput !== null) {
+        $output = $daemonOutput;
     } else {
-        // Linux/Mac: capture stdout only, redirect stderr to /dev/null or error log
-        $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>/dev/null';
+        // Check if Python script exists
+        if (!file_exists($pythonScript)) {
+            throw new Exception('Python script not found: ' . $pythonScript);
+        }
+
+        // Change to the script directory to ensure imports work
+        $scriptDir = dirname($pythonScript);
+        $originalDir = getcwd();
+        chdir($scriptDir);
+
+        // Execute Python script and capture output
+        // Use full path to script to avoid PATH issues
+        $scriptPath = realpath($pythonScript);
+        if (!$scriptPath) {
+            throw new Exception('Python script path not found: ' . $pythonScript);
+        }
+
+        // Set environment variable for Python script (works on both Windows and Unix)
+        putenv('FORECAST_YEAR=' . $year);
+        // A forced refresh must also bypass Python's on-disk Supabase snapshots
+        putenv('SUPABASE_SNAPSHOT_REFRESH=' . ($forceRefresh ? '1' : '0'));
+
+        // Build command with proper escaping for Windows
+        // IMPORTANT: Only capture stdout (JSON output), redirect stderr to error log
+        // This prevents debug messages from breaking JSON parsing
+        if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
+            // Windows: capture stdout only, redirect stderr to error log
+            // Use 2>NUL to discard stderr, or 2>>error.log to log it
+            $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>NUL';
+        } else {
+            // Linux/Mac: capture stdout only, redirect stderr to /dev/null or error log
+            $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>/dev/null';
+        }
+
+        error_log("Executing Python command: $command");
+        $output = shell_exec($command);
+
+        // If we want to capture stderr for debugging, we can use proc_open instead
+        // But for now, stderr goes to error log (or is discarded)
+
+        // Restore original directory
+        chdir($originalDir);
     }
-    
-    error_log("Executing Python command: $command");
-    $output = shell_exec($command);
-    
-    // If we want to capture stderr for debugging, we can use proc_open instead
-    // But for now, stderr goes to error log (or is discarded)
-    
-    // Restore original directory
-    chdir($originalDir);
-    
+
     if ($output === null || trim($output) === '') {
         throw new Exception('Failed to execute Python script or no output received');
     }
@@ -175,13 +200,17 @@ try {
     $result['cache'] = [
         'year' => $year,
         'from_cache' => false,
+        'from_daemon' => $daemonOutput !== null,
         'ttl_seconds' => $cacheTtlSeconds,
     ];
     
     $json = json_encode($result, JSON_PRETTY_PRINT);
 
     // Best-effort write to cache (ignore errors)
-    if ($json !== false) {
+    // A stale payload (REPORTS_PAYLOAD_SWR) is being rebuilt in the background;
+    // caching it here would hide the rebuilt one for a full TTL
+    $isStale = !empty($result['payload_cache']['stale']);
+    if ($json !== false && !$isStale) {
         @file_put_contents($cacheFile, $json);
     }
 
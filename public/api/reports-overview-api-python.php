@@ -48,6 +48,25 @@ if (!$forceRefresh && is_file($cacheFile)) {
     }
 }
 
+// ------------------------------------------------------------------
+// Prefer the long-lived reports daemon (assets/reports-model/reports_daemon.py):
+// it keeps data and models warm and coalesces concurrent page loads.
+// When it is not running, the Python script is spawned as before.
+// ------------------------------------------------------------------
+$daemonPort = intval(getenv('REPORTS_DAEMON_PORT') ?: 8765);
+$daemonUrl = 'http://127.0.0.1:' . $daemonPort . '/overview' . ($forceRefresh ? '?refresh=1' : '');
+$daemonContext = stream_context_create([
+    'http' => [
+        'timeout' => 300,
+        // Error payloads (HTTP 500) are JSON too - read them like CLI output
+        'ignore_errors' => true,
+    ],
+]);
+$daemonOutput = @file_get_contents($daemonUrl, false, $daemonContext);
+if ($daemonOutput === false || trim($daemonOutput) === '') {
+    $daemonOutput = null;
+}
+
 // Detect Python executable (Windows and Linux/Mac compatible)
 $pythonExecutable = null;
 if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
@@ -81,7 +100,7 @@ if ($pythonExecutable === null) {
     }
 }
 
-if ($pythonExecutable === null) {
+if ($pythonExecutable === null && $daemonOutput === null) {
     ob_clean();
     echo json_encode([
         'success' => false,
@@ -91,28 +110,35 @@ if ($pythonExecutable === null) {
 }
 
 try {
-    if (!file_exists($pythonScript)) {
-        throw new Exception('Python script not found: ' . $pythonScript);
-    }
+    if ($daemonOutput !== null) {
+        $output = $daemonOutput;
+    } else {
+        if (!file_exists($pythonScript)) {
+            throw new Exception('Python script not found: ' . $pythonScript);
+        }
 
-    $scriptDir = dirname($pythonScript);
-    $originalDir = getcwd();
-    chdir($scriptDir);
+        $scriptDir = dirname($pythonScript);
+        $originalDir = getcwd();
+        chdir($scriptDir);
 
-    $scriptPath = realpath($pythonScript);
-    if (!$scriptPath) {
-        throw new Exception('Python script path could not be resolved: ' . $pythonScript);
-    }
+        $scriptPath = realpath($pythonScript);
+        if (!$scriptPath) {
+            throw new Exception('Python script path could not be resolved: ' . $pythonScript);
+        }
 
-    // Build command (capture stdout JSON only, discard stderr)
-    if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
-        $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>NUL';
-    } else {
-        $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>/dev/null';
-    }
+        // A forced refresh must also bypass Python's on-disk Supabase snapshots
+        putenv('SUPABASE_SNAPSHOT_REFRESH=' . ($forceRefresh ? '1' : '0'));
 
-    $output = shell_exec($command);
-    chdir($originalDir);
+        // Build command (capture stdout JSON only, discard stderr)
+        if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
+            $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>NUL';
+        } else {
+            $command = escapeshellcmd($pythonExecutable) . ' ' . escapeshellarg($scriptPath) . ' 2>/dev/null';
+        }
+
+        $output = shell_exec($command);
+        chdir($originalDir);
+    }
 
     if ($output === null || trim($output) === '') {
         throw new Exception('No output received from overview Python script');
@@ -140,11 +166,15 @@ try {
     $result['data_source'] = 'python_reports_overview';
     $result['cache'] = [
         'from_cache' => false,
+        'from_daemon' => $daemonOutput !== null,
         'ttl_seconds' => $cacheTtlSeconds,
     ];
 
     $json = json_encode($result, JSON_PRETTY_PRINT);
-    if ($json !== false) {
+    // A stale payload (REPORTS_PAYLOAD_SWR) is being rebuilt in the background;
+    // caching it here would hide the rebuilt one for a full TTL
+    $isStale = !empty($result['payload_cache']['stale']);
+    if ($json !== false && !$isStale) {
         @file_put_contents($cacheFile, $json);
     }
 